@@ -0,0 +1,215 @@
+# backend/app/archive.py
+#
+# Moves old assignments out of the live tables. With ARCHIVE_AFTER_DAYS
+# set, the job workers queue an `archive_assignments` job once a day (see
+# jobs.daily) in every database. It takes the assignments created more than
+# that many days ago, oldest first, ARCHIVE_BATCH at a time, and for each
+# batch, holding the live database's write lock throughout,
+#   1. writes every assignment with its recipients and submissions as one
+#      zlib-compressed JSON document into the archive database next to the
+#      live one (database.db -> database-archive.db), links the submitted
+#      files into <upload folder>/archive and commits there;
+#   2. deletes the assignments from the live database (ON DELETE CASCADE
+#      takes their rows along) and commits, freeing files nothing else
+#      refers to.
+# A crash between the two leaves a batch in both databases; the next run
+# archives it again (documents are replaced) and deletes it. A run stops
+# after MAX_BATCHES and queues a follow-up job, so it never holds a worker
+# for long.
+#
+#   python -m app.archive run --days N [--db ...] [--uploads ...]
+#   python -m app.archive show <assignment id> [--db ...]
+import argparse
+import json
+import os
+import shutil
+import sys
+import zlib
+from .assignment_routes import UPLOAD_FOLDER, delete_assignments
+from .db import connect, database_path
+from . import blobstore, changefeed, jobs, shards
+
+ARCHIVE_BATCH = 200  # assignments per transaction
+MAX_BATCHES = 50  # per job run
+
+_SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS archived_assignments (
+        id INTEGER PRIMARY KEY,
+        organization_id INTEGER,
+        title TEXT NOT NULL,
+        created_at TIMESTAMP,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        document BLOB NOT NULL
+    )''',
+    'CREATE INDEX IF NOT EXISTS idx_archived_assignments_org ON archived_assignments (organization_id, created_at)',
+)
+
+
+def archive_path(db_path):
+    return os.path.splitext(db_path)[0] + '-archive.db'
+
+
+def open_archive(path):
+    conn = connect(path)
+    for sql in _SCHEMA:
+        conn.execute(sql)
+    conn.commit()
+    return conn
+
+
+def _dicts(c, sql, params):
+    c.execute(sql, params)
+    columns = [d[0] for d in c.description]
+    return [dict(zip(columns, row)) for row in c.fetchall()]
+
+
+def _documents(c, assignment_ids, upload_root):
+    """assignment id -> document, for a batch of assignments."""
+    marks = ','.join('?' * len(assignment_ids))
+    documents = {}
+    for a in _dicts(c, f'''
+            SELECT a.*, IFNULL(t.organization_id, u.organization_id) AS organization_id
+            FROM assignments a
+            LEFT JOIN teams t ON t.id = a.team_id
+            LEFT JOIN users u ON u.id = a.created_by_id
+            WHERE a.id IN ({marks})''', assignment_ids):
+        documents[a['id']] = {'assignment': a, 'employee_ids': [], 'submissions': []}
+    c.execute(f'SELECT assignment_id, user_id FROM user_assignments WHERE assignment_id IN ({marks})',
+              assignment_ids)
+    for assignment_id, user_id in c.fetchall():
+        documents[assignment_id]['employee_ids'].append(user_id)
+    for s in _dicts(c, f'SELECT * FROM submissions WHERE assignment_id IN ({marks}) ORDER BY id', assignment_ids):
+        if s['sha256']:
+            s['file_path'] = blobstore.blob_path(os.path.join(upload_root, 'archive'), s['sha256'])
+        documents[s['assignment_id']]['submissions'].append(s)
+    return documents
+
+
+def _keep_files(c, assignment_ids, upload_root):
+    # Hard links where possible: the live blob may be shared and stay
+    marks = ','.join('?' * len(assignment_ids))
+    c.execute(f'SELECT DISTINCT sha256 FROM submissions WHERE assignment_id IN ({marks}) AND sha256 IS NOT NULL',
+              assignment_ids)
+    for (sha256,) in c.fetchall():
+        source = blobstore.blob_path(upload_root, sha256)
+        target = blobstore.blob_path(os.path.join(upload_root, 'archive'), sha256)
+        if os.path.exists(target) or not os.path.exists(source):
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copy2(source, target)
+
+
+def archive_batch(conn, archive_conn, days, upload_root, limit=ARCHIVE_BATCH):
+    """Archive up to `limit` assignments created more than `days` days ago;
+    returns how many. Commits both databases."""
+    c = conn.cursor()
+    # Hold the write lock from reading the batch to deleting it, so nothing
+    # is added to these assignments that the archive would miss
+    if not conn.in_transaction:
+        c.execute('BEGIN IMMEDIATE')
+    c.execute("SELECT id FROM assignments WHERE created_at < datetime('now', ?) ORDER BY created_at, id LIMIT ?",
+              (f'-{int(days)} days', limit))
+    assignment_ids = [r[0] for r in c.fetchall()]
+    if not assignment_ids:
+        conn.rollback()
+        return 0
+
+    documents = _documents(c, assignment_ids, upload_root)
+    _keep_files(c, assignment_ids, upload_root)
+    archive_conn.executemany(
+        '''INSERT OR REPLACE INTO archived_assignments (id, organization_id, title, created_at, document)
+           VALUES (?, ?, ?, ?, ?)''',
+        [(i, d['assignment']['organization_id'], d['assignment']['title'], d['assignment']['created_at'],
+          zlib.compress(json.dumps(d).encode())) for i, d in documents.items()])
+    archive_conn.commit()
+
+    delete_assignments(c, assignment_ids)
+    # Commits, and drops the live copies of files no other submission shares
+    blobstore.collect_garbage(conn, upload_root)
+    return len(assignment_ids)
+
+
+def load(archive_conn, assignment_id):
+    row = archive_conn.execute('SELECT document FROM archived_assignments WHERE id = ?',
+                               (assignment_id,)).fetchone()
+    return json.loads(zlib.decompress(row[0])) if row else None
+
+
+@jobs.daily('archive_assignments')
+def _daily_payload(app):
+    days = app.config['ARCHIVE_AFTER_DAYS']
+    return {'days': days} if days else None
+
+
+@jobs.handler('archive_assignments')
+def _archive(conn, payload):
+    archive_conn = open_archive(archive_path(database_path()))
+    try:
+        archived = 0
+        for _ in range(MAX_BATCHES):
+            count = archive_batch(conn, archive_conn, payload['days'], shards.upload_root())
+            archived += count
+            if count < ARCHIVE_BATCH:
+                break
+        else:
+            # More to do: let other jobs in first
+            jobs.enqueue(conn.cursor(), 'archive_assignments', payload)
+            conn.commit()
+    finally:
+        archive_conn.close()
+    if archived:
+        changefeed.notify()
+    return {'archived': archived}
+
+
+def init_archive(app):
+    days = os.environ.get('ARCHIVE_AFTER_DAYS')
+    app.config.setdefault('ARCHIVE_AFTER_DAYS', int(days) if days else None)
+
+
+def main(argv=None):
+    from .db_setup import DB_PATH
+
+    parser = argparse.ArgumentParser(description='Archive old assignments or read archived ones.')
+    parser.add_argument('command', choices=['run', 'show'])
+    parser.add_argument('assignment_id', nargs='?', type=int, help='archived assignment to show')
+    parser.add_argument('--days', type=int, help='archive assignments created more than this many days ago')
+    parser.add_argument('--db', default=DB_PATH, help='database file (defaults to the app database)')
+    parser.add_argument('--uploads', default=UPLOAD_FOLDER, help='upload folder of that database')
+    args = parser.parse_args(argv)
+
+    archive_conn = open_archive(archive_path(args.db))
+    try:
+        if args.command == 'show':
+            if args.assignment_id is None:
+                parser.error('show needs an assignment id')
+            document = load(archive_conn, args.assignment_id)
+            if document is None:
+                print(f'Assignment {args.assignment_id} is not archived')
+                return 1
+            print(json.dumps(document, indent=2))
+            return 0
+
+        if args.days is None:
+            parser.error('run needs --days')
+        conn = connect(args.db)
+        try:
+            total = 0
+            while True:
+                count = archive_batch(conn, archive_conn, args.days, args.uploads)
+                total += count
+                if count < ARCHIVE_BATCH:
+                    break
+        finally:
+            conn.close()
+        print(f'Archived {total} assignments to {archive_path(args.db)}')
+        return 0
+    finally:
+        archive_conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
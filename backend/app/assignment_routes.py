@@ -1,16 +1,286 @@
 # backend/app/assignment_routes.py
-import sqlite3
-from flask import request, jsonify, session
+import html
+import json
+import re
+import time
+from flask import Response, request, jsonify, g
 import os
-from werkzeug.utils import secure_filename
-from .auth import role_required
+from .auth import login_required, role_required
+from .db import database_path, get_db, get_pool
+from .pagination import decode_cursor, encode_cursor
+from .response_cache import bump_version, etag_cached
+from .responses import rows_response
+from . import blobstore, changefeed, jobs, notifications, shards, visibility
+
+UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), '..', 'uploads')
+
+# Listing is keyset-paginated on (due date, id). Assignments without a due
+# date sort last; the expression matches idx_assignments_due_id.
+DUE_KEY = "IFNULL(a.due_date, '9999-12-31')"
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Columns a client may ask for with ?fields=; `id` is always returned.
+LIST_FIELDS = {
+    'id': 'a.id',
+    'title': 'a.title',
+    'description': 'a.description',
+    'due_date': 'a.due_date',
+    'is_general': 'a.is_general',
+    'team_id': 'a.team_id',
+    'created_by_id': 'a.created_by_id',
+    'created_at': 'a.created_at',
+    'employee_ids': '(SELECT group_concat(user_id) FROM user_assignments WHERE assignment_id = a.id)',
+}
+DEFAULT_LIST_FIELDS = ['id', 'title', 'description', 'due_date', 'is_general', 'team_id', 'employee_ids']
+
+# Search ranks with bm25, a title match weighing as much as ten in the
+# description. SQLite wraps matches in these control characters, which
+# become <mark> tags once the text has been HTML-escaped.
+SEARCH_PAGE_SIZE = 20
+SEARCH_RANK = 'bm25(assignments_fts, 10.0, 1.0)'
+MARK_OPEN, MARK_CLOSE = '\x02', '\x03'
+
+# The change feed ends each stream after this long (the client reconnects
+# and resumes) and sends a comment when idle, to notice closed connections.
+STREAM_SECONDS = 300
+KEEPALIVE_SECONDS = 15
+EVENT_BATCH = 500
+
+
+# Upper bound on assignments accepted by POST and DELETE /api/assignments/bulk
+MAX_BULK_ASSIGNMENTS = 1000
+DELETE_CHUNK = 500  # ids per DELETE statement
+
+
+def _normalize_employee_ids(employee_ids):
+    """Coerce the employee_ids payload field to a list of unique ints."""
+    if isinstance(employee_ids, str):
+        # if UI accidentally sent comma-separated string
+        employee_ids = employee_ids.split(',')
+    elif not isinstance(employee_ids, list):
+        return []
+    normalized = []
+    for emp_id in employee_ids:
+        try:
+            normalized.append(int(emp_id))
+        except (TypeError, ValueError):
+            continue
+    return list(dict.fromkeys(normalized))
+
+
+def _parse_assignment(data):
+    employee_ids = _normalize_employee_ids(data.get('employee_ids', []))
+    team_id = data.get('team_id')
+    return {
+        'title': data.get('title'),
+        'description': data.get('description'),
+        'due_date': data.get('due_date'),
+        'team_id': team_id,
+        'employee_ids': employee_ids,
+        'is_general': int(not employee_ids and not team_id),
+    }
+
+
+def _unmanaged_team_ids(c, user, assignments):
+    """Team ids the user is trying to target without managing them: teams
+    of other organizations for org admins, teams managed by someone else
+    for team managers."""
+    team_ids = {a['team_id'] for a in assignments if a['team_id']}
+    if not team_ids:
+        return set()
+    if user.role == 'team_manager':
+        c.execute('SELECT id FROM teams WHERE manager_id = ?', (user.id,))
+    else:
+        c.execute('SELECT id FROM teams WHERE organization_id = ?', (user.organization_id,))
+    return team_ids - {r[0] for r in c.fetchall()}
+
+
+def _insert_recipients(c, rows):
+    c.executemany('INSERT OR IGNORE INTO user_assignments (user_id, assignment_id) VALUES (?, ?)', rows)
+
+
+def _id_list(ids):
+    # employee_ids comes from group_concat()
+    return [int(x) for x in ids.split(',')] if ids else []
+
+
+def _list_item(fields, row):
+    item = dict(zip(fields, row))
+    if 'employee_ids' in item:
+        item['employee_ids'] = _id_list(item['employee_ids'])
+    return item
+
+
+def _create_assignments(conn, assignments):
+    """Insert assignments for the current user and enqueue their fan-out
+    job; returns (assignment ids, job id). A retry with the same
+    Idempotency-Key gets those of the original request instead."""
+    c = conn.cursor()
+    key = _idempotency_key()
+    job = jobs.find(c, key) if key else None
+    if job is None:
+        assignment_ids = _insert_assignments(c, g.user.id, assignments)
+        job_id, created = jobs.enqueue(c, 'assignment_fanout', {'assignment_ids': assignment_ids},
+                                       idempotency_key=key, created_by=g.user.id)
+        if created:
+            changefeed.record(c, 'created', assignment_ids)
+            bump_version(c, 'assignments')
+            conn.commit()
+            changefeed.notify()
+            jobs.notify()
+            return assignment_ids, job_id
+        # A concurrent request with the same key got there first
+        conn.rollback()
+        job = jobs.get(c, job_id)
+    return job['payload']['assignment_ids'], job['id']
+
+
+def _list_fields(value):
+    """The list fields requested by ?fields= (always with the id); returns
+    (fields, error message)."""
+    fields = [f.strip() for f in value.split(',') if f.strip()] if value else DEFAULT_LIST_FIELDS
+    unknown = [f for f in fields if f not in LIST_FIELDS]
+    if unknown:
+        return None, f'Unknown fields: {", ".join(unknown)}'
+    return (fields if 'id' in fields else ['id'] + fields), None
+
+
+def _add_list_filters(args, conditions, params):
+    """The optional filters of the assignment list, from query args."""
+    team_id = args.get('team_id', type=int)
+    if team_id is not None:
+        conditions.append('a.team_id = ?')
+        params.append(team_id)
+    is_general = args.get('is_general')
+    if is_general is not None:
+        conditions.append('a.is_general = ?')
+        params.append(int(is_general.lower() in ('1', 'true')))
+    created_by = args.get('created_by', type=int)
+    if created_by is not None:
+        conditions.append('a.created_by_id = ?')
+        params.append(created_by)
+    if args.get('due_before'):
+        conditions.append('a.due_date < ?')
+        params.append(args['due_before'])
+    if args.get('due_after'):
+        conditions.append('a.due_date > ?')
+        params.append(args['due_after'])
+
+
+def _bulk_items(data, key, label):
+    """The list in a bulk payload (`data` itself or data[key]); returns
+    (items, error message)."""
+    items = data.get(key) if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return None, f'A non-empty list of {label} is required'
+    if len(items) > MAX_BULK_ASSIGNMENTS:
+        return None, f'At most {MAX_BULK_ASSIGNMENTS} assignments per request'
+    return items, None
+
+
+def _fts_query(text):
+    """Free text to an FTS5 query: every word must match, the last one
+    also as a prefix (so results show up while typing)."""
+    words = re.findall(r'\w+', text or '')
+    if not words:
+        return None
+    return ' '.join(f'"{w}"' for w in words) + '*'
+
+
+def _highlighted(text):
+    return html.escape(text or '').replace(MARK_OPEN, '<mark>').replace(MARK_CLOSE, '</mark>')
+
+
+def _insert_assignments(c, user_id, assignments):
+    """Insert parsed assignments and their explicit recipients; returns the
+    new ids.
+
+    Recipient rows for the whole batch go through a single executemany, as
+    do the visibility refreshes. Team assignments get their visibility from
+    the assignment_fanout job instead, since a team can be large. The
+    caller owns the transaction.
+    """
+    assignment_ids, recipient_rows = [], []
+    for a in assignments:
+        c.execute('INSERT INTO assignments (title, description, created_by_id, due_date, is_general, team_id) '
+                  'VALUES (?, ?, ?, ?, ?, ?)',
+                  (a['title'], a['description'], user_id, a['due_date'], a['is_general'], a['team_id']))
+        assignment_id = c.lastrowid
+        assignment_ids.append(assignment_id)
+        recipient_rows.extend((emp_id, assignment_id) for emp_id in a['employee_ids'])
+
+    _insert_recipients(c, recipient_rows)
+    visibility.refresh_assignments(c, [i for i, a in zip(assignment_ids, assignments) if not a['team_id']])
+    return assignment_ids
+
+
+@jobs.handler('assignment_fanout')
+def _fan_out(conn, payload):
+    """After new assignments are committed: team members' visibility rows,
+    then emails to everyone who can see them. Safe to run again."""
+    assignment_ids = payload['assignment_ids']
+    c = conn.cursor()
+    marks = ','.join('?' * len(assignment_ids))
+    c.execute(f'SELECT id FROM assignments WHERE id IN ({marks}) AND team_id IS NOT NULL', assignment_ids)
+    team_assignment_ids = [r[0] for r in c.fetchall()]
+    if team_assignment_ids:
+        visibility.refresh_assignments(c, team_assignment_ids)
+        # Members now see them: tell their streams
+        changefeed.record(c, 'updated', team_assignment_ids)
+        bump_version(c, 'assignments')
+        conn.commit()
+        changefeed.notify()
+
+    mailer = notifications.get_mailer()
+    emails = sum(notifications.notify_assignment(conn, mailer, a) for a in assignment_ids)
+    return {'assignments': len(assignment_ids), 'emails_sent': emails}
+
+
+def delete_assignments(c, assignment_ids):
+    """Delete assignments with everything that belongs to them (recipients,
+    visibility, submissions, uploads: ON DELETE CASCADE) and log it for the
+    change feed. Returns the ids that existed; the caller commits, e.g.
+    through blobstore.collect_garbage()."""
+    deleted = []
+    for i in range(0, len(assignment_ids), DELETE_CHUNK):
+        chunk = assignment_ids[i:i + DELETE_CHUNK]
+        changefeed.record_deletions(c, chunk)
+        c.execute(f"DELETE FROM assignments WHERE id IN ({','.join('?' * len(chunk))}) RETURNING id", chunk)
+        deleted.extend(r[0] for r in c.fetchall())
+    if deleted:
+        bump_version(c, 'assignments')
+    return deleted
+
+
+def _idempotency_key():
+    key = request.headers.get('Idempotency-Key')
+    return f'assignments:{g.user.id}:{key}' if key else None
+
+
+def _accepted(body, job_id):
+    body['job_id'] = job_id
+    return jsonify(body), 202, {'Location': f'/api/jobs/{job_id}'}
+
+
+def _manageable(c, assignment_ids):
+    """The ids among `assignment_ids` that the user may change or delete."""
+    condition, params = visibility.manage_condition(g.user.role, g.user.id, g.user.organization_id)
+    manageable = []
+    for i in range(0, len(assignment_ids), DELETE_CHUNK):
+        chunk = assignment_ids[i:i + DELETE_CHUNK]
+        c.execute(f"SELECT a.id FROM assignments a WHERE a.id IN ({','.join('?' * len(chunk))}) AND {condition}",
+                  chunk + params)
+        manageable.extend(r[0] for r in c.fetchall())
+    return sorted(manageable)
 
-UPLOAD_FOLDER = 'backend/uploads'
 
 def init_assignment_routes(app):
-    if not os.path.exists(UPLOAD_FOLDER):
-        os.makedirs(UPLOAD_FOLDER)
-    app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+    app.config.setdefault('UPLOAD_FOLDER', UPLOAD_FOLDER)
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    app.config.setdefault('CHANGEFEED_STREAM_SECONDS', STREAM_SECONDS)
+    app.config.setdefault('CHANGEFEED_KEEPALIVE_SECONDS', KEEPALIVE_SECONDS)
+    app.extensions['changefeed'] = changefeed.ChangeFeed(app.config['DATABASE'], app.config['DB_CONNECTION_FACTORY'])
 
     def _get_employee_ids_for_assignment(c, assignment_id):
         c.execute('SELECT user_id FROM user_assignments WHERE assignment_id = ?', (assignment_id,))
@@ -18,151 +288,101 @@ def init_assignment_routes(app):
         return [r[0] for r in rows]
 
     # ---------------- CREATE ASSIGNMENT ----------------
+    # The assignment and its explicit recipients are written right away;
+    # team visibility and notification emails are left to a background job
+    # (202, with the job in Location). Retries that send the same
+    # Idempotency-Key get the original response instead of a duplicate.
     @app.route('/api/assignments', methods=['POST'])
     @role_required(['org_admin', 'team_manager'])
     def create_assignment():
-        data = request.get_json()
-        title = data.get('title')
-        description = data.get('description')
-        due_date = data.get('due_date')
-        employee_ids = data.get('employee_ids', [])
-        team_id = data.get('team_id')
-
-        # normalize employee_ids to list of ints
-        if isinstance(employee_ids, str):
-            # if UI accidentally sent comma-separated string
-            employee_ids = [int(x) for x in employee_ids.split(',') if x.strip().isdigit()]
-        elif not isinstance(employee_ids, list):
-            employee_ids = []
-
-        conn = sqlite3.connect('database.db')
-        c = conn.cursor()
-        c.execute('SELECT id, role FROM users WHERE email = ?', (session.get('email'),))
-        user = c.fetchone()
-        if not user:
-            conn.close()
-            return jsonify({'message': 'User not found'}), 404
+        assignment = _parse_assignment(request.get_json())
 
-        user_id, user_role = user[0], user[1]
+        conn = get_db()
+        c = conn.cursor()
 
         # Team manager check
-        if team_id and user_role == 'team_manager':
-            c.execute('SELECT manager_id FROM teams WHERE id = ?', (team_id,))
-            manager = c.fetchone()
-            if not manager or manager[0] != user_id:
-                conn.close()
-                return jsonify({'message': 'Unauthorized: Not manager of this team'}), 403
-
-        is_general = not employee_ids and not team_id
-
-        c.execute('INSERT INTO assignments (title, description, created_by_id, due_date, is_general, team_id) VALUES (?, ?, ?, ?, ?, ?)',
-                  (title, description, user_id, due_date, int(is_general), team_id))
-        assignment_id = c.lastrowid
+        if _unmanaged_team_ids(c, g.user, [assignment]):
+            return jsonify({'message': 'Unauthorized: Not manager of this team'}), 403
 
-        # Insert employee assignments if any
-        if employee_ids:
-            for emp_id in employee_ids:
-                try:
-                    emp_int = int(emp_id)
-                except Exception:
-                    continue
-                c.execute('INSERT INTO user_assignments (user_id, assignment_id) VALUES (?, ?)',
-                          (emp_int, assignment_id))
-
-        conn.commit()
-        conn.close()
-        return jsonify({'message': 'Assignment created successfully!', 'assignment_id': assignment_id}), 201
+        assignment_ids, job_id = _create_assignments(conn, [assignment])
+        return _accepted({'message': 'Assignment created successfully!', 'assignment_id': assignment_ids[0]}, job_id)
 
     # ---------------- GET ALL ASSIGNMENTS ----------------
     @app.route('/api/assignments', methods=['GET'])
+    @login_required
+    @etag_cached('assignments')
     def get_assignments():
-        if 'email' not in session:
-            return jsonify({'message': 'Unauthorized'}), 401
-
-        conn = sqlite3.connect('database.db')
+        conn = get_db()
         c = conn.cursor()
-        c.execute('SELECT id, role FROM users WHERE email = ?', (session['email'],))
-        user = c.fetchone()
-        if not user:
-            conn.close()
-            return jsonify({'message': 'User not found'}), 404
-
-        user_id, role = user[0], user[1]
-
-        # Fetch assignments based on role
-        if role == 'org_admin':
-            c.execute('SELECT * FROM assignments')
-            assignments = c.fetchall()
-        elif role == 'team_manager':
-            c.execute('''
-                SELECT a.* FROM assignments a
-                LEFT JOIN teams t ON a.team_id = t.id
-                WHERE a.is_general = 1 OR t.manager_id = ?
-            ''', (user_id,))
-            assignments = c.fetchall()
-        else:  # employee
-            c.execute('''
-                SELECT DISTINCT a.* FROM assignments a
-                LEFT JOIN user_assignments ua ON a.id = ua.assignment_id
-                LEFT JOIN team_members tm ON a.team_id = tm.team_id
-                WHERE a.is_general = 1 OR ua.user_id = ? OR tm.user_id = ?
-            ''', (user_id, user_id))
-            assignments = c.fetchall()
-
-        assignments_list = []
-        for a in assignments:
-            aid = a[0]
-            employee_ids = _get_employee_ids_for_assignment(c, aid)
-            assignments_list.append({
-                'id': aid,
-                'title': a[1],
-                'description': a[2],
-                'due_date': a[3],
-                'is_general': a[4],
-                'team_id': a[5],
-                'employee_ids': employee_ids
-            })
-        conn.close()
-        return jsonify({'assignments': assignments_list}), 200
+        user_id, role = g.user.id, g.user.role
+
+        fields, error = _list_fields(request.args.get('fields'))
+        if error:
+            return jsonify({'message': error}), 400
+
+        limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+        # Visibility based on role
+        condition, params = visibility.list_condition(role, user_id)
+        conditions = [condition]
+
+        _add_list_filters(request.args, conditions, params)
+
+        cursor = request.args.get('cursor')
+        if cursor:
+            position = decode_cursor(cursor)
+            if position is None:
+                return jsonify({'message': 'Invalid cursor'}), 400
+            due_key, last_id = position
+            # Spelled out (rather than a row-value comparison) so SQLite can
+            # seek into the index on the leading column.
+            conditions.append(f'{DUE_KEY} >= ? AND ({DUE_KEY} > ? OR a.id > ?)')
+            params.extend([due_key, due_key, last_id])
+
+        where = ' AND '.join(conditions)
+        columns = ', '.join(LIST_FIELDS[f] for f in fields)
+        # One row more than requested tells us whether there is a next page
+        c.execute(f'''
+            SELECT {columns}, {DUE_KEY}
+            FROM assignments a
+            WHERE {where}
+            ORDER BY {DUE_KEY}, a.id
+            LIMIT ?
+        ''', params + [limit + 1])
+        assignments = c.fetchall()
+
+        next_cursor = None
+        if len(assignments) > limit:
+            assignments = assignments[:limit]
+            next_cursor = encode_cursor(assignments[-1][-1], assignments[-1][0])
+
+        if 'employee_ids' in fields:
+            i = fields.index('employee_ids')
+            assignments = [row[:i] + (_id_list(row[i]),) + row[i + 1:] for row in assignments]
+        return rows_response('assignments', fields, assignments, next_cursor=next_cursor)
 
     # ---------------- GET SINGLE ASSIGNMENT ----------------
     @app.route('/api/assignments/<int:assignment_id>', methods=['GET'])
+    @login_required
+    @etag_cached('assignments')
     def get_assignment(assignment_id):
-        if 'email' not in session:
-            return jsonify({'message': 'Unauthorized'}), 401
-
-        conn = sqlite3.connect('database.db')
+        conn = get_db()
         c = conn.cursor()
-        c.execute('SELECT id, role FROM users WHERE email = ?', (session['email'],))
-        user = c.fetchone()
-        if not user:
-            conn.close()
-            return jsonify({'message': 'User not found'}), 404
-
-        user_id, role = user[0], user[1]
+        user_id, role = g.user.id, g.user.role
 
         c.execute('SELECT * FROM assignments WHERE id = ?', (assignment_id,))
         assignment = c.fetchone()
         if not assignment:
-            conn.close()
             return jsonify({'message': 'Assignment not found'}), 404
 
-        is_general = assignment[4]
-        team_id = assignment[5]
-
         # Employee access check
         if role == 'employee':
-            c.execute('SELECT 1 FROM user_assignments WHERE user_id = ? AND assignment_id = ?', (user_id, assignment_id))
-            ua = c.fetchone()
-            c.execute('SELECT 1 FROM team_members WHERE user_id = ? AND team_id = ?', (user_id, team_id))
-            tm = c.fetchone()
-            if not is_general and not ua and not tm:
-                conn.close()
+            if not visibility.can_view(c, user_id, assignment_id):
                 return jsonify({'message': 'Unauthorized: Cannot access this assignment'}), 403
 
         employee_ids = _get_employee_ids_for_assignment(c, assignment_id)
 
-        conn.close()
         return jsonify({'assignment': {
             'id': assignment[0],
             'title': assignment[1],
@@ -174,56 +394,311 @@ def init_assignment_routes(app):
         }}), 200
 
     # ---------------- UPDATE ASSIGNMENT ----------------
-    @app.route('/api/assignments/<int:assignment_id>', methods=['PUT'])
+    # PUT replaces the assignment (missing fields are cleared), PATCH only
+    # touches the fields present in the payload. Either way, recipients are
+    # diffed against the stored ones and only changed rows are written.
+    # Only those who manage the assignment (visibility.manage_condition)
+    # may change it, and only to a team they manage.
+    @app.route('/api/assignments/<int:assignment_id>', methods=['PUT', 'PATCH'])
     @role_required(['org_admin', 'team_manager'])
     def update_assignment(assignment_id):
         data = request.get_json()
-        title = data.get('title')
-        description = data.get('description')
-        due_date = data.get('due_date')
-        employee_ids = data.get('employee_ids', [])
-        team_id = data.get('team_id', None)
-
-        # normalize employee_ids to list of ints
-        if isinstance(employee_ids, str):
-            employee_ids = [int(x) for x in employee_ids.split(',') if x.strip().isdigit()]
-        elif not isinstance(employee_ids, list):
-            employee_ids = []
-
-        is_general = not employee_ids and not team_id
-
-        conn = sqlite3.connect('database.db')
+        if request.method == 'PUT':
+            data = {
+                'title': data.get('title'),
+                'description': data.get('description'),
+                'due_date': data.get('due_date'),
+                'employee_ids': data.get('employee_ids', []),
+                'team_id': data.get('team_id', None),
+            }
+
+        conn = get_db()
         c = conn.cursor()
-        c.execute('UPDATE assignments SET title = ?, description = ?, due_date = ?, is_general = ?, team_id = ? WHERE id = ?',
-                  (title, description, due_date, int(is_general), team_id, assignment_id))
-
-        # Clear old user assignments
-        c.execute('DELETE FROM user_assignments WHERE assignment_id = ?', (assignment_id,))
-        if employee_ids:
-            for emp_id in employee_ids:
-                try:
-                    emp_int = int(emp_id)
-                except Exception:
-                    continue
-                c.execute('INSERT INTO user_assignments (user_id, assignment_id) VALUES (?, ?)',
-                          (emp_int, assignment_id))
-
+        # Under the write lock, so what was checked is what gets changed
+        if not conn.in_transaction:
+            c.execute('BEGIN IMMEDIATE')
+        c.execute('SELECT is_general, team_id FROM assignments WHERE id = ?', (assignment_id,))
+        current = c.fetchone()
+        if not current:
+            conn.rollback()
+            return jsonify({'message': 'Assignment not found'}), 404
+        if not _manageable(c, [assignment_id]):
+            conn.rollback()
+            return jsonify({'message': 'Unauthorized: Cannot change this assignment'}), 403
+        if 'team_id' in data and _unmanaged_team_ids(c, g.user, [data]):
+            conn.rollback()
+            return jsonify({'message': 'Unauthorized: Not manager of this team'}), 403
+
+        old_is_general, old_team_id = current
+        updates = {f: data[f] for f in ('title', 'description', 'due_date', 'team_id') if f in data}
+
+        added = removed = ()
+        if 'employee_ids' in data:
+            employee_ids = set(_normalize_employee_ids(data['employee_ids']))
+            c.execute('SELECT user_id FROM user_assignments WHERE assignment_id = ?', (assignment_id,))
+            current_ids = {r[0] for r in c.fetchall()}
+            added, removed = employee_ids - current_ids, current_ids - employee_ids
+            has_recipients = bool(employee_ids)
+        elif 'team_id' in data:
+            c.execute('SELECT 1 FROM user_assignments WHERE assignment_id = ? LIMIT 1', (assignment_id,))
+            has_recipients = c.fetchone() is not None
+
+        if 'employee_ids' in data or 'team_id' in data:
+            team_id = updates.get('team_id', old_team_id)
+            updates['is_general'] = int(not has_recipients and not team_id)
+
+        # Skip the UPDATE entirely when nothing on the row itself changes
+        if updates and updates != {'is_general': old_is_general}:
+            assignments_set = ', '.join(f'{f} = ?' for f in updates)
+            c.execute(f'UPDATE assignments SET {assignments_set} WHERE id = ?',
+                      list(updates.values()) + [assignment_id])
+
+        if removed:
+            c.executemany('DELETE FROM user_assignments WHERE user_id = ? AND assignment_id = ?',
+                          [(emp_id, assignment_id) for emp_id in removed])
+        if added:
+            _insert_recipients(c, [(emp_id, assignment_id) for emp_id in added])
+
+        if updates.get('is_general', old_is_general) != old_is_general \
+                or updates.get('team_id', old_team_id) != old_team_id:
+            visibility.refresh_assignment(c, assignment_id)
+        elif added or removed:
+            visibility.apply_recipient_changes(c, assignment_id, added, removed)
+
+        changefeed.record(c, 'updated', [assignment_id])
+        bump_version(c, 'assignments')
         conn.commit()
-        conn.close()
+        changefeed.notify()
         return jsonify({'message': 'Assignment updated successfully!'}), 200
 
     # ---------------- DELETE ASSIGNMENT ----------------
     @app.route('/api/assignments/<int:assignment_id>', methods=['DELETE'])
     @role_required(['org_admin', 'team_manager'])
     def delete_assignment(assignment_id):
-        conn = sqlite3.connect('database.db')
+        conn = get_db()
         c = conn.cursor()
-        # Remove submissions first
-        c.execute('DELETE FROM submissions WHERE assignment_id = ?', (assignment_id,))
-        # Remove user_assignments
-        c.execute('DELETE FROM user_assignments WHERE assignment_id = ?', (assignment_id,))
-        # Remove assignment
-        c.execute('DELETE FROM assignments WHERE id = ?', (assignment_id,))
-        conn.commit()
-        conn.close()
+        # Under the write lock, so what was checked is what gets deleted
+        if not conn.in_transaction:
+            c.execute('BEGIN IMMEDIATE')
+        c.execute('SELECT 1 FROM assignments WHERE id = ?', (assignment_id,))
+        if not c.fetchone():
+            conn.rollback()
+            return jsonify({'message': 'Assignment not found'}), 404
+        if not _manageable(c, [assignment_id]):
+            conn.rollback()
+            return jsonify({'message': 'Unauthorized: Cannot delete this assignment'}), 403
+        delete_assignments(c, [assignment_id])
+        # Commits, and drops the files no other submission shares
+        blobstore.collect_garbage(conn, shards.upload_root())
+        changefeed.notify()
         return jsonify({'message': 'Assignment deleted successfully!'}), 200
+
+    _init_bulk_routes(app)
+    _init_search_routes(app)
+    _init_event_routes(app)
+
+
+def _init_bulk_routes(app):
+    # ---------------- BULK CREATE ASSIGNMENTS ----------------
+    @app.route('/api/assignments/bulk', methods=['POST'])
+    @role_required(['org_admin', 'team_manager'])
+    def create_assignments_bulk():
+        items, error = _bulk_items(request.get_json(), 'assignments', 'assignments')
+        if error:
+            return jsonify({'message': error}), 400
+        if not all(isinstance(item, dict) and item.get('title') for item in items):
+            return jsonify({'message': 'Every assignment needs a title'}), 400
+
+        assignments = [_parse_assignment(item) for item in items]
+
+        conn = get_db()
+        c = conn.cursor()
+
+        unmanaged = _unmanaged_team_ids(c, g.user, assignments)
+        if unmanaged:
+            return jsonify({'message': 'Unauthorized: Not manager of teams ' + ', '.join(map(str, sorted(unmanaged)))}), 403
+
+        assignment_ids, job_id = _create_assignments(conn, assignments)
+        return _accepted({'message': f'{len(assignment_ids)} assignments created successfully!',
+                          'assignment_ids': assignment_ids}, job_id)
+
+    # ---------------- BULK DELETE ASSIGNMENTS ----------------
+    # Deletes those of the ids the user may delete (see
+    # visibility.manage_condition); the others, missing or not theirs, are
+    # reported back as skipped_ids.
+    @app.route('/api/assignments/bulk', methods=['DELETE'])
+    @role_required(['org_admin', 'team_manager'])
+    def delete_assignments_bulk():
+        ids, error = _bulk_items(request.get_json(silent=True), 'ids', 'assignment ids')
+        if error:
+            return jsonify({'message': error}), 400
+        try:
+            ids = sorted({int(i) for i in ids})
+        except (TypeError, ValueError):
+            return jsonify({'message': 'Assignment ids must be integers'}), 400
+
+        conn = get_db()
+        c = conn.cursor()
+        if not conn.in_transaction:
+            c.execute('BEGIN IMMEDIATE')
+        deleted = delete_assignments(c, _manageable(c, ids))
+        blobstore.collect_garbage(conn, shards.upload_root())
+        changefeed.notify()
+        deleted_set = set(deleted)
+        return jsonify({'message': f'{len(deleted)} assignments deleted successfully!',
+                        'deleted_ids': deleted,
+                        'skipped_ids': [i for i in ids if i not in deleted_set]}), 200
+
+
+def _init_search_routes(app):
+    # ---------------- SEARCH ASSIGNMENTS ----------------
+    # Ranked full-text search over the titles and descriptions of the
+    # assignments the user can list, with highlighted titles and snippets.
+    # Paginated like the list, with the cursor on (rank, id).
+    @app.route('/api/assignments/search', methods=['GET'])
+    @login_required
+    @etag_cached('assignments')
+    def search_assignments():
+        match = _fts_query(request.args.get('q'))
+        if match is None:
+            return jsonify({'message': 'A search query (q) is required'}), 400
+        limit = request.args.get('limit', SEARCH_PAGE_SIZE, type=int)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+        condition, params = visibility.list_condition(g.user.role, g.user.id)
+        conditions = ['assignments_fts MATCH ?', condition]
+        params = [match] + params
+        cursor = request.args.get('cursor')
+        if cursor:
+            position = decode_cursor(cursor, (int, float))
+            if position is None:
+                return jsonify({'message': 'Invalid cursor'}), 400
+            last_rank, last_id = position
+            conditions.append(f'({SEARCH_RANK} > ? OR ({SEARCH_RANK} = ? AND a.id > ?))')
+            params.extend([last_rank, last_rank, last_id])
+
+        c = get_db().cursor()
+        c.execute(f'''
+            SELECT a.id, a.title, a.description, a.due_date, a.is_general, a.team_id,
+                   highlight(assignments_fts, 0, ?, ?),
+                   snippet(assignments_fts, 1, ?, ?, '…', 16),
+                   {SEARCH_RANK}
+            FROM assignments_fts
+            JOIN assignments a ON a.id = assignments_fts.rowid
+            WHERE {' AND '.join(conditions)}
+            ORDER BY {SEARCH_RANK}, a.id
+            LIMIT ?
+        ''', [MARK_OPEN, MARK_CLOSE, MARK_OPEN, MARK_CLOSE] + params + [limit + 1])
+        rows = c.fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][-1], rows[-1][0])
+
+        results = [{
+            'id': r[0],
+            'title': r[1],
+            'description': r[2],
+            'due_date': r[3],
+            'is_general': r[4],
+            'team_id': r[5],
+            'title_highlight': _highlighted(r[6]),
+            'snippet': _highlighted(r[7]),
+            'rank': r[8],
+        } for r in rows]
+        return jsonify({'results': results, 'next_cursor': next_cursor}), 200
+
+
+def _resume_point(c, since):
+    """Where a change feed resumes for a client that saw events up to `since`
+    (None for a new client); returns (event id, whether it must reload)."""
+    latest = changefeed.latest_event_id(c)
+    if since is None:
+        return latest, False
+    # Events after `since` were pruned: the client must reload
+    oldest = changefeed.oldest_event_id(c)
+    if since < (oldest - 1 if oldest is not None else latest):
+        return latest, True
+    return since, False
+
+
+def _event_stream(feed, fetch, since, reset, fields, stream_seconds, keepalive):
+    """The Server-Sent Events of a change feed; fetch(last_id) returns the
+    next batch of (event id, kind, assignment id, *fields) rows."""
+    last_id = since
+    yield 'retry: 3000\n\n'
+    if reset:
+        yield f'id: {last_id}\nevent: reset\ndata: {{}}\n\n'
+    deadline = time.monotonic() + stream_seconds
+    while True:
+        seq = feed.seq
+        rows = fetch(last_id)
+        for row in rows:
+            event_id, kind, assignment_id = row[:3]
+            data = {'id': assignment_id} if kind == 'deleted' else _list_item(fields, row[3:])
+            yield f'id: {event_id}\nevent: {kind}\ndata: {json.dumps(data)}\n\n'
+            last_id = event_id
+        if len(rows) == EVENT_BATCH:
+            continue
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        if feed.wait(seq, min(keepalive, remaining)) == seq:
+            yield ': keepalive\n\n'
+
+
+def _init_event_routes(app):
+    # ---------------- ASSIGNMENT CHANGE FEED ----------------
+    # Server-Sent Events: one created/updated/deleted event per change to an
+    # assignment the user can list, carrying its list fields (only the id
+    # for deletions, which go to those who could list it before). Event ids
+    # are resume tokens: browsers send them back as Last-Event-ID on
+    # reconnect, other clients can pass ?since=<id>.
+    @app.route('/api/assignments/events', methods=['GET'])
+    @login_required
+    def assignment_events():
+        feed = app.extensions['changefeed']
+        since = request.headers.get('Last-Event-ID') or request.args.get('since')
+        try:
+            since = int(since) if since is not None else None
+        except ValueError:
+            return jsonify({'message': 'Invalid event id'}), 400
+
+        since, reset = _resume_point(get_db().cursor(), since)
+
+        db_path = database_path()
+        if not feed.open_stream(db_path):
+            return jsonify({'message': 'Too many open event streams, poll instead'}), 503, {'Retry-After': '30'}
+
+        deleted, params = changefeed.deleted_condition(g.user.role, g.user.id, g.user.organization_id)
+        condition, list_params = visibility.list_condition(g.user.role, g.user.id)
+        params += list_params
+        fields = DEFAULT_LIST_FIELDS
+        columns = ', '.join(LIST_FIELDS[f] for f in fields)
+        sql = f'''
+            SELECT e.id, e.kind, e.assignment_id, {columns}
+            FROM assignment_events e
+            LEFT JOIN assignments a ON a.id = e.assignment_id
+            WHERE e.id > ? AND ((e.kind = 'deleted' AND {deleted})
+                                OR (e.kind != 'deleted' AND a.id IS NOT NULL AND {condition}))
+            ORDER BY e.id
+            LIMIT {EVENT_BATCH}
+        '''
+        # The stream outlives the request, so it borrows pooled connections itself
+        pool = get_pool(db_path, app.config['DB_CONNECTION_FACTORY'])
+        stream_seconds = app.config['CHANGEFEED_STREAM_SECONDS']
+        keepalive = app.config['CHANGEFEED_KEEPALIVE_SECONDS']
+
+        def fetch(last_id):
+            conn = pool.acquire()
+            try:
+                return conn.execute(sql, [last_id] + params).fetchall()
+            finally:
+                pool.release(conn)
+
+        events = _event_stream(feed, fetch, since, reset, fields, stream_seconds, keepalive)
+        response = Response(events, mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        response.call_on_close(lambda: feed.close_stream(db_path))
+        return response
@@ -1,17 +1,125 @@
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
 from functools import wraps
-from flask import session, jsonify
+from flask import current_app, g, session, jsonify
+from .db import get_db
+
+# The logged-in user, as seen by handlers through g.user.
+Principal = namedtuple('Principal', ['id', 'email', 'role', 'organization_id'])
+
+# Roles treated as administrators (session['is_admin'] at login)
+ADMIN_ROLES = ['org_admin', 'super_admin']
+
+PRINCIPAL_TTL = 30  # seconds
+PRINCIPAL_CACHE_SIZE = 4096
+
+
+class PrincipalCache:
+    """Small LRU of Principal by user id with a per-entry TTL.
+
+    No request handler changes a user's role or organization or deletes
+    users; whatever does (e.g. make_admin.py) reaches every worker through
+    an epoch file next to the database: bumping its mtime with
+    touch_principal_epoch() empties all caches on their next lookup.
+    """
+
+    def __init__(self, ttl=PRINCIPAL_TTL, size=PRINCIPAL_CACHE_SIZE):
+        self.ttl = ttl
+        self.size = size
+        self._entries = OrderedDict()
+        self._epoch = None
+        self._lock = threading.Lock()
+
+    def get(self, user_id, epoch):
+        with self._lock:
+            if epoch != self._epoch:
+                self._entries.clear()
+                self._epoch = epoch
+                return None
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            principal, expires = entry
+            if expires < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return principal
+
+    def put(self, principal):
+        with self._lock:
+            self._entries[principal.id] = (principal, time.monotonic() + self.ttl)
+            self._entries.move_to_end(principal.id)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+
+def _principal_cache():
+    # One cache per app, so apps on different databases never mix users
+    return current_app.extensions.setdefault('principal_cache', PrincipalCache())
+
+
+def principal_epoch_path(db_path):
+    return db_path + '.principals'
+
+
+def _principal_epoch():
+    try:
+        return os.stat(principal_epoch_path(current_app.config['DATABASE'])).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def touch_principal_epoch(db_path):
+    """Tell every worker to drop its cached principals."""
+    with open(principal_epoch_path(db_path), 'a'):
+        os.utime(principal_epoch_path(db_path))
+
+
+def load_principal():
+    """Resolve the logged-in user once per request; also stored as g.user.
+
+    Returns None when nobody is logged in or the user no longer exists.
+    """
+    if 'user' in g:
+        return g.user
+    principal = None
+    user_id = session.get('user_id')
+    if user_id is not None:
+        cache = _principal_cache()
+        principal = cache.get(user_id, _principal_epoch())
+        if principal is None:
+            row = get_db().execute('SELECT id, email, role, organization_id FROM users WHERE id = ?',
+                                   (user_id,)).fetchone()
+            if row:
+                principal = Principal(*row)
+                cache.put(principal)
+    g.user = principal
+    return principal
+
 
 def role_required(allowed_roles):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            if 'role' not in session:
+            user = load_principal()
+            if user is None:
                 return jsonify({'message': 'Unauthorized: No role found in session'}), 401
-            
-            user_role = session['role']
-            if user_role not in allowed_roles:
+
+            if user.role not in allowed_roles:
                 return jsonify({'message': f'Unauthorized: Access restricted to {", ".join(allowed_roles)}'}), 403
-            
+
             return f(*args, **kwargs)
         return decorated_function
     return decorator
+
+
+def login_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if load_principal() is None:
+            return jsonify({'message': 'Unauthorized'}), 401
+        return f(*args, **kwargs)
+    return decorated_function
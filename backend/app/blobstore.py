@@ -0,0 +1,121 @@
+# backend/app/blobstore.py
+#
+# Content-addressed storage for submission files. Each distinct file is
+# stored once under <upload folder>/blobs/ab/cd/<sha256> and has a row in
+# `blobs`. The refcount column is maintained by triggers on `submissions`,
+# so any insert or delete of a submission row (including the ones done by
+# delete_assignment) keeps it right; unreferenced blobs are removed by
+# collect_garbage().
+#
+# File operations happen while the caller holds SQLite's write lock (after
+# its first write in the transaction), so a blob can never be removed by
+# one request while another one is adopting it.
+#
+#   python -m app.blobstore gc [--db ...] [--uploads ...]
+# also sweeps files left behind without a row (e.g. after a crash).
+import argparse
+import os
+import sys
+
+
+def blob_path(upload_root, sha256):
+    return os.path.join(upload_root, 'blobs', sha256[:2], sha256[2:4], sha256)
+
+
+def _fsync_dir(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def exists(c, upload_root, sha256):
+    c.execute('SELECT 1 FROM blobs WHERE sha256 = ?', (sha256,))
+    return c.fetchone() is not None and os.path.exists(blob_path(upload_root, sha256))
+
+
+def store(c, upload_root, tmp_path, sha256, size):
+    """Adopt a complete, fsynced temp file as the blob for `sha256`.
+
+    If the blob is already stored the temp file is simply dropped. Returns
+    the blob's path; the caller then inserts the submission row (which
+    takes the reference) and commits.
+    """
+    path = blob_path(upload_root, sha256)
+    # Take the write lock before looking at the file system
+    c.execute('INSERT OR IGNORE INTO blobs (sha256, size) VALUES (?, ?)', (sha256, size))
+    if os.path.exists(path):
+        os.remove(tmp_path)
+    else:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        os.replace(tmp_path, path)
+        _fsync_dir(directory)
+    return path
+
+
+def collect_garbage(conn, upload_root):
+    """Delete blobs nobody references any more, then commit.
+
+    Doomed files are renamed aside before the commit and only unlinked
+    after it, so a failed commit can put them back.
+    """
+    c = conn.cursor()
+    c.execute('DELETE FROM blobs WHERE refcount <= 0 RETURNING sha256')
+    doomed = [blob_path(upload_root, r[0]) for r in c.fetchall()]
+    trashed = []
+    try:
+        for path in doomed:
+            if os.path.exists(path):
+                os.replace(path, path + '.trash')
+                trashed.append(path)
+        conn.commit()
+    except Exception:
+        for path in trashed:
+            os.replace(path + '.trash', path)
+        raise
+    for path in trashed:
+        os.remove(path + '.trash')
+    return len(doomed)
+
+
+def sweep_orphans(conn, upload_root):
+    """Remove blob files that have no row in `blobs`."""
+    root = os.path.join(upload_root, 'blobs')
+    c = conn.cursor()
+    removed = 0
+    for directory, _, files in os.walk(root):
+        for name in files:
+            c.execute('SELECT 1 FROM blobs WHERE sha256 = ?', (name.removesuffix('.trash'),))
+            if name.endswith('.trash') or c.fetchone() is None:
+                os.remove(os.path.join(directory, name))
+                removed += 1
+    return removed
+
+
+def main(argv=None):
+    from .db import connect
+    from .db_setup import DB_PATH
+    from .assignment_routes import UPLOAD_FOLDER
+
+    parser = argparse.ArgumentParser(description='Garbage-collect the submission blob store.')
+    parser.add_argument('command', choices=['gc'])
+    parser.add_argument('--db', default=DB_PATH, help='database file (defaults to the app database)')
+    parser.add_argument('--uploads', default=UPLOAD_FOLDER, help='upload folder (defaults to the app one)')
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    try:
+        # Take the write lock first so no upload can adopt a blob mid-sweep
+        conn.execute('BEGIN IMMEDIATE')
+        orphans = sweep_orphans(conn, args.uploads)
+        unreferenced = collect_garbage(conn, args.uploads)
+        print(f'Removed {unreferenced} unreferenced blobs and {orphans} orphaned files')
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
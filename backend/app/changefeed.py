@@ -0,0 +1,168 @@
+# backend/app/changefeed.py
+#
+# Assignment change events for the Server-Sent Events feed at
+# GET /api/assignments/events (assignment_routes.py).
+#
+# Write paths call record() inside their transaction, so every committed
+# change has a row in `assignment_events` whose id doubles as the resume
+# token (the SSE event id), and notify() after committing, which wakes the
+# streams of this process at once. Changes committed by other workers or
+# processes are noticed by a poller thread that checks the newest event id
+# every POLL_INTERVAL seconds. Events older than EVENT_RETENTION are
+# pruned; clients resuming from before that get a `reset` event and
+# should reload.
+#
+# A deleted assignment's rows are gone by the time its event is streamed,
+# so its 'deleted' event keeps who could list it: organization, team,
+# is_general and the users with visibility rows (record_deletions()).
+import threading
+import time
+from flask import current_app
+from .db import get_pool
+from .visibility import EVERYONE, ORGANIZATION_SQL
+
+POLL_INTERVAL = 1.0  # seconds
+PRUNE_INTERVAL = 3600  # seconds
+EVENT_RETENTION = '-1 day'  # SQLite datetime modifier
+MAX_STREAMS = 64  # concurrent streams per process
+
+
+def record(c, kind, assignment_ids):
+    """Log `kind` ('created' or 'updated') for the assignments; deletions
+    go through record_deletions()."""
+    c.executemany('INSERT INTO assignment_events (assignment_id, kind) VALUES (?, ?)',
+                  [(aid, kind) for aid in assignment_ids])
+
+
+def record_deletions(c, assignment_ids):
+    """Log 'deleted' for assignments about to be deleted, with what
+    deleted_condition() needs; call before deleting, in the same
+    transaction."""
+    marks = ','.join('?' * len(assignment_ids))
+    c.execute(f'''
+        INSERT INTO assignment_events (assignment_id, kind, organization_id, team_id, is_general, recipients)
+        SELECT a.id, 'deleted', {ORGANIZATION_SQL}, a.team_id, a.is_general,
+               (SELECT json_group_array(v.user_id) FROM assignment_visibility v
+                WHERE v.assignment_id = a.id AND v.user_id != {EVERYONE})
+        FROM assignments a WHERE a.id IN ({marks})
+    ''', assignment_ids)
+
+
+def deleted_condition(role, user_id, organization_id):
+    """SQL condition on 'deleted' events `e` (and its params) selecting those
+    of assignments the user could list (visibility.list_condition), within
+    their organization."""
+    if role == 'org_admin':
+        return 'e.organization_id = ?', [organization_id]
+    if role == 'team_manager':
+        return ('''(e.organization_id = ? AND (e.is_general = 1
+                    OR e.team_id IN (SELECT id FROM teams WHERE manager_id = ?)))''', [organization_id, user_id])
+    return ('''(e.organization_id = ? AND (e.is_general = 1
+                OR EXISTS (SELECT 1 FROM json_each(e.recipients) WHERE value = ?)))''', [organization_id, user_id])
+
+
+def record_team_change(c, team_id):
+    """A team's members changed, so who sees its assignments did too."""
+    c.execute('''INSERT INTO assignment_events (assignment_id, kind)
+                 SELECT id, 'updated' FROM assignments WHERE team_id = ?''', (team_id,))
+
+
+def notify():
+    """Wake this process's streams; call after committing recorded events."""
+    current_app.extensions['changefeed'].notify()
+
+
+def latest_event_id(c):
+    # sqlite_sequence still knows the last id when every event was pruned
+    row = c.execute("SELECT seq FROM sqlite_sequence WHERE name = 'assignment_events'").fetchone()
+    return row[0] if row else 0
+
+
+def oldest_event_id(c):
+    return c.execute('SELECT MIN(id) FROM assignment_events').fetchone()[0]
+
+
+class ChangeFeed:
+    """Wakes up this process's streams when new events may be available."""
+
+    def __init__(self, db_path, factory, max_streams=MAX_STREAMS):
+        self.db_path = db_path
+        self.factory = factory
+        self.max_streams = max_streams
+        self.streams = 0
+        self._paths = {}  # database file -> open streams
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._poller = None
+
+    def notify(self):
+        with self._cond:
+            self._seq += 1
+            self._cond.notify_all()
+
+    def wait(self, seq, timeout):
+        """Block until notify() was called after `seq` was observed, or
+        `timeout` passes; returns the current sequence number."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq != seq, timeout)
+            return self._seq
+
+    @property
+    def seq(self):
+        with self._cond:
+            return self._seq
+
+    def open_stream(self, db_path=None):
+        """Count a new stream on `db_path` (with sharding, each organization
+        database has its own events), or return False when full."""
+        with self._cond:
+            if self.streams >= self.max_streams:
+                return False
+            self.streams += 1
+            db_path = db_path or self.db_path
+            self._paths[db_path] = self._paths.get(db_path, 0) + 1
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll, name='changefeed-poller', daemon=True)
+                self._poller.start()
+            return True
+
+    def close_stream(self, db_path=None):
+        with self._cond:
+            self.streams -= 1
+            self._paths[db_path or self.db_path] -= 1
+
+    def _check(self, db_path, prune):
+        pool = get_pool(db_path, self.factory)
+        conn = pool.acquire()
+        try:
+            newest = latest_event_id(conn)
+            if prune:
+                conn.execute("DELETE FROM assignment_events WHERE created_at < datetime('now', ?)",
+                             (EVENT_RETENTION,))
+                conn.commit()
+            return newest
+        finally:
+            pool.release(conn)
+
+    def _poll(self):
+        last_ids = {}
+        last_prune = None
+        while True:
+            with self._cond:
+                # Sleep while nobody is listening
+                self._cond.wait_for(lambda: self.streams > 0)
+                paths = [path for path, streams in self._paths.items() if streams > 0]
+            prune = last_prune is None or time.monotonic() - last_prune >= PRUNE_INTERVAL
+            if prune:
+                last_prune = time.monotonic()
+            changed = False
+            for path in paths:
+                try:
+                    newest = self._check(path, prune)
+                except Exception:
+                    continue
+                changed |= path in last_ids and newest != last_ids[path]
+                last_ids[path] = newest
+            if changed:
+                self.notify()
+            time.sleep(POLL_INTERVAL)
@@ -0,0 +1,113 @@
+# backend/app/db.py
+import queue
+import sqlite3
+import threading
+from flask import current_app, g, has_request_context, session
+from .db_setup import DB_PATH
+
+# Applied to every connection handed out by the pool.
+PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA busy_timeout = 5000',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA foreign_keys = ON',
+)
+
+POOL_SIZE = 8
+
+
+def connect(db_path=DB_PATH, factory=sqlite3.Connection):
+    conn = sqlite3.connect(db_path, timeout=5, check_same_thread=False, factory=factory)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class ConnectionPool:
+    """Keeps up to `size` idle connections to one database file.
+
+    Connections are created lazily; when every idle connection is in use a
+    fresh one is opened, and surplus connections are closed on release.
+    """
+
+    def __init__(self, db_path, size=POOL_SIZE, factory=sqlite3.Connection):
+        self.db_path = db_path
+        self.factory = factory
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return connect(self.db_path, self.factory)
+
+    def release(self, conn):
+        try:
+            # Never hand out a connection with half a transaction on it
+            # (e.g. a handler that raised before commit()).
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put_nowait(conn)
+        except (queue.Full, sqlite3.Error):
+            conn.close()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path, factory=sqlite3.Connection):
+    pool = _pools.get((db_path, factory))
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault((db_path, factory), ConnectionPool(db_path, factory=factory))
+    return pool
+
+
+def database_path():
+    """The database file for the current app context: the one picked with
+    use_database(), else with sharding on (shards.py) the logged-in user's
+    organization's, else DATABASE."""
+    if 'db_path' in g:
+        return g.db_path
+    directory = current_app.extensions.get('shards')
+    if directory is not None and has_request_context():
+        return directory.path_for(session.get('organization_id'))
+    return current_app.config['DATABASE']
+
+
+def use_database(path):
+    """Make get_db() use `path` for the rest of the app context; a
+    connection already taken from another database is released."""
+    if 'db' in g and g.db_pool.db_path != path:
+        close_db()
+    g.db_path = path
+
+
+def get_db():
+    """Return the connection bound to the current app context."""
+    if 'db' not in g:
+        pool = get_pool(database_path(), current_app.config['DB_CONNECTION_FACTORY'])
+        g.db = pool.acquire()
+        g.db_pool = pool
+    return g.db
+
+
+def close_db(exc=None):
+    conn = g.pop('db', None)
+    if conn is not None:
+        g.pop('db_pool').release(conn)
+
+
+def init_db(app):
+    app.config.setdefault('DATABASE', DB_PATH)
+    # query_metrics swaps in an instrumented connection class
+    app.config.setdefault('DB_CONNECTION_FACTORY', sqlite3.Connection)
+    app.teardown_appcontext(close_db)
@@ -0,0 +1,26 @@
+# backend/app/health_routes.py
+from flask import jsonify
+from .migrations import LATEST_VERSION, current_version
+from . import shards
+
+
+def init_health_routes(app):
+
+    # Liveness: the process is up and serving requests
+    @app.route('/healthz', methods=['GET'])
+    def healthz():
+        return jsonify({'status': 'ok'}), 200
+
+    # Readiness: the databases (with sharding, every organization's) are
+    # reachable and migrated far enough for this code
+    @app.route('/readyz', methods=['GET'])
+    def readyz():
+        try:
+            versions = shards.each_database(current_version)
+        except Exception as e:
+            return jsonify({'status': 'unavailable', 'error': str(e)}), 503
+        version = min(versions)
+        if version < LATEST_VERSION:
+            return jsonify({'status': 'unavailable', 'schema_version': version,
+                            'expected_version': LATEST_VERSION}), 503
+        return jsonify({'status': 'ok', 'schema_version': version}), 200
@@ -0,0 +1,314 @@
+# backend/app/import_routes.py
+#
+# Bulk onboarding: POST /api/employees/import takes a CSV file (header row
+# required) or JSON Lines, either as the raw request body or as the `file`
+# field of a multipart form, with one person per row:
+#
+#   email, first_name             required
+#   last_name, position,
+#   department, phone             optional; blank keeps the stored value
+#   password                      initial password; creates a login
+#   team_ids                      teams to join, e.g. "3;7" (a list in JSONL)
+#
+# The body is decoded and parsed as it arrives and handled IMPORT_BATCH rows
+# at a time, so memory stays flat whatever the file size. For each batch the
+# new users' passwords are hashed in parallel on the bcrypt pool before the
+# write transaction starts; then users, employees (upserted by email) and
+# team memberships are written and committed together. Existing users keep
+# their password and role. Everything is keyed by email, so an import that
+# was cut short can simply be sent again.
+#
+# The response counts what was done and lists the rows that were skipped
+# (numbered from 1, header excluded) with their errors, up to
+# MAX_REPORTED_ERRORS of them.
+import codecs
+import csv
+import json
+import re
+from flask import request, jsonify
+from .auth import ADMIN_ROLES, role_required
+from .db import get_db
+from .passwords import HasherBusy, get_hasher
+from .response_cache import bump_version
+from . import changefeed, shards, visibility
+
+IMPORT_BATCH = 500
+CHUNK_SIZE = 64 * 1024
+MAX_LINE_LENGTH = 1024 * 1024
+MAX_REPORTED_ERRORS = 1000
+HASH_WAIT = 10  # seconds to wait for free bcrypt slots
+REQUIRED_FIELDS = ('email', 'first_name')
+PROFILE_FIELDS = ('first_name', 'last_name', 'position', 'department', 'phone')
+JSONL_TYPES = ('application/x-ndjson', 'application/jsonl', 'application/x-jsonlines')
+EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+def _text_lines(stream):
+    """Decode a binary stream into lines (newline kept), CHUNK_SIZE at a time."""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    pending = ''
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        pending += decoder.decode(chunk, final=not chunk)
+        *lines, pending = pending.split('\n')
+        for line in lines:
+            yield line + '\n'
+        if len(pending) > MAX_LINE_LENGTH:
+            raise ValueError('line too long')
+        if not chunk:
+            break
+    if pending:
+        yield pending
+
+
+def read_rows(stream, fmt):
+    """Yield (row number, dict or None) for each row of a CSV or JSONL stream."""
+    lines = _text_lines(stream)
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        missing = [f for f in REQUIRED_FIELDS if f not in (reader.fieldnames or ())]
+        if missing:
+            raise ValueError(f'missing column(s): {", ".join(missing)}')
+        for number, row in enumerate(reader, 1):
+            yield number, row
+    else:
+        number = 0
+        for line in lines:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield number, row if isinstance(row, dict) else None
+
+
+def _text(row, field):
+    value = row.get(field)
+    if value is None:
+        return None
+    return str(value).strip() or None
+
+
+def _team_ids(value):
+    if value is None or value == '':
+        return []
+    if isinstance(value, list):
+        items = value
+    elif isinstance(value, int):
+        items = [value]
+    else:
+        items = [v for v in re.split(r'[;,|\s]+', str(value)) if v]
+    return [int(v) for v in items]
+
+
+def validate_row(row, org_teams):
+    """Return (record, errors) for one parsed row."""
+    if row is None:
+        return None, ['not a JSON object']
+    record = {field: _text(row, field) for field in ('email',) + PROFILE_FIELDS}
+    record['password'] = row.get('password') or None
+    errors = []
+    if not record['email']:
+        errors.append('email is required')
+    elif not EMAIL_RE.match(record['email']):
+        errors.append('email is not valid')
+    if not record['first_name']:
+        errors.append('first_name is required')
+    if record['password'] is not None and not isinstance(record['password'], str):
+        errors.append('password must be a string')
+    try:
+        record['team_ids'] = _team_ids(row.get('team_ids'))
+    except (TypeError, ValueError):
+        errors.append('team_ids must be team ids')
+    else:
+        unknown = [t for t in record['team_ids'] if t not in org_teams]
+        if unknown:
+            errors.append(f'unknown team(s): {", ".join(map(str, unknown))}')
+    return record, errors
+
+
+class ImportReport:
+    def __init__(self, max_errors=MAX_REPORTED_ERRORS):
+        self.max_errors = max_errors
+        self.counts = dict.fromkeys(('rows', 'imported', 'failed', 'users_created', 'employees_created',
+                                     'employees_updated', 'team_memberships_added'), 0)
+        self.errors = []
+
+    def fail(self, number, email, errors):
+        self.counts['failed'] += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': number, 'email': email, 'errors': errors})
+
+    def as_dict(self):
+        return {'summary': self.counts, 'errors': self.errors,
+                'errors_truncated': self.counts['failed'] > len(self.errors)}
+
+
+def _users_by_email(c, emails):
+    if not emails:
+        return {}
+    marks = ','.join('?' * len(emails))
+    c.execute(f'SELECT email, id, organization_id FROM users WHERE email IN ({marks})', list(emails))
+    return {email: (user_id, org_id) for email, user_id, org_id in c.fetchall()}
+
+
+def _profiles_by_email(c, emails):
+    marks = ','.join('?' * len(emails))
+    c.execute(f'SELECT email, organization_id FROM employees WHERE email IN ({marks})', list(emails))
+    return dict(c.fetchall())
+
+
+def import_batch(conn, batch, organization_id, hasher, report):
+    """Write one batch of validated (row number, record) pairs in a single
+    transaction. Returns True if assignment visibility changed."""
+    c = conn.cursor()
+    emails = {r['email'] for _, r in batch}
+    users = _users_by_email(c, emails)
+    profiles = _profiles_by_email(c, emails)
+    # With sharding, other organizations' users are in other databases;
+    # the shard directory knows their emails
+    taken = shards.claim_emails(organization_id, {r['email'] for _, r in batch
+                                                  if r['password'] and r['email'] not in users})
+
+    accepted = []
+    for number, r in batch:
+        user = users.get(r['email'])
+        if (user and user[1] != organization_id) or r['email'] in taken:
+            report.fail(number, r['email'], ['email belongs to a user in another organization'])
+        elif profiles.get(r['email']) not in (None, organization_id):
+            report.fail(number, r['email'], ['email belongs to an employee of another organization'])
+        elif r['team_ids'] and not user and not r['password']:
+            report.fail(number, r['email'], ['a password is needed to add a new user to teams'])
+        else:
+            accepted.append(r)
+    if not accepted:
+        return False
+
+    # Hash outside the write transaction, a pool's worth at a time
+    new_users = {}
+    for r in accepted:
+        if r['password'] and r['email'] not in users:
+            new_users.setdefault(r['email'], r['password'])
+    new_emails = list(new_users)
+    hashes = []
+    for i in range(0, len(new_emails), hasher.workers):
+        chunk = new_emails[i:i + hasher.workers]
+        hashes += hasher.hash_many([new_users[e] for e in chunk], wait=HASH_WAIT)
+
+    try:
+        c.executemany('''INSERT INTO users (email, password, role, organization_id) VALUES (?, ?, 'employee', ?)
+                         ON CONFLICT(email) DO NOTHING''',
+                      [(e, h, organization_id) for e, h in zip(new_emails, hashes)])
+        report.counts['users_created'] += c.rowcount if new_emails else 0
+        users.update(_users_by_email(c, new_emails))
+
+        profile_emails = {r['email'] for r in accepted}
+        created = len(profile_emails - set(profiles))
+        c.executemany('''
+            INSERT INTO employees (email, first_name, last_name, position, department, phone, user_id,
+                                   organization_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(email) DO UPDATE SET
+                first_name = excluded.first_name,
+                last_name = COALESCE(excluded.last_name, employees.last_name),
+                position = COALESCE(excluded.position, employees.position),
+                department = COALESCE(excluded.department, employees.department),
+                phone = COALESCE(excluded.phone, employees.phone),
+                user_id = COALESCE(excluded.user_id, employees.user_id),
+                organization_id = excluded.organization_id
+        ''', [(r['email'],) + tuple(r[f] for f in PROFILE_FIELDS) +
+              (users.get(r['email'], (None,))[0], organization_id) for r in accepted])
+        bump_version(c, 'employees')
+        report.counts['employees_created'] += created
+        report.counts['employees_updated'] += len(accepted) - created
+
+        memberships = {(users[r['email']][0], t) for r in accepted for t in r['team_ids']}
+        if memberships:
+            user_ids = {u for u, _ in memberships}
+            marks = ','.join('?' * len(user_ids))
+            c.execute(f'SELECT user_id, team_id FROM team_members WHERE user_id IN ({marks})', list(user_ids))
+            memberships -= set(c.fetchall())
+        if memberships:
+            c.executemany('INSERT INTO team_members (user_id, team_id) VALUES (?, ?)', sorted(memberships))
+            visibility.add_team_members(c, memberships)
+            for team_id in {t for _, t in memberships}:
+                changefeed.record_team_change(c, team_id)
+            bump_version(c, 'assignments')
+            report.counts['team_memberships_added'] += len(memberships)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    report.counts['imported'] += len(accepted)
+    return bool(memberships)
+
+
+def run_import(conn, rows, organization_id, hasher, report, batch_size=IMPORT_BATCH):
+    """Validate and import (row number, row) pairs batch by batch. Returns
+    True if any batch changed assignment visibility."""
+    c = conn.cursor()
+    c.execute('SELECT id FROM teams WHERE organization_id = ?', (organization_id,))
+    org_teams = {row[0] for row in c.fetchall()}
+
+    changed = False
+    batch = []
+    for number, row in rows:
+        report.counts['rows'] += 1
+        record, errors = validate_row(row, org_teams)
+        if errors:
+            report.fail(number, record and record['email'], errors)
+            continue
+        batch.append((number, record))
+        if len(batch) >= batch_size:
+            changed |= import_batch(conn, batch, organization_id, hasher, report)
+            batch = []
+    if batch:
+        changed |= import_batch(conn, batch, organization_id, hasher, report)
+    return changed
+
+
+def _import_source():
+    """The binary stream and format ('csv' or 'jsonl') of the upload."""
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('file')
+        if upload is None:
+            return None, None
+        name = (upload.filename or '').lower()
+        fmt = request.args.get('format') or ('jsonl' if name.endswith(('.jsonl', '.ndjson')) else 'csv')
+        return upload.stream, fmt
+    fmt = request.args.get('format') or ('jsonl' if request.mimetype in JSONL_TYPES else 'csv')
+    return request.stream, fmt
+
+
+def init_import_routes(app):
+
+    @app.route('/api/employees/import', methods=['POST'])
+    @role_required(ADMIN_ROLES)
+    def import_employees():
+        organization_id = shards.requested_organization()
+        if organization_id is None:
+            return jsonify({'message': 'organization_id is required'}), 400
+
+        stream, fmt = _import_source()
+        if stream is None:
+            return jsonify({'message': 'Upload the file as the request body or a "file" form field'}), 400
+        if fmt not in ('csv', 'jsonl'):
+            return jsonify({'message': 'format must be csv or jsonl'}), 400
+
+        conn = get_db()
+        report = ImportReport()
+        try:
+            changed = run_import(conn, read_rows(stream, fmt), organization_id, get_hasher(), report)
+        except (ValueError, csv.Error) as e:
+            # Batches before the bad input are committed; report them too
+            changefeed.notify()
+            return jsonify({'message': f'Could not read the file: {e}', **report.as_dict()}), 400
+        except HasherBusy:
+            changefeed.notify()
+            return jsonify({'message': 'Server busy, send the file again to finish the import',
+                            **report.as_dict()}), 429, {'Retry-After': '5'}
+        if changed:
+            changefeed.notify()
+        return jsonify(report.as_dict()), 200
@@ -1,22 +1,52 @@
+import os
 from flask import Flask
 from flask_cors import CORS
+from .routes import init_routes
 from .org_routes import init_org_routes
-from .user_routes import init_user_routes
 from .assignment_routes import init_assignment_routes
-from .db_setup import initialize_database
+from .submission_routes import init_submission_routes
+from .health_routes import init_health_routes
+from .import_routes import init_import_routes
+from .job_routes import init_job_routes
+from .stats_routes import init_stats_routes
+from .db import init_db
+from .query_metrics import init_query_metrics
+from .responses import init_responses
+from .shards import init_shards
 
-def create_app():
+def create_app(config=None):
+    """Build the Flask app.
+
+    Does not touch the schema: run db_setup.initialize_database() (or
+    `python -m app.migrations upgrade`) once before starting workers;
+    main.py and gunicorn.conf.py do this.
+    """
     app = Flask(__name__)
-    app.secret_key = "supersecretkey"
+    app.secret_key = os.environ.get('SECRET_KEY', 'f3d9b1c2e7a54d1f8b3c9e4d0a67f821')
+    if config:
+        app.config.update(config)
 
-    CORS(app, supports_credentials=True)
+    CORS(
+        app,
+        origins=os.environ.get('CORS_ORIGINS', 'http://localhost:3000').split(','),
+        supports_credentials=True,
+        methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+        allow_headers=["Content-Type", "Authorization", "Content-Range", "X-Filename", "Idempotency-Key"],
+    )
 
-    # Initialize DB (creates default org + default admin)
-    initialize_database()
+    init_responses(app)
+    init_db(app)
+    init_query_metrics(app)
+    init_shards(app)
 
     # Register all routes
-    init_org_routes(app)
-    init_user_routes(app)
+    init_routes(app)
     init_assignment_routes(app)
+    init_org_routes(app)
+    init_submission_routes(app)
+    init_import_routes(app)
+    init_job_routes(app)
+    init_stats_routes(app)
+    init_health_routes(app)
 
     return app
@@ -0,0 +1,44 @@
+# backend/app/job_routes.py
+from flask import jsonify, g
+from .archive import init_archive
+from .auth import ADMIN_ROLES, login_required
+from .db import get_db
+from .jobs import get, init_jobs
+from .notifications import init_notifications
+
+
+def init_job_routes(app):
+    init_jobs(app)
+    init_notifications(app)
+    init_archive(app)
+
+    def _can_see(c, job):
+        if job['created_by_id'] == g.user.id or g.user.role == 'super_admin':
+            return True
+        if g.user.role not in ADMIN_ROLES or job['created_by_id'] is None:
+            return False
+        c.execute('SELECT organization_id FROM users WHERE id = ?', (job['created_by_id'],))
+        row = c.fetchone()
+        return row is not None and row[0] == g.user.organization_id
+
+    # Status of a background job, for clients that got a 202 with its
+    # Location; visible to whoever queued it, to admins of their
+    # organization and to super admins
+    @app.route('/api/jobs/<int:job_id>', methods=['GET'])
+    @login_required
+    def get_job(job_id):
+        c = get_db().cursor()
+        job = get(c, job_id)
+        if job is None or not _can_see(c, job):
+            return jsonify({'message': 'Job not found'}), 404
+        return jsonify({
+            'id': job['id'],
+            'kind': job['kind'],
+            'status': job['status'],
+            'attempts': job['attempts'],
+            'result': job['result'],
+            'last_error': job['last_error'],
+            'created_at': job['created_at'],
+            'run_at': job['run_at'],
+            'finished_at': job['finished_at'],
+        }), 200
@@ -0,0 +1,291 @@
+# backend/app/jobs.py
+#
+# A durable job queue in the `jobs` table, for work that should not hold up
+# the request that caused it (e.g. the recipient fan-out and emails after
+# an assignment is created, see assignment_routes.py).
+#
+# Write paths call enqueue() inside their own transaction, so a job exists
+# exactly when the change that needs it was committed, then notify() to
+# wake this process's workers. Workers are threads started with the first
+# request of each process (after gunicorn forks) or by
+#   python -m app.jobs work
+# and also poll every POLL_INTERVAL for jobs queued by other processes.
+# Claiming is a single UPDATE, so a job runs in one worker at a time; a
+# claimed job whose lease ran out (its worker died) is picked up again.
+# Failed jobs are retried with exponential backoff up to max_attempts, so
+# handlers must be safe to run more than once.
+#
+# An idempotency key makes enqueue() return the existing job instead of
+# adding another; finished jobs, and with them their keys, are kept for
+# JOB_RETENTION. Jobs registered with @daily are queued by the workers'
+# hourly maintenance pass, once a day.
+#
+#   python -m app.jobs status|work|retry <id> [--db ...]
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from flask import current_app
+from .db import get_db, use_database
+from . import shards
+
+POLL_INTERVAL = 1.0  # seconds
+LEASE_SECONDS = 300
+RETRY_BASE_SECONDS = 2
+RETRY_MAX_SECONDS = 600
+MAX_ATTEMPTS = 5
+PRUNE_INTERVAL = 3600  # seconds
+JOB_RETENTION = '-7 days'  # SQLite datetime modifier
+JOB_WORKERS = 2  # threads per process
+
+logger = logging.getLogger(__name__)
+
+# kind -> function(conn, payload) returning a JSON-able result
+HANDLERS = {}
+# kind -> function(app) returning the payload of today's job, or None
+DAILY = {}
+
+
+def handler(kind):
+    def decorator(f):
+        HANDLERS[kind] = f
+        return f
+    return decorator
+
+
+def daily(kind):
+    """Queue a `kind` job once a day in every database, with the payload
+    the decorated function returns for the app (None: not today)."""
+    def decorator(f):
+        DAILY[kind] = f
+        return f
+    return decorator
+
+
+def enqueue(c, kind, payload, idempotency_key=None, created_by=None, max_attempts=MAX_ATTEMPTS):
+    """Queue a job as part of the caller's transaction. Returns (job id,
+    created); with an idempotency key already in use, the existing job's
+    id and False."""
+    c.execute('''INSERT INTO jobs (kind, payload, idempotency_key, created_by_id, max_attempts)
+                 VALUES (?, ?, ?, ?, ?) ON CONFLICT(idempotency_key) DO NOTHING''',
+              (kind, json.dumps(payload), idempotency_key, created_by, max_attempts))
+    if c.rowcount:
+        return c.lastrowid, True
+    return find(c, idempotency_key)['id'], False
+
+
+def find(c, idempotency_key):
+    c.execute('SELECT id FROM jobs WHERE idempotency_key = ?', (idempotency_key,))
+    row = c.fetchone()
+    return get(c, row[0]) if row else None
+
+
+def get(c, job_id):
+    c.execute('''SELECT id, kind, payload, status, attempts, max_attempts, result, last_error,
+                        created_by_id, created_at, run_at, finished_at
+                 FROM jobs WHERE id = ?''', (job_id,))
+    row = c.fetchone()
+    if row is None:
+        return None
+    job = dict(zip(('id', 'kind', 'payload', 'status', 'attempts', 'max_attempts', 'result', 'last_error',
+                    'created_by_id', 'created_at', 'run_at', 'finished_at'), row))
+    job['payload'] = json.loads(job['payload'])
+    job['result'] = json.loads(job['result']) if job['result'] is not None else None
+    return job
+
+
+def notify():
+    """Wake this process's workers; call after committing enqueued jobs."""
+    current_app.extensions['jobs'].notify()
+
+
+def claim(conn):
+    """Take the next due job, or None: (id, kind, payload, attempts, max_attempts)."""
+    rows = conn.execute('''
+        UPDATE jobs SET status = 'running', attempts = attempts + 1, locked_until = datetime('now', ?)
+        WHERE id = (SELECT id FROM jobs
+                    WHERE (status = 'queued' AND run_at <= datetime('now'))
+                       OR (status = 'running' AND locked_until < datetime('now'))
+                    ORDER BY run_at, id LIMIT 1)
+        RETURNING id, kind, payload, attempts, max_attempts
+    ''', (f'+{LEASE_SECONDS} seconds',)).fetchall()
+    conn.commit()
+    return rows[0] if rows else None
+
+
+def run(conn, job):
+    """Run a claimed job and record how it went; returns the new status."""
+    job_id, kind, payload, attempts, max_attempts = job
+    try:
+        result = HANDLERS[kind](conn, json.loads(payload))
+    except Exception as e:
+        conn.rollback()
+        logger.exception('job %s (%s) failed on attempt %s', job_id, kind, attempts)
+        error = f'{type(e).__name__}: {e}'
+        if attempts < max_attempts:
+            delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+            conn.execute('''UPDATE jobs SET status = 'queued', last_error = ?, locked_until = NULL,
+                                            run_at = datetime('now', ?) WHERE id = ?''',
+                         (error, f'+{delay} seconds', job_id))
+            status = 'queued'
+        else:
+            conn.execute('''UPDATE jobs SET status = 'failed', last_error = ?, locked_until = NULL,
+                                            finished_at = CURRENT_TIMESTAMP WHERE id = ?''', (error, job_id))
+            status = 'failed'
+    else:
+        conn.execute('''UPDATE jobs SET status = 'done', result = ?, locked_until = NULL,
+                                        finished_at = CURRENT_TIMESTAMP WHERE id = ?''',
+                     (json.dumps(result), job_id))
+        status = 'done'
+    conn.commit()
+    return status
+
+
+def prune(conn):
+    conn.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < datetime('now', ?)",
+                 (JOB_RETENTION,))
+    conn.commit()
+
+
+def schedule_daily(conn, app):
+    # The key makes this a no-op after the first time each day
+    c = conn.cursor()
+    today = time.strftime('%Y-%m-%d', time.gmtime())
+    for kind, payload_for in DAILY.items():
+        payload = payload_for(app)
+        if payload is not None:
+            enqueue(c, kind, payload, idempotency_key=f'{kind}:{today}')
+    conn.commit()
+
+
+class JobWorkers:
+    """A pool of worker threads running jobs inside `app`'s context."""
+
+    def __init__(self, app, size=JOB_WORKERS):
+        self.app = app
+        self.size = size
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._threads = []
+        self._last_prune = None
+
+    def start(self):
+        with self._cond:
+            if self._threads:
+                return
+            for i in range(self.size):
+                thread = threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def notify(self):
+        with self._cond:
+            self._seq += 1
+            self._cond.notify_all()
+
+    def _wait(self, seq, timeout):
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq != seq, timeout)
+
+    def _due_for_prune(self):
+        with self._cond:
+            if self._last_prune is not None and time.monotonic() - self._last_prune < PRUNE_INTERVAL:
+                return False
+            self._last_prune = time.monotonic()
+            return True
+
+    def _work(self):
+        turn = 0
+        while True:
+            with self._cond:
+                seq = self._seq
+            job = None
+            try:
+                with self.app.app_context():
+                    # With sharding every organization database has its own
+                    # queue; start from a different one each time round
+                    paths = shards.all_databases()
+                    turn = (turn + 1) % len(paths)
+                    due_for_prune = self._due_for_prune()
+                    for path in paths[turn:] + paths[:turn]:
+                        if job is not None and not due_for_prune:
+                            break
+                        use_database(path)
+                        conn = get_db()
+                        if due_for_prune:
+                            prune(conn)
+                            schedule_daily(conn, self.app)
+                        if job is None:
+                            job = claim(conn)
+                            if job is not None:
+                                run(conn, job)
+            except Exception:
+                # e.g. the database was locked for longer than busy_timeout
+                logger.exception('job worker error')
+                time.sleep(POLL_INTERVAL)
+            if job is None:
+                self._wait(seq, POLL_INTERVAL)
+
+
+def init_jobs(app):
+    app.config.setdefault('JOB_WORKERS', int(os.environ.get('JOB_WORKERS', JOB_WORKERS)))
+    workers = JobWorkers(app, app.config['JOB_WORKERS'])
+    app.extensions['jobs'] = workers
+
+    # Threads don't survive a fork, so each process starts its own on its
+    # first request rather than when the app is created
+    if workers.size:
+        @app.before_request
+        def start_job_workers():
+            workers.start()
+
+
+def main(argv=None):
+    from .init import create_app
+    from .db import connect
+
+    parser = argparse.ArgumentParser(description='Inspect or run the background job queue.')
+    parser.add_argument('command', choices=['status', 'work', 'retry'])
+    parser.add_argument('job_id', nargs='?', type=int, help='job to retry')
+    parser.add_argument('--db', help='database file (defaults to the app database)')
+    parser.add_argument('--workers', type=int, default=JOB_WORKERS, help='threads for `work`')
+    args = parser.parse_args(argv)
+
+    if args.command == 'work':
+        logging.basicConfig(level=logging.INFO)
+        config = {'JOB_WORKERS': args.workers}
+        if args.db:
+            config['DATABASE'] = args.db
+        workers = create_app(config).extensions['jobs']
+        workers.start()
+        print(f'Running {workers.size} job workers, Ctrl-C to stop')
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            return 0
+
+    conn = connect(args.db) if args.db else connect()
+    try:
+        if args.command == 'retry':
+            if args.job_id is None:
+                parser.error('retry needs a job id')
+            cur = conn.execute('''UPDATE jobs SET status = 'queued', attempts = 0, run_at = CURRENT_TIMESTAMP,
+                                                  finished_at = NULL WHERE id = ? AND status = 'failed' ''',
+                               (args.job_id,))
+            conn.commit()
+            print(f'Job {args.job_id} requeued' if cur.rowcount else f'Job {args.job_id} is not a failed job')
+            return 0 if cur.rowcount else 1
+        rows = conn.execute('SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status ORDER BY kind, status')
+        for kind, status, count in rows:
+            print(f'{kind:<24} {status:<8} {count}')
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
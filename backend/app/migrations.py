@@ -0,0 +1,598 @@
+# backend/app/migrations.py
+#
+# Numbered schema migrations. `schema_version` records every migration that
+# has been applied; on startup initialize_database() reads its highest
+# version and returns straight away when it matches the newest migration
+# below, so a booting server no longer re-issues any DDL.
+#
+# Each migration runs in its own BEGIN IMMEDIATE transaction and re-checks
+# the version once it holds the write lock, so two processes starting at
+# once apply it exactly once. Under WAL readers keep working while a
+# migration (e.g. an index build) runs; only writers wait for it, for as
+# long as that one migration takes. Long migrations can therefore be
+# applied to a live database ahead of a deploy:
+#
+#   python -m app.migrations status|upgrade [--db ...]
+#
+# To change the schema, append a new migration; never edit one that has
+# shipped. Migrations 1-5 use IF NOT EXISTS so databases created before
+# this runner existed are adopted as they are.
+import argparse
+import sqlite3
+import sys
+from . import stats, visibility
+
+
+def _add_column_if_missing(c, table, column, decl):
+    c.execute(f'PRAGMA table_info({table})')
+    if column not in {row[1] for row in c.fetchall()}:
+        c.execute(f'ALTER TABLE {table} ADD COLUMN {column} {decl}')
+
+
+def _m001_core_tables(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS organizations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        role TEXT NOT NULL DEFAULT 'employee',
+        organization_id INTEGER,
+        FOREIGN KEY (organization_id) REFERENCES organizations (id)
+    )''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS teams (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        organization_id INTEGER NOT NULL,
+        manager_id INTEGER,
+        FOREIGN KEY (organization_id) REFERENCES organizations (id),
+        FOREIGN KEY (manager_id) REFERENCES users (id)
+    )''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS team_members (
+        user_id INTEGER NOT NULL,
+        team_id INTEGER NOT NULL,
+        PRIMARY KEY (user_id, team_id),
+        FOREIGN KEY (user_id) REFERENCES users (id),
+        FOREIGN KEY (team_id) REFERENCES teams (id)
+    )''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS employees (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        first_name TEXT NOT NULL,
+        last_name TEXT,
+        email TEXT UNIQUE,
+        position TEXT,
+        department TEXT,
+        phone TEXT,
+        user_id INTEGER,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS assignments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        description TEXT,
+        due_date TEXT,
+        is_general INTEGER NOT NULL DEFAULT 1,
+        team_id INTEGER,
+        created_by_id INTEGER NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (team_id) REFERENCES teams (id),
+        FOREIGN KEY (created_by_id) REFERENCES users (id)
+    )''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS user_assignments (
+        user_id INTEGER NOT NULL,
+        assignment_id INTEGER NOT NULL,
+        PRIMARY KEY (user_id, assignment_id),
+        FOREIGN KEY (user_id) REFERENCES users (id),
+        FOREIGN KEY (assignment_id) REFERENCES assignments (id)
+    )''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS submissions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        assignment_id INTEGER NOT NULL,
+        employee_id INTEGER NOT NULL,
+        file_path TEXT NOT NULL,
+        submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (assignment_id) REFERENCES assignments (id),
+        FOREIGN KEY (employee_id) REFERENCES users (id)
+    )''')
+
+
+def _m002_lookup_indexes(c):
+    # user_assignments / team_members are keyed by (user_id, ...), so lookups
+    # by assignment or team need their own indexes.
+    c.execute('CREATE INDEX IF NOT EXISTS idx_user_assignments_assignment ON user_assignments (assignment_id)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_team_members_team ON team_members (team_id)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_assignments_team ON assignments (team_id)')
+    # Keyset pagination order for GET /api/assignments
+    c.execute("CREATE INDEX IF NOT EXISTS idx_assignments_due_id ON assignments (IFNULL(due_date, '9999-12-31'), id)")
+
+
+def _m003_assignment_visibility(c):
+    c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'assignment_visibility'")
+    backfill = c.fetchone() is None
+    c.execute('''CREATE TABLE IF NOT EXISTS assignment_visibility (
+        user_id INTEGER NOT NULL,
+        assignment_id INTEGER NOT NULL,
+        PRIMARY KEY (user_id, assignment_id),
+        FOREIGN KEY (assignment_id) REFERENCES assignments (id)
+    ) WITHOUT ROWID''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_assignment_visibility_assignment ON assignment_visibility (assignment_id)')
+    if backfill:
+        visibility.rebuild(c.connection, commit=False)
+
+
+def _m004_submission_blobs(c):
+    for column, decl in (('filename', 'TEXT'), ('size', 'INTEGER'), ('sha256', 'TEXT')):
+        _add_column_if_missing(c, 'submissions', column, decl)
+
+    # Content-addressed submission files; refcount counts submissions rows
+    c.execute('''CREATE TABLE IF NOT EXISTS blobs (
+        sha256 TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        refcount INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    ) WITHOUT ROWID''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS submissions_blob_ref AFTER INSERT ON submissions
+        WHEN NEW.sha256 IS NOT NULL
+        BEGIN
+            UPDATE blobs SET refcount = refcount + 1 WHERE sha256 = NEW.sha256;
+        END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS submissions_blob_unref AFTER DELETE ON submissions
+        WHEN OLD.sha256 IS NOT NULL
+        BEGIN
+            UPDATE blobs SET refcount = refcount - 1 WHERE sha256 = OLD.sha256;
+        END''')
+
+
+def _m005_upload_sessions(c):
+    # Resumable submission uploads that have not been completed yet
+    c.execute('''CREATE TABLE IF NOT EXISTS upload_sessions (
+        id TEXT PRIMARY KEY,
+        assignment_id INTEGER NOT NULL,
+        employee_id INTEGER NOT NULL,
+        filename TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        received INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (assignment_id) REFERENCES assignments (id),
+        FOREIGN KEY (employee_id) REFERENCES users (id)
+    )''')
+
+
+def _m006_data_versions(c):
+    # Change counters behind the ETags of cached GET endpoints (response_cache.py)
+    c.execute('''CREATE TABLE data_versions (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID''')
+    c.execute("INSERT INTO data_versions (name) VALUES ('assignments')")
+
+
+def _m007_assignment_events(c):
+    # Change log behind the assignment event stream (changefeed.py)
+    c.execute('''CREATE TABLE assignment_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        assignment_id INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+
+
+def _m008_assignments_fts(c):
+    # Full-text index over assignment titles and descriptions, for
+    # GET /api/assignments/search. It stores no text of its own (the
+    # content is read back from `assignments`); triggers keep it in sync.
+    c.execute('''CREATE VIRTUAL TABLE assignments_fts USING fts5(
+        title, description,
+        content='assignments', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )''')
+    c.execute('''CREATE TRIGGER assignments_fts_insert AFTER INSERT ON assignments BEGIN
+            INSERT INTO assignments_fts (rowid, title, description) VALUES (NEW.id, NEW.title, NEW.description);
+        END''')
+    c.execute('''CREATE TRIGGER assignments_fts_delete AFTER DELETE ON assignments BEGIN
+            INSERT INTO assignments_fts (assignments_fts, rowid, title, description)
+            VALUES ('delete', OLD.id, OLD.title, OLD.description);
+        END''')
+    c.execute('''CREATE TRIGGER assignments_fts_update AFTER UPDATE OF title, description ON assignments BEGIN
+            INSERT INTO assignments_fts (assignments_fts, rowid, title, description)
+            VALUES ('delete', OLD.id, OLD.title, OLD.description);
+            INSERT INTO assignments_fts (rowid, title, description) VALUES (NEW.id, NEW.title, NEW.description);
+        END''')
+    c.execute("INSERT INTO assignments_fts (assignments_fts) VALUES ('rebuild')")
+
+
+def _m009_employee_directory(c):
+    # Employees carry their organization so the directory can be scoped and
+    # paginated off one index; existing rows take it from their user
+    # account, by id or else by email.
+    _add_column_if_missing(c, 'employees', 'organization_id', 'INTEGER REFERENCES organizations (id)')
+    c.execute('''UPDATE employees SET organization_id = COALESCE(
+                     (SELECT organization_id FROM users WHERE users.id = employees.user_id),
+                     (SELECT organization_id FROM users WHERE users.email = employees.email))
+                 WHERE organization_id IS NULL''')
+    # Ordered by name, matching NAME_KEY in routes.py; the department and
+    # position filters get their own so filtered pages are range scans too
+    name_key = "lower(IFNULL(last_name, '') || ' ' || first_name)"
+    c.execute(f'CREATE INDEX idx_employees_org_name ON employees (organization_id, {name_key}, id)')
+    c.execute(f'CREATE INDEX idx_employees_org_department ON employees (organization_id, department, {name_key}, id)')
+    c.execute(f'CREATE INDEX idx_employees_org_position ON employees (organization_id, position, {name_key}, id)')
+    c.execute('CREATE INDEX idx_employees_org_first_name ON employees (organization_id, lower(first_name))')
+    c.execute("INSERT INTO data_versions (name) VALUES ('employees')")
+
+
+def _m010_jobs(c):
+    # Durable background jobs (jobs.py)
+    c.execute('''CREATE TABLE jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        idempotency_key TEXT UNIQUE,
+        status TEXT NOT NULL DEFAULT 'queued',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL DEFAULT 5,
+        run_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        locked_until TIMESTAMP,
+        result TEXT,
+        last_error TEXT,
+        created_by_id INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        finished_at TIMESTAMP,
+        FOREIGN KEY (created_by_id) REFERENCES users (id)
+    )''')
+    c.execute('CREATE INDEX idx_jobs_status_run_at ON jobs (status, run_at)')
+    # Who was already emailed about an assignment, so a retried job skips them
+    c.execute('''CREATE TABLE assignment_notifications (
+        assignment_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (assignment_id, user_id)
+    ) WITHOUT ROWID''')
+
+
+# Adds (assignments, expected, received[, general]) to the assignment_stats
+# bucket of an assignment; {team}, {due} and {creator} are expressions for
+# its columns, available in the trigger body or through {source}.
+_STATS_DELTA = '''
+    INSERT INTO assignment_stats (organization_id, team_id, due_date, {counters})
+    SELECT IFNULL((SELECT organization_id FROM teams WHERE id = {team}),
+                  IFNULL((SELECT organization_id FROM users WHERE id = {creator}), 0)),
+           IFNULL({team}, 0), IFNULL(date({due}), ''), {deltas}
+    {source}
+    ON CONFLICT (organization_id, team_id, due_date) DO UPDATE SET
+        {updates};
+'''
+
+
+def _stats_delta(row, assignments, expected, received, source='WHERE 1', general=None):
+    deltas = {'assignments': assignments, 'expected': expected, 'received': received}
+    if general is not None:
+        # The `general` column exists from migration 14 on
+        deltas['general'] = general
+    return _STATS_DELTA.format(team=f'{row}.team_id', due=f'{row}.due_date', creator=f'{row}.created_by_id',
+                               counters=', '.join(deltas), deltas=', '.join(str(d) for d in deltas.values()),
+                               updates=', '.join(f'{k} = {k} + excluded.{k}' for k in deltas), source=source)
+
+
+# An assignment's counts, for {row} = OLD or NEW in assignments triggers
+_STATS_EXPECTED = f'''(SELECT COUNT(*) FROM assignment_visibility
+                    WHERE assignment_id = {{row}}.id AND user_id != {visibility.EVERYONE})'''
+_STATS_RECEIVED = '(SELECT COUNT(DISTINCT employee_id) FROM submissions WHERE assignment_id = {row}.id)'
+_STATS_GENERAL = f'''(SELECT COUNT(*) FROM assignment_visibility
+                   WHERE assignment_id = {{row}}.id AND user_id = {visibility.EVERYONE})'''
+
+
+def _m011_assignment_stats(c):
+    # Dashboard counters (stats.py), kept current by the triggers below
+    c.execute('''CREATE TABLE assignment_stats (
+        organization_id INTEGER NOT NULL,
+        team_id INTEGER NOT NULL,
+        due_date TEXT NOT NULL,
+        assignments INTEGER NOT NULL DEFAULT 0,
+        expected INTEGER NOT NULL DEFAULT 0,
+        received INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (organization_id, team_id, due_date)
+    ) WITHOUT ROWID''')
+    c.execute('CREATE INDEX idx_submissions_assignment_employee ON submissions (assignment_id, employee_id)')
+
+    expected, received = _STATS_EXPECTED, _STATS_RECEIVED
+    c.execute(f'''CREATE TRIGGER assignments_stats_insert AFTER INSERT ON assignments BEGIN
+        {_stats_delta('NEW', 1, 0, 0)}
+    END''')
+    c.execute(f'''CREATE TRIGGER assignments_stats_delete AFTER DELETE ON assignments BEGIN
+        {_stats_delta('OLD', -1, '-' + expected.format(row='OLD'), '-' + received.format(row='OLD'))}
+    END''')
+    # Moving to another bucket takes the assignment's counts along
+    c.execute(f'''CREATE TRIGGER assignments_stats_update AFTER UPDATE OF team_id, due_date, created_by_id ON assignments
+        WHEN NEW.team_id IS NOT OLD.team_id OR date(NEW.due_date) IS NOT date(OLD.due_date)
+             OR NEW.created_by_id IS NOT OLD.created_by_id
+        BEGIN
+            {_stats_delta('OLD', -1, '-' + expected.format(row='OLD'), '-' + received.format(row='OLD'))}
+            {_stats_delta('NEW', 1, expected.format(row='NEW'), received.format(row='NEW'))}
+        END''')
+
+    assignment = 'FROM assignments a WHERE a.id = {}.assignment_id'
+    c.execute(f'''CREATE TRIGGER assignment_visibility_stats_insert AFTER INSERT ON assignment_visibility
+        WHEN NEW.user_id != {visibility.EVERYONE}
+        BEGIN
+            {_stats_delta('a', 0, 1, 0, assignment.format('NEW'))}
+        END''')
+    c.execute(f'''CREATE TRIGGER assignment_visibility_stats_delete AFTER DELETE ON assignment_visibility
+        WHEN OLD.user_id != {visibility.EVERYONE}
+        BEGIN
+            {_stats_delta('a', 0, -1, 0, assignment.format('OLD'))}
+        END''')
+    # `received` counts employees with at least one submission
+    c.execute(f'''CREATE TRIGGER submissions_stats_insert AFTER INSERT ON submissions
+        WHEN NOT EXISTS (SELECT 1 FROM submissions WHERE assignment_id = NEW.assignment_id
+                         AND employee_id = NEW.employee_id AND id != NEW.id)
+        BEGIN
+            {_stats_delta('a', 0, 0, 1, assignment.format('NEW'))}
+        END''')
+    c.execute(f'''CREATE TRIGGER submissions_stats_delete AFTER DELETE ON submissions
+        WHEN NOT EXISTS (SELECT 1 FROM submissions WHERE assignment_id = OLD.assignment_id
+                         AND employee_id = OLD.employee_id)
+        BEGIN
+            {_stats_delta('a', 0, 0, -1, assignment.format('OLD'))}
+        END''')
+    stats.rebuild(c.connection, commit=False)
+
+
+def _m012_shard_directory(c):
+    # Which organizations live in their own database file, and which
+    # organization each of their users' emails belongs to (shards.py).
+    # Only the main database's copies are used.
+    c.execute('''CREATE TABLE shards (
+        organization_id INTEGER PRIMARY KEY,
+        path TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+    c.execute('''CREATE TABLE user_directory (
+        email TEXT PRIMARY KEY,
+        organization_id INTEGER NOT NULL
+    ) WITHOUT ROWID''')
+
+
+def _rebuild_table(c, table, create_sql, keep):
+    """Swap in a new definition of `table` (create_sql creates <table>_new),
+    copying the rows that match `keep` and recreating its indexes and
+    triggers; SQLite can't change a foreign key in place."""
+    c.execute("SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL",
+              (table,))
+    dependents = [r[0] for r in c.fetchall()]
+    c.execute(create_sql)
+    columns = ', '.join(r[1] for r in c.execute(f'PRAGMA table_info({table}_new)').fetchall())
+    c.execute(f'INSERT INTO {table}_new ({columns}) SELECT {columns} FROM {table} WHERE {keep}')
+    c.execute(f'DROP TABLE {table}')
+    # Triggers on other tables name this one; don't check them mid-swap
+    c.execute('PRAGMA legacy_alter_table = ON')
+    c.execute(f'ALTER TABLE {table}_new RENAME TO {table}')
+    c.execute('PRAGMA legacy_alter_table = OFF')
+    for sql in dependents:
+        c.execute(sql)
+
+
+def _m013_assignment_cascades(c):
+    # Rows that belong to an assignment go with it (ON DELETE CASCADE), so
+    # deleting assignments is one statement. Rows that already pointed at
+    # a missing assignment or user are dropped on the way.
+    has_assignment = 'assignment_id IN (SELECT id FROM assignments)'
+    _rebuild_table(c, 'user_assignments', '''CREATE TABLE user_assignments_new (
+        user_id INTEGER NOT NULL,
+        assignment_id INTEGER NOT NULL,
+        PRIMARY KEY (user_id, assignment_id),
+        FOREIGN KEY (user_id) REFERENCES users (id),
+        FOREIGN KEY (assignment_id) REFERENCES assignments (id) ON DELETE CASCADE
+    )''', has_assignment + ' AND user_id IN (SELECT id FROM users)')
+    _rebuild_table(c, 'assignment_visibility', '''CREATE TABLE assignment_visibility_new (
+        user_id INTEGER NOT NULL,
+        assignment_id INTEGER NOT NULL,
+        PRIMARY KEY (user_id, assignment_id),
+        FOREIGN KEY (assignment_id) REFERENCES assignments (id) ON DELETE CASCADE
+    ) WITHOUT ROWID''', has_assignment)
+    _rebuild_table(c, 'submissions', '''CREATE TABLE submissions_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        assignment_id INTEGER NOT NULL,
+        employee_id INTEGER NOT NULL,
+        file_path TEXT NOT NULL,
+        submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        filename TEXT,
+        size INTEGER,
+        sha256 TEXT,
+        FOREIGN KEY (assignment_id) REFERENCES assignments (id) ON DELETE CASCADE,
+        FOREIGN KEY (employee_id) REFERENCES users (id)
+    )''', has_assignment + ' AND employee_id IN (SELECT id FROM users)')
+    _rebuild_table(c, 'upload_sessions', '''CREATE TABLE upload_sessions_new (
+        id TEXT PRIMARY KEY,
+        assignment_id INTEGER NOT NULL,
+        employee_id INTEGER NOT NULL,
+        filename TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        received INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (assignment_id) REFERENCES assignments (id) ON DELETE CASCADE,
+        FOREIGN KEY (employee_id) REFERENCES users (id)
+    )''', has_assignment + ' AND employee_id IN (SELECT id FROM users)')
+    _rebuild_table(c, 'assignment_notifications', '''CREATE TABLE assignment_notifications_new (
+        assignment_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (assignment_id, user_id),
+        FOREIGN KEY (assignment_id) REFERENCES assignments (id) ON DELETE CASCADE
+    ) WITHOUT ROWID''', has_assignment)
+    c.execute('CREATE INDEX idx_upload_sessions_assignment ON upload_sessions (assignment_id)')
+    # Archival (archive.py) walks assignments oldest first
+    c.execute('CREATE INDEX idx_assignments_created_at ON assignments (created_at, id)')
+
+    # Cascaded deletes run after the assignment row is gone, when the
+    # child rows' stats triggers can no longer find its bucket: take its
+    # counts out before the delete instead
+    c.execute('DROP TRIGGER assignments_stats_delete')
+    c.execute(f'''CREATE TRIGGER assignments_stats_delete BEFORE DELETE ON assignments BEGIN
+        {_stats_delta('OLD', -1, '-' + _STATS_EXPECTED.format(row='OLD'), '-' + _STATS_RECEIVED.format(row='OLD'))}
+    END''')
+
+    # In case rows were dropped above
+    c.execute('UPDATE blobs SET refcount = (SELECT COUNT(*) FROM submissions WHERE sha256 = blobs.sha256)')
+    stats.rebuild(c.connection, commit=False)
+
+
+def _m014_general_assignment_stats(c):
+    # General assignments are for every employee of the organization, who
+    # come and go: count them per bucket in `general`, and stats.py turns
+    # that into expected submissions with the organization's current
+    # employee count (read through idx_users_org_role)
+    c.execute('ALTER TABLE assignment_stats ADD COLUMN general INTEGER NOT NULL DEFAULT 0')
+    c.execute('CREATE INDEX idx_users_org_role ON users (organization_id, role)')
+
+    def counts(row, sign=''):
+        return {'expected': sign + _STATS_EXPECTED.format(row=row), 'received': sign + _STATS_RECEIVED.format(row=row),
+                'general': sign + _STATS_GENERAL.format(row=row)}
+
+    c.execute('DROP TRIGGER assignments_stats_delete')
+    c.execute(f'''CREATE TRIGGER assignments_stats_delete BEFORE DELETE ON assignments BEGIN
+        {_stats_delta('OLD', -1, **counts('OLD', '-'))}
+    END''')
+    c.execute('DROP TRIGGER assignments_stats_update')
+    c.execute(f'''CREATE TRIGGER assignments_stats_update AFTER UPDATE OF team_id, due_date, created_by_id ON assignments
+        WHEN NEW.team_id IS NOT OLD.team_id OR date(NEW.due_date) IS NOT date(OLD.due_date)
+             OR NEW.created_by_id IS NOT OLD.created_by_id
+        BEGIN
+            {_stats_delta('OLD', -1, **counts('OLD', '-'))}
+            {_stats_delta('NEW', 1, **counts('NEW'))}
+        END''')
+
+    assignment = 'FROM assignments a WHERE a.id = {}.assignment_id'
+    c.execute(f'''CREATE TRIGGER assignment_visibility_stats_general_insert AFTER INSERT ON assignment_visibility
+        WHEN NEW.user_id = {visibility.EVERYONE}
+        BEGIN
+            {_stats_delta('a', 0, 0, 0, assignment.format('NEW'), general=1)}
+        END''')
+    c.execute(f'''CREATE TRIGGER assignment_visibility_stats_general_delete AFTER DELETE ON assignment_visibility
+        WHEN OLD.user_id = {visibility.EVERYONE}
+        BEGIN
+            {_stats_delta('a', 0, 0, 0, assignment.format('OLD'), general=-1)}
+        END''')
+    stats.rebuild(c.connection, commit=False)
+
+
+def _m015_upload_session_activity(c):
+    # When a resumable upload last moved on; idle ones expire (see
+    # submission_routes.py). ADD COLUMN can't default to CURRENT_TIMESTAMP,
+    # so writers set it.
+    c.execute('ALTER TABLE upload_sessions ADD COLUMN updated_at TIMESTAMP')
+    c.execute('UPDATE upload_sessions SET updated_at = created_at')
+    c.execute('CREATE INDEX idx_upload_sessions_updated_at ON upload_sessions (updated_at)')
+
+
+def _m016_deletion_audience(c):
+    # Who could list an assignment when it was deleted, kept on its
+    # 'deleted' event since the rows that said so are gone (see
+    # changefeed.record_deletions)
+    c.execute('ALTER TABLE assignment_events ADD COLUMN organization_id INTEGER')
+    c.execute('ALTER TABLE assignment_events ADD COLUMN team_id INTEGER')
+    c.execute('ALTER TABLE assignment_events ADD COLUMN is_general INTEGER')
+    c.execute('ALTER TABLE assignment_events ADD COLUMN recipients TEXT')  # JSON array of user ids
+
+
+# (version, name, function taking a cursor), in the order they are applied
+MIGRATIONS = [
+    (1, 'core tables', _m001_core_tables),
+    (2, 'lookup and pagination indexes', _m002_lookup_indexes),
+    (3, 'assignment_visibility', _m003_assignment_visibility),
+    (4, 'submission blobs', _m004_submission_blobs),
+    (5, 'upload_sessions', _m005_upload_sessions),
+    (6, 'data_versions', _m006_data_versions),
+    (7, 'assignment_events', _m007_assignment_events),
+    (8, 'assignments_fts', _m008_assignments_fts),
+    (9, 'employee directory', _m009_employee_directory),
+    (10, 'jobs', _m010_jobs),
+    (11, 'assignment_stats', _m011_assignment_stats),
+    (12, 'shard directory', _m012_shard_directory),
+    (13, 'assignment cascades', _m013_assignment_cascades),
+    (14, 'general assignment stats', _m014_general_assignment_stats),
+    (15, 'upload session activity', _m015_upload_session_activity),
+    (16, 'deletion audience', _m016_deletion_audience),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    """Highest applied migration, or 0 for a database without schema_version."""
+    try:
+        return conn.execute('SELECT MAX(version) FROM schema_version').fetchone()[0] or 0
+    except sqlite3.OperationalError:
+        return 0
+
+
+def pending(conn):
+    version = current_version(conn)
+    return [m for m in MIGRATIONS if m[0] > version]
+
+
+def upgrade(conn, target=LATEST_VERSION):
+    """Apply every migration up to `target`; returns the versions applied."""
+    if current_version(conn) >= target:
+        return []
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None  # transactions are managed explicitly below
+    applied = []
+    try:
+        conn.execute('''CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )''')
+        for version, name, migrate in MIGRATIONS:
+            if version > target:
+                break
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Another process may have applied it while we waited for the lock
+                if current_version(conn) >= version:
+                    conn.execute('ROLLBACK')
+                    continue
+                migrate(conn.cursor())
+                conn.execute('INSERT INTO schema_version (version, name) VALUES (?, ?)', (version, name))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            applied.append(version)
+    finally:
+        conn.isolation_level = isolation_level
+    return applied
+
+
+def main(argv=None):
+    from .db import connect
+
+    parser = argparse.ArgumentParser(description='Show or apply pending schema migrations.')
+    parser.add_argument('command', choices=['status', 'upgrade'])
+    parser.add_argument('--db', help='database file (defaults to the app database)')
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db) if args.db else connect()
+    try:
+        if args.command == 'upgrade':
+            for version in upgrade(conn):
+                print(f'Applied migration {version}')
+        print(f'Schema version {current_version(conn)} (latest {LATEST_VERSION})')
+        for version, name, _ in pending(conn):
+            print(f'  pending: {version} {name}')
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
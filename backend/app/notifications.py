@@ -0,0 +1,111 @@
+# backend/app/notifications.py
+#
+# Emails telling employees about new assignments, sent from the background
+# job queue (jobs.py). With SMTP_HOST set they go to that server, e.g. a
+# local stand-in during development:
+#
+#   python -m aiosmtpd -n -l localhost:1025   (SMTP_HOST=localhost SMTP_PORT=1025)
+#
+# Without it they are only written to the `app.mail` log. Recipients are
+# recorded in `assignment_notifications` after each batch is sent, so a job
+# retried after a failure only re-sends the batch that failed. An
+# assignment deleted mid-way ends its emails after the current batch.
+import logging
+import os
+import re
+import smtplib
+from email.message import EmailMessage
+from flask import current_app
+from .visibility import EVERYONE
+
+MAIL_BATCH = 100  # messages per SMTP connection and commit
+SMTP_TIMEOUT = 10  # seconds
+
+mail_log = logging.getLogger('app.mail')
+
+
+class Mailer:
+    def __init__(self, host=None, port=25, sender='no-reply@localhost'):
+        self.host = host
+        self.port = port
+        self.sender = sender
+
+    def send_many(self, messages):
+        for message in messages:
+            message['From'] = self.sender
+        if not self.host:
+            for message in messages:
+                mail_log.info('to=%s subject=%r', message['To'], message['Subject'])
+            return
+        with smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT) as smtp:
+            for message in messages:
+                smtp.send_message(message)
+
+
+def _header_text(text):
+    """`text` on one line, as headers need: control characters (CR/LF
+    included) and runs of whitespace become single spaces."""
+    return ' '.join(re.sub(r'[\x00-\x1f\x7f]', ' ', text).split())
+
+
+def get_mailer():
+    return current_app.extensions['mailer']
+
+
+def init_notifications(app):
+    app.config.setdefault('SMTP_HOST', os.environ.get('SMTP_HOST'))
+    app.config.setdefault('SMTP_PORT', int(os.environ.get('SMTP_PORT', 25)))
+    app.config.setdefault('MAIL_SENDER', os.environ.get('MAIL_SENDER', 'no-reply@localhost'))
+    app.extensions['mailer'] = Mailer(app.config['SMTP_HOST'], app.config['SMTP_PORT'], app.config['MAIL_SENDER'])
+
+
+def _recipients(c, assignment_id):
+    """(user id, email) of everyone who can see the assignment and has not
+    been emailed about it yet; for general assignments, the employees of
+    the creator's organization."""
+    c.execute('''
+        SELECT u.id, u.email FROM users u
+        WHERE (u.id IN (SELECT user_id FROM assignment_visibility WHERE assignment_id = :a)
+               OR (EXISTS (SELECT 1 FROM assignment_visibility WHERE assignment_id = :a AND user_id = :everyone)
+                   AND u.role = 'employee'
+                   AND u.organization_id = (SELECT cu.organization_id FROM assignments a
+                                            JOIN users cu ON cu.id = a.created_by_id WHERE a.id = :a)))
+          AND NOT EXISTS (SELECT 1 FROM assignment_notifications n
+                          WHERE n.assignment_id = :a AND n.user_id = u.id)
+        ORDER BY u.id
+    ''', {'a': assignment_id, 'everyone': EVERYONE})
+    return c.fetchall()
+
+
+def notify_assignment(conn, mailer, assignment_id):
+    """Email the assignment's recipients; returns how many were sent."""
+    c = conn.cursor()
+    c.execute('SELECT title, due_date FROM assignments WHERE id = ?', (assignment_id,))
+    row = c.fetchone()
+    if row is None:
+        return 0
+    title, due_date = row
+    recipients = _recipients(c, assignment_id)
+    for i in range(0, len(recipients), MAIL_BATCH):
+        batch = recipients[i:i + MAIL_BATCH]
+        messages = []
+        for _, email in batch:
+            message = EmailMessage()
+            message['To'] = email
+            message['Subject'] = f'New assignment: {_header_text(title)}'
+            message.set_content(f'You have a new assignment, "{title}"'
+                                + (f', due {due_date}.' if due_date else '.'))
+            messages.append(message)
+        mailer.send_many(messages)
+        # The assignment may have been deleted while we were sending: check
+        # under the write lock, as the rows below need it to exist
+        if not conn.in_transaction:
+            c.execute('BEGIN IMMEDIATE')
+        c.execute('SELECT 1 FROM assignments WHERE id = ?', (assignment_id,))
+        if c.fetchone() is None:
+            conn.rollback()
+            return i + len(batch)
+        c.executemany('INSERT OR IGNORE INTO assignment_notifications (assignment_id, user_id) VALUES (?, ?)',
+                      [(assignment_id, user_id) for user_id, _ in batch])
+        conn.commit()
+    return len(recipients)
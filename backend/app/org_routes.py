@@ -1,5 +1,9 @@
 import sqlite3
-from flask import request, jsonify, session
+from flask import request, jsonify, g
+from .auth import ADMIN_ROLES, role_required
+from .db import get_db
+from .response_cache import bump_version
+from . import changefeed, shards, visibility
 
 def init_org_routes(app):
 
@@ -13,22 +17,23 @@ def init_org_routes(app):
         if not name:
             return jsonify({'message': 'Organization name is required'}), 400
 
+        # Organizations are listed in the main database; with sharding on,
+        # each new one also gets a database of its own
+        shards.use_main()
         try:
-            conn = sqlite3.connect('database.db')
+            conn = get_db()
             c = conn.cursor()
             c.execute('INSERT INTO organizations (name) VALUES (?)', (name,))
             org_id = c.lastrowid
             conn.commit()
-            conn.close()
+            shards.create_shard(org_id)
             return jsonify({'message': 'Organization created successfully!', 'organization_id': org_id}), 201
         except sqlite3.IntegrityError:
             return jsonify({'message': 'Organization name already exists'}), 400
 
     @app.route('/api/teams', methods=['POST'])
+    @role_required(ADMIN_ROLES)  # For now, we'll assume Org Admins are the ones creating teams
     def create_team():
-        if not session.get('is_admin'): # For now, we'll assume Org Admins are the ones creating teams
-            return jsonify({'message': 'Unauthorized: Admins only'}), 403
-
         data = request.get_json()
         name = data.get('name')
         organization_id = data.get('organization_id')
@@ -36,35 +41,45 @@ def init_org_routes(app):
         if not name or not organization_id:
             return jsonify({'message': 'Team name and organization ID are required'}), 400
 
-        conn = sqlite3.connect('database.db')
+        if g.user.role == 'super_admin':
+            shards.use_organization(organization_id)
+        conn = get_db()
         c = conn.cursor()
+        c.execute('SELECT 1 FROM organizations WHERE id = ?', (organization_id,))
+        if not c.fetchone():
+            return jsonify({'message': 'Organization not found'}), 404
         c.execute('INSERT INTO teams (name, organization_id) VALUES (?, ?)', (name, organization_id))
         team_id = c.lastrowid
         conn.commit()
-        conn.close()
         
         return jsonify({'message': 'Team created successfully!', 'team_id': team_id}), 201
 
     @app.route('/api/teams/<int:team_id>/members', methods=['POST'])
+    @role_required(ADMIN_ROLES)
     def add_team_member(team_id):
-        if not session.get('is_admin'):
-            return jsonify({'message': 'Unauthorized: Admins only'}), 403
-
         data = request.get_json()
         user_id = data.get('user_id')
 
         if not user_id:
             return jsonify({'message': 'User ID is required'}), 400
 
-        conn = sqlite3.connect('database.db')
+        conn = get_db()
         c = conn.cursor()
+        # Foreign keys are enforced: tell missing rows apart from duplicates
+        c.execute('SELECT 1 FROM teams WHERE id = ?', (team_id,))
+        if not c.fetchone():
+            return jsonify({'message': 'Team not found'}), 404
+        c.execute('SELECT 1 FROM users WHERE id = ?', (user_id,))
+        if not c.fetchone():
+            return jsonify({'message': 'User not found'}), 400
         try:
             c.execute('INSERT INTO team_members (user_id, team_id) VALUES (?, ?)', (user_id, team_id))
+            visibility.add_team_member(c, user_id, team_id)
+            changefeed.record_team_change(c, team_id)
+            bump_version(c, 'assignments')
             conn.commit()
         except sqlite3.IntegrityError:
-            conn.close()
             return jsonify({'message': 'User is already in this team'}), 400
-        finally:
-            conn.close()
+        changefeed.notify()
 
         return jsonify({'message': 'User added to team successfully!'}), 201
@@ -0,0 +1,24 @@
+# backend/app/pagination.py
+#
+# Opaque cursors for keyset pagination: a list ordered by (sort key, id)
+# hands out the last row's pair, and the next page continues strictly
+# after it, so deep pages cost the same as the first one.
+import base64
+import json
+
+
+def encode_cursor(sort_key, row_id):
+    raw = json.dumps([sort_key, row_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor, key_type=str):
+    """(sort key, id) from a cursor, or None if it is not one; `key_type`
+    is what the sort key must be (a string, or e.g. a float rank)."""
+    try:
+        sort_key, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(sort_key, key_type) or not isinstance(row_id, int):
+        return None
+    return sort_key, row_id
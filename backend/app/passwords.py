@@ -0,0 +1,170 @@
+# backend/app/passwords.py
+#
+# bcrypt runs on a small dedicated thread pool (bcrypt releases the GIL, so
+# the threads really run in parallel) with a cap on how many hashes may be
+# queued or running. When the cap is hit, or a hash doesn't finish within
+# HASH_TIMEOUT, callers get HasherBusy and the endpoint answers 429,
+# instead of a login burst tying up every server thread for ~250ms each. Failed logins are also throttled per email and
+# per client IP by LoginThrottle.
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import bcrypt
+from flask import current_app
+
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+HASH_WORKERS = os.cpu_count() or 2
+HASH_QUEUE_LIMIT = 4 * HASH_WORKERS
+HASH_TIMEOUT = 30  # seconds
+
+LOGIN_WINDOW = 300  # seconds
+LOGIN_FAILURES_PER_EMAIL = 5
+LOGIN_ATTEMPTS_PER_IP = 50
+
+
+class HasherBusy(Exception):
+    pass
+
+
+def _cost(hashed):
+    """The cost factor of a bcrypt hash ('$2b$12$...' -> 12)."""
+    if isinstance(hashed, str):
+        hashed = hashed.encode('utf-8')
+    try:
+        return int(hashed.split(b'$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    def __init__(self, rounds=BCRYPT_ROUNDS, workers=HASH_WORKERS, queue_limit=HASH_QUEUE_LIMIT,
+                 timeout=HASH_TIMEOUT):
+        self.rounds = rounds
+        self.workers = workers
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(queue_limit)
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            future = self._pool.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return self._result(future)
+
+    def _result(self, future):
+        # A hash that takes this long means the pool is swamped: back off.
+        # It still holds its slot until it finishes.
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HasherBusy() from None
+
+    def _hashpw(self, password):
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(self.rounds))
+
+    def hash(self, password):
+        return self._run(self._hashpw, password)
+
+    def hash_many(self, passwords, wait=0):
+        """Hash several passwords in parallel; takes one queue slot each and
+        raises HasherBusy if the batch doesn't fit within `wait` seconds."""
+        passwords = list(passwords)
+        acquired = 0
+        try:
+            for _ in passwords:
+                if not (self._slots.acquire(timeout=wait) if wait else self._slots.acquire(blocking=False)):
+                    raise HasherBusy()
+                acquired += 1
+        except HasherBusy:
+            for _ in range(acquired):
+                self._slots.release()
+            raise
+        futures = []
+        for password in passwords:
+            future = self._pool.submit(self._hashpw, password)
+            future.add_done_callback(lambda _: self._slots.release())
+            futures.append(future)
+        return [self._result(f) for f in futures]
+
+    def check(self, password, hashed):
+        if isinstance(hashed, str):
+            hashed = hashed.encode('utf-8')
+        return self._run(bcrypt.checkpw, password.encode('utf-8'), hashed)
+
+    def needs_rehash(self, hashed):
+        return _cost(hashed) != self.rounds
+
+
+class LoginThrottle:
+    """Fixed-window counters of login failures per email and attempts per IP."""
+
+    def __init__(self, window=LOGIN_WINDOW, per_email=LOGIN_FAILURES_PER_EMAIL, per_ip=LOGIN_ATTEMPTS_PER_IP):
+        self.window = window
+        self.per_email = per_email
+        self.per_ip = per_ip
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def _count(self, key, now):
+        started, count = self._counters.get(key, (now, 0))
+        if now - started >= self.window:
+            return now, 0
+        return started, count
+
+    def _prune(self, now):
+        # Keep memory bounded under a flood of distinct keys
+        if len(self._counters) > 100000:
+            for key in [k for k, (started, _) in self._counters.items() if now - started >= self.window]:
+                del self._counters[key]
+
+    def retry_after(self, email, ip):
+        """Seconds until this login may be attempted, or 0 if allowed now."""
+        now = time.monotonic()
+        with self._lock:
+            wait = 0
+            for key, limit in ((('email', email), self.per_email), (('ip', ip), self.per_ip)):
+                started, count = self._count(key, now)
+                if count >= limit:
+                    wait = max(wait, int(self.window - (now - started)) + 1)
+            return wait
+
+    def record(self, email, ip, success):
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            keys = [('ip', ip)]
+            if success:
+                self._counters.pop(('email', email), None)
+            else:
+                keys.append(('email', email))
+            for key in keys:
+                started, count = self._count(key, now)
+                self._counters[key] = (started, count + 1)
+
+
+def get_hasher():
+    return current_app.extensions['password_hasher']
+
+
+def get_login_throttle():
+    return current_app.extensions['login_throttle']
+
+
+def init_passwords(app):
+    app.config.setdefault('BCRYPT_ROUNDS', BCRYPT_ROUNDS)
+    app.config.setdefault('PASSWORD_HASH_WORKERS', HASH_WORKERS)
+    app.config.setdefault('PASSWORD_HASH_QUEUE_LIMIT', HASH_QUEUE_LIMIT)
+    app.config.setdefault('PASSWORD_HASH_TIMEOUT', HASH_TIMEOUT)
+    app.extensions['password_hasher'] = PasswordHasher(
+        rounds=app.config['BCRYPT_ROUNDS'],
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        queue_limit=app.config['PASSWORD_HASH_QUEUE_LIMIT'],
+        timeout=app.config['PASSWORD_HASH_TIMEOUT'],
+    )
+    app.extensions['login_throttle'] = LoginThrottle()
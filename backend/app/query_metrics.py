@@ -0,0 +1,239 @@
+# backend/app/query_metrics.py
+#
+# Per-request SQL instrumentation, enabled with QUERY_METRICS=1 in the
+# environment (or the app config). When it is on:
+#   * pooled connections are InstrumentedConnection, which time every
+#     statement (execute plus fetching its rows) and commit;
+#   * responses carry a Server-Timing header with the statement count,
+#     total and slowest statement time and the whole request time;
+#   * statements slower than SLOW_QUERY_MS are logged as one JSON object
+#     per line on the 'app.slow_queries' logger;
+#   * GET /metrics serves per-endpoint counters in Prometheus text format.
+#     Counters live in each process, so under gunicorn every worker reports
+#     its own (tell them apart by the `pid` label).
+# When it is off none of this is installed: connections are plain
+# sqlite3.Connection and no request hooks run.
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from flask import Response, g, has_app_context, request
+
+SLOW_QUERY_MS = 100
+# Upper bounds (seconds) of the request duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+slow_query_log = logging.getLogger('app.slow_queries')
+
+
+class QueryStats:
+    """The statements run while serving one request."""
+
+    def __init__(self):
+        self.statements = []  # [sql, seconds]
+        self.started = time.perf_counter()
+
+    def start(self, sql):
+        statement = [sql, 0.0]
+        self.statements.append(statement)
+        return statement
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    @property
+    def total(self):
+        return sum(s[1] for s in self.statements)
+
+    def slowest(self):
+        return max(self.statements, key=lambda s: s[1], default=None)
+
+
+def _current_stats():
+    return g.get('query_stats') if has_app_context() else None
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    _statement = None
+
+    def _timed(self, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            if self._statement is not None:
+                self._statement[1] += time.perf_counter() - start
+
+    def execute(self, sql, parameters=()):
+        stats = _current_stats()
+        self._statement = stats.start(sql) if stats is not None else None
+        return self._timed(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        stats = _current_stats()
+        self._statement = stats.start(sql) if stats is not None else None
+        return self._timed(super().executemany, sql, seq_of_parameters)
+
+    def fetchone(self):
+        return self._timed(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed(super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._timed(super().fetchall)
+
+    def __next__(self):
+        return self._timed(super().__next__)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose statements are timed into the current request's QueryStats."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def _timed(self, name, fn):
+        stats = _current_stats()
+        if stats is None or not self.in_transaction:
+            return fn()
+        statement = stats.start(name)
+        start = time.perf_counter()
+        try:
+            return fn()
+        finally:
+            statement[1] += time.perf_counter() - start
+
+    def commit(self):
+        return self._timed('COMMIT', super().commit)
+
+    def rollback(self):
+        return self._timed('ROLLBACK', super().rollback)
+
+
+class EndpointMetrics:
+    """Process-wide counters per (method, endpoint), rendered for Prometheus."""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, method, endpoint, status, duration, stats, slow):
+        with self._lock:
+            c = self._counters.get((method, endpoint))
+            if c is None:
+                c = self._counters[(method, endpoint)] = {
+                    'requests': 0, 'errors': 0, 'duration': 0.0, 'queries': 0, 'query_time': 0.0,
+                    'slow_queries': 0, 'buckets': [0] * len(self.buckets),
+                }
+            c['requests'] += 1
+            c['errors'] += status >= 500
+            c['duration'] += duration
+            c['queries'] += stats.count
+            c['query_time'] += stats.total
+            c['slow_queries'] += slow
+            for i, bound in enumerate(self.buckets):
+                if duration <= bound:
+                    c['buckets'][i] += 1
+
+    def render(self):
+        pid = os.getpid()
+        with self._lock:
+            items = sorted((key, dict(c, buckets=list(c['buckets']))) for key, c in self._counters.items())
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(samples)
+
+        def labels(method, endpoint, **extra):
+            pairs = {'method': method, 'endpoint': endpoint, 'pid': pid, **extra}
+            return ','.join(f'{k}="{_escape(v)}"' for k, v in pairs.items())
+
+        family('app_requests_total', 'counter', 'Requests served.',
+               [f'app_requests_total{{{labels(m, e)}}} {c["requests"]}' for (m, e), c in items])
+        family('app_request_errors_total', 'counter', 'Requests answered with a 5xx status.',
+               [f'app_request_errors_total{{{labels(m, e)}}} {c["errors"]}' for (m, e), c in items])
+        histogram = []
+        for (m, e), c in items:
+            for bound, count in zip(self.buckets, c['buckets']):
+                histogram.append(f'app_request_duration_seconds_bucket{{{labels(m, e, le=bound)}}} {count}')
+            histogram.append(f'app_request_duration_seconds_bucket{{{labels(m, e, le="+Inf")}}} {c["requests"]}')
+            histogram.append(f'app_request_duration_seconds_sum{{{labels(m, e)}}} {c["duration"]:.6f}')
+            histogram.append(f'app_request_duration_seconds_count{{{labels(m, e)}}} {c["requests"]}')
+        family('app_request_duration_seconds', 'histogram', 'Time spent serving requests.', histogram)
+        family('app_db_queries_total', 'counter', 'SQL statements run by requests.',
+               [f'app_db_queries_total{{{labels(m, e)}}} {c["queries"]}' for (m, e), c in items])
+        family('app_db_query_seconds_total', 'counter', 'Time spent in SQL statements.',
+               [f'app_db_query_seconds_total{{{labels(m, e)}}} {c["query_time"]:.6f}' for (m, e), c in items])
+        family('app_db_slow_queries_total', 'counter', 'SQL statements slower than the slow-query threshold.',
+               [f'app_db_slow_queries_total{{{labels(m, e)}}} {c["slow_queries"]}' for (m, e), c in items])
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _one_line(sql, limit=2000):
+    return re.sub(r'\s+', ' ', sql).strip()[:limit]
+
+
+def init_query_metrics(app):
+    app.config.setdefault('QUERY_METRICS', os.environ.get('QUERY_METRICS') == '1')
+    app.config.setdefault('SLOW_QUERY_MS', int(os.environ.get('SLOW_QUERY_MS', SLOW_QUERY_MS)))
+    if not app.config['QUERY_METRICS']:
+        return
+
+    app.config['DB_CONNECTION_FACTORY'] = InstrumentedConnection
+    metrics = app.extensions['query_metrics'] = EndpointMetrics()
+    slow_threshold = app.config['SLOW_QUERY_MS'] / 1000
+
+    @app.before_request
+    def _start_query_stats():
+        g.query_stats = QueryStats()
+
+    @app.after_request
+    def _report_query_stats(response):
+        stats = g.pop('query_stats', None)
+        if stats is None:
+            return response
+        duration = time.perf_counter() - stats.started
+        endpoint = request.url_rule.rule if request.url_rule else '<unmatched>'
+
+        slow = [s for s in stats.statements if s[1] >= slow_threshold]
+        for sql, seconds in slow:
+            slow_query_log.warning(json.dumps({
+                'event': 'slow_query',
+                'method': request.method,
+                'endpoint': endpoint,
+                'path': request.path,
+                'duration_ms': round(seconds * 1000, 2),
+                'sql': _one_line(sql),
+            }))
+        metrics.observe(request.method, endpoint, response.status_code, duration, stats, len(slow))
+
+        timings = [f'db;dur={stats.total * 1000:.2f};desc="{stats.count} queries"']
+        slowest = stats.slowest()
+        if slowest is not None:
+            timings.append(f'db-slowest;dur={slowest[1] * 1000:.2f}')
+        timings.append(f'total;dur={duration * 1000:.2f}')
+        response.headers.add('Server-Timing', ', '.join(timings))
+        return response
+
+    # ---------------- PROMETHEUS METRICS ----------------
+    @app.route('/metrics', methods=['GET'])
+    def metrics_endpoint():
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,98 @@
+# backend/app/response_cache.py
+#
+# Conditional GETs for data that polling dashboards fetch over and over.
+#
+# `data_versions` holds one counter per cached data set ('assignments',
+# 'employees'). Every write that can change what those endpoints return
+# calls bump_version() in the same transaction, so the counter is shared
+# by all workers and never runs ahead of or behind the data.
+#
+# A response's ETag is derived from the counter, the organization and user
+# (id and role, which decide what they can see) and the full request path.
+# With sharding the counter is per database file: handlers that serve
+# another organization than the user's (a super admin's ?organization_id)
+# name it with `organization=`, so the counter is read from that
+# organization's database. The counter
+# alone decides whether a response is still current, so a matching
+# If-None-Match is answered with 304 after a single primary-key lookup,
+# and full responses are served from a per-process LRU of bodies when
+# nothing changed since they were built.
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, current_app, g, make_response, request
+from .db import get_db
+
+RESPONSE_CACHE_SIZE = 256
+
+
+def bump_version(c, name):
+    c.execute('UPDATE data_versions SET version = version + 1 WHERE name = ?', (name,))
+
+
+def current_version(c, name):
+    row = c.execute('SELECT version FROM data_versions WHERE name = ?', (name,)).fetchone()
+    return row[0] if row else 0
+
+
+class ResponseCache:
+    """LRU of response bodies keyed by (data set, user scope, path)."""
+
+    def __init__(self, size=RESPONSE_CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, version, body):
+        with self._lock:
+            self._entries[key] = (version, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+
+def _response_cache():
+    return current_app.extensions.setdefault('response_cache', ResponseCache())
+
+
+def etag_cached(name, organization=None):
+    """Serve a GET handler's 200 responses with an ETag tied to the `name`
+    counter. Goes under login_required/role_required (needs g.user).
+    `organization`, if given, is called first to pick the organization
+    (and database) the response is about; by default it is the user's."""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            organization_id = organization() if organization else g.user.organization_id
+            version = current_version(get_db(), name)
+            scope = f'{organization_id}:{g.user.id}:{g.user.role}:{request.full_path}'
+            etag = f'{name}-{version}-{hashlib.sha1(scope.encode("utf-8")).hexdigest()[:20]}'
+
+            # Weak comparison: compressed responses carry the ETag as W/"..."
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                cache = _response_cache()
+                body = cache.get((name, scope), version)
+                if body is None:
+                    response = make_response(f(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    cache.put((name, scope), version, response.get_data())
+                else:
+                    response = Response(body, mimetype='application/json')
+            response.set_etag(etag)
+            # Let browsers keep the response but always revalidate it
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated_function
+    return decorator
@@ -0,0 +1,122 @@
+# backend/app/responses.py
+#
+# How API responses are encoded, in one place:
+#
+# - JSON: jsonify() goes through JSONProvider, which hands the encoding to
+#   orjson when it is installed (several times faster than the json module
+#   on long lists) and otherwise behaves exactly like Flask's provider.
+#   Either way the output is compact with sorted keys.
+# - Lists: rows_response() builds a list body from cursor rows. With
+#   ?format=columnar it names each column once,
+#     {"columns": [...], "rows": [[...], ...], ...}
+#   instead of {"<key>": [{...}, ...], ...}, which skips a dict per row and
+#   roughly halves the size of long lists.
+# - Compression: JSON bodies of at least COMPRESS_MIN_SIZE bytes are sent
+#   brotli (when the brotli module is installed) or gzip compressed,
+#   whichever the client's Accept-Encoding prefers. ETags of compressed
+#   responses are made weak, as the bytes differ per encoding. The ETag
+#   (see response_cache.py) also keys a small LRU of compressed bodies, so
+#   a list that hasn't changed is compressed once per encoding.
+#
+# orjson and brotli are optional (requirements-optional.txt); without them
+# responses are the same JSON, gzip compressed.
+#
+#   python -m benchmarks.bench_responses
+# compares the encoders, formats and compressors on a 10k-row list.
+import gzip
+from flask import current_app, jsonify, request
+from flask.json.provider import DefaultJSONProvider
+from .response_cache import ResponseCache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_SIZE = 1024  # bytes
+# Fast settings: on a 2 MB list gzip level 6 takes ~2.5x as long as level 1
+# for a body only 10% smaller
+GZIP_LEVEL = 1
+BROTLI_QUALITY = 4
+
+if orjson is not None:
+    # Dates and dataclasses go to Flask's default() as with the json module
+    ORJSON_OPTIONS = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+                      | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS)
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, encoding with orjson when available."""
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs.get('indent'):
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS).decode()
+
+    def response(self, *args, **kwargs):
+        if orjson is None or self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def rows_response(key, columns, rows, **extra):
+    """200 response for a list of rows (tuples, possibly with trailing
+    columns beyond `columns`, e.g. a sort key): {key: [objects], **extra},
+    or with ?format=columnar {"columns", "rows", **extra}."""
+    if request.args.get('format') == 'columnar':
+        width = len(columns)
+        if rows and len(rows[0]) > width:
+            rows = [row[:width] for row in rows]
+        return jsonify({'columns': columns, 'rows': rows, **extra}), 200
+    return jsonify({key: [dict(zip(columns, row)) for row in rows], **extra}), 200
+
+
+def _encoding(accept):
+    br = accept.quality('br') if brotli is not None else 0
+    gz = accept.quality('gzip')
+    if br and br >= gz:
+        return 'br'
+    return 'gzip' if gz else None
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_response(response):
+    if (response.status_code != 200 or response.mimetype != 'application/json'
+            or response.direct_passthrough or response.is_streamed or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = _encoding(request.accept_encodings)
+    body = response.get_data()
+    if encoding is None or len(body) < current_app.config['COMPRESS_MIN_SIZE']:
+        return response
+    etag, weak = response.get_etag()
+    cache = current_app.extensions['compressed_responses'] if etag and not weak else None
+    compressed = cache.get((etag, encoding), None) if cache is not None else None
+    if compressed is None:
+        compressed = compress(body, encoding)
+        if cache is not None:
+            cache.put((etag, encoding), None, compressed)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_responses(app):
+    app.json = JSONProvider(app)
+    app.config.setdefault('COMPRESS_MIN_SIZE', COMPRESS_MIN_SIZE)
+    app.extensions['compressed_responses'] = ResponseCache()
+    app.after_request(compress_response)
@@ -1,9 +1,38 @@
 # backend/app/routes.py
+import re
 import sqlite3
-import bcrypt
-from flask import request, jsonify, session
+from flask import request, jsonify, session, g
+from .auth import ADMIN_ROLES, load_principal, login_required, role_required
+from .db import get_db
+from .pagination import decode_cursor, encode_cursor
+from .passwords import HasherBusy, get_hasher, get_login_throttle, init_passwords
+from .response_cache import bump_version, etag_cached
+from .responses import rows_response
+from . import shards
+
+# The employee directory is keyset-paginated on (name, id); the expression
+# matches the idx_employees_org_* indexes.
+NAME_KEY = "lower(IFNULL(e.last_name, '') || ' ' || e.first_name)"
+PREFIX_END = '\U0010ffff'  # sorts after any text that starts with the prefix
+EMPLOYEE_FIELDS = {f: f'e.{f}' for f in
+                   ('id', 'first_name', 'last_name', 'email', 'position', 'department', 'phone', 'user_id')}
+DEFAULT_EMPLOYEE_FIELDS = list(EMPLOYEE_FIELDS)
+EMPLOYEE_PAGE_SIZE = 100
+MAX_EMPLOYEE_PAGE_SIZE = 1000
+
+
+def _ascii_lower(text):
+    # SQLite's lower() only folds ASCII; do the same so prefixes compare equal
+    return re.sub('[A-Z]+', lambda m: m.group().lower(), text)
+
+
+def _busy():
+    return jsonify({'message': 'Server busy, please retry shortly'}), 429, {'Retry-After': '1'}
+
 
 def init_routes(app):
+    init_passwords(app)
+
     @app.route('/api/signup', methods=['POST'])
     def signup():
         data = request.get_json()
@@ -14,18 +43,27 @@ def init_routes(app):
         if not all([email, password, organization_id]):
             return jsonify({'message': 'Email, password, and organization ID are required'}), 400
 
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+        try:
+            hashed_password = get_hasher().hash(password)
+        except HasherBusy:
+            return _busy()
+
+        shards.use_organization(organization_id)
+        conn = get_db()
+        c = conn.cursor()
+        c.execute('SELECT 1 FROM organizations WHERE id = ?', (organization_id,))
+        if not c.fetchone():
+            return jsonify({'message': 'Organization not found'}), 400
+        if shards.claim_emails(organization_id, [email]):
+            return jsonify({'message': 'Email already exists'}), 400
 
         try:
-            conn = sqlite3.connect('database.db')
-            c = conn.cursor()
             # By default, new users are 'employees'. Admins can change this later.
             c.execute(
                 'INSERT INTO users (email, password, organization_id, role) VALUES (?, ?, ?, ?)',
                 (email, hashed_password, organization_id, 'employee')
             )
             conn.commit()
-            conn.close()
             return jsonify({'message': 'Signup successful!'}), 201
         except sqlite3.IntegrityError:
             return jsonify({'message': 'Email already exists'}), 400
@@ -39,26 +77,45 @@ def init_routes(app):
         if not email or not password:
             return jsonify({'message': 'Email and password are required'}), 400
 
-        conn = sqlite3.connect('database.db')
+        throttle = get_login_throttle()
+        retry_after = throttle.retry_after(email, request.remote_addr)
+        if retry_after:
+            return jsonify({'message': 'Too many login attempts, try again later'}), 429, \
+                {'Retry-After': str(retry_after)}
+
+        shards.use_organization_of(email)
+        conn = get_db()
         c = conn.cursor()
         c.execute('SELECT id, password, role, organization_id FROM users WHERE email = ?', (email,))
         user = c.fetchone()
-        conn.close()
 
         if not user:
+            throttle.record(email, request.remote_addr, success=False)
             return jsonify({'message': 'Invalid email or password'}), 401
 
         user_id, hashed_password, role, organization_id = user
 
-        if not bcrypt.checkpw(password.encode('utf-8'), hashed_password):
-            return jsonify({'message': 'Invalid email or password'}), 401
+        hasher = get_hasher()
+        try:
+            if not hasher.check(password, hashed_password):
+                throttle.record(email, request.remote_addr, success=False)
+                return jsonify({'message': 'Invalid email or password'}), 401
+            throttle.record(email, request.remote_addr, success=True)
+
+            # Upgrade hashes made with a different cost factor while we
+            # still have the plaintext
+            if hasher.needs_rehash(hashed_password):
+                c.execute('UPDATE users SET password = ? WHERE id = ?', (hasher.hash(password), user_id))
+                conn.commit()
+        except HasherBusy:
+            return _busy()
 
         # Save user info in session
         session['user_id'] = user_id
         session['email'] = email
         session['role'] = role
         session['organization_id'] = organization_id
-        session['is_admin'] = role in ['org_admin', 'super_admin']
+        session['is_admin'] = role in ADMIN_ROLES
 
         return jsonify({
             'id': user_id,
@@ -69,31 +126,85 @@ def init_routes(app):
 
     @app.route('/api/user', methods=['GET'])
     def get_current_user():
-        if 'email' in session:
+        user = load_principal()
+        if user:
             return jsonify({
-                'id': session.get('user_id'),
-                'email': session['email'],
-                'role': session.get('role'),
-                'organization_id': session.get('organization_id'),
-                'is_admin': session.get('is_admin', False)
+                'id': user.id,
+                'email': user.email,
+                'role': user.role,
+                'organization_id': user.organization_id,
+                'is_admin': user.role in ADMIN_ROLES
             })
         else:
             return jsonify({'email': None, 'is_admin': False})
 
     @app.route('/api/employees', methods=['GET'])
+    @login_required
+    @etag_cached('employees', organization=shards.requested_organization)
     def get_employees():
-        conn = sqlite3.connect('database.db')
-        c = conn.cursor()
-        c.execute("SELECT * FROM employees")
-        employees = c.fetchall()
-        conn.close()
-        return jsonify(employees), 200
+        organization_id = shards.requested_organization()
+
+        fields = request.args.get('fields')
+        fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else DEFAULT_EMPLOYEE_FIELDS
+        unknown = [f for f in fields if f not in EMPLOYEE_FIELDS]
+        if unknown:
+            return jsonify({'message': f'Unknown fields: {", ".join(unknown)}'}), 400
+        if 'id' not in fields:
+            fields = ['id'] + fields
+
+        limit = request.args.get('limit', EMPLOYEE_PAGE_SIZE, type=int)
+        limit = max(1, min(limit, MAX_EMPLOYEE_PAGE_SIZE))
+
+        # Name prefix: the start of the last name or of the first name. Found
+        # with two index range scans that also apply the org scope; left to
+        # the outer query, SQLite would walk the whole org in name order.
+        prefix = _ascii_lower((request.args.get('q') or '').strip())
+        if prefix:
+            conditions = [f'''e.id IN (
+                SELECT e.id FROM employees e
+                WHERE e.organization_id = ? AND {NAME_KEY} >= ? AND {NAME_KEY} < ?
+                UNION ALL
+                SELECT e.id FROM employees e
+                WHERE e.organization_id = ? AND lower(e.first_name) >= ? AND lower(e.first_name) < ?)''']
+            params = [organization_id, prefix, prefix + PREFIX_END] * 2
+        else:
+            conditions = ['e.organization_id = ?']
+            params = [organization_id]
+        for column in ('department', 'position'):
+            if request.args.get(column):
+                conditions.append(f'e.{column} = ?')
+                params.append(request.args[column])
+
+        cursor = request.args.get('cursor')
+        if cursor:
+            position = decode_cursor(cursor)
+            if position is None:
+                return jsonify({'message': 'Invalid cursor'}), 400
+            name_key, last_id = position
+            conditions.append(f'{NAME_KEY} >= ? AND ({NAME_KEY} > ? OR e.id > ?)')
+            params.extend([name_key, name_key, last_id])
+
+        columns = ', '.join(EMPLOYEE_FIELDS[f] for f in fields)
+        c = get_db().cursor()
+        c.execute(f'''
+            SELECT {columns}, {NAME_KEY}
+            FROM employees e
+            WHERE {' AND '.join(conditions)}
+            ORDER BY {NAME_KEY}, e.id
+            LIMIT ?
+        ''', params + [limit + 1])
+        rows = c.fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][-1], rows[-1][0])
+
+        return rows_response('employees', fields, rows, next_cursor=next_cursor)
 
     @app.route('/api/employees', methods=['POST'])
+    @role_required(ADMIN_ROLES)
     def add_employee():
-        if not session.get('is_admin'):
-            return jsonify({'message': 'Unauthorized: Admins only'}), 403
-
         data = request.get_json()
         email = data.get('email')
         first_name = data.get('first_name')
@@ -102,14 +213,16 @@ def init_routes(app):
         department = data.get('department')
         phone = data.get('phone')
 
-        conn = sqlite3.connect('database.db')
+        conn = get_db()
         c = conn.cursor()
-        c.execute('''
-            INSERT INTO employees (first_name, last_name, email, position, department, phone)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (first_name, last_name, email, position, department, phone))
-
-        conn.commit()
-        conn.close()
+        try:
+            c.execute('''
+                INSERT INTO employees (first_name, last_name, email, position, department, phone, organization_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (first_name, last_name, email, position, department, phone, g.user.organization_id))
+            bump_version(c, 'employees')
+            conn.commit()
+        except sqlite3.IntegrityError:
+            return jsonify({'message': 'An employee with this email already exists'}), 400
 
         return jsonify({'message': 'Employee added successfully!'}), 201
@@ -0,0 +1,399 @@
+# backend/app/shards.py
+#
+# Optional per-organization databases (SHARDING=1). SQLite admits one
+# writer per database file at a time, so with every tenant in one file a
+# busy organization's writes queue everyone else's. In shard mode an
+# organization can have a file of its own, listed in the `shards` table of
+# the main database (DATABASE), which also keeps
+#   - every organization's row, so ids and names stay unique,
+#   - user_directory: email -> organization, so login finds the right file,
+#   - users without an organization (super admins), and the data of any
+#     organization that has not been split off (yet).
+#
+# Requests are routed by the organization_id saved in the session at login
+# (db.get_db()); login and signup pick the database with use_organization(),
+# super admins' ?organization_id with requested_organization(). New
+# organizations get a shard when they are created; existing ones are moved
+# out of the main database with
+#
+#   python -m app.shards split [--org ID ...] [--db ...]
+#
+# Stop the app (or at least those organizations' traffic) and let their
+# queued jobs finish first: rows written to the main database mid-split
+# would be left behind.
+# `python -m app.shards list` prints the directory.
+#
+# Each shard allocates ids from its own range (organization id << 32) so
+# ids stay unique across files, and the submission files of a shard live
+# under UPLOAD_FOLDER/org_<id>, so garbage collecting one shard's blobs
+# never touches another's.
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from flask import current_app, g, request
+from .db import connect, database_path, get_pool, use_database
+from .db_setup import DB_PATH, initialize_database, registered_shards
+from . import blobstore
+
+SHARD_ID_BITS = 32
+DIRECTORY_TTL = 5  # seconds between re-reads of the `shards` table
+
+
+def shard_name(organization_id):
+    return f'org_{organization_id}'
+
+
+class ShardDirectory:
+    """Maps organizations to database files, caching the `shards` table."""
+
+    def __init__(self, main_path, shard_dir, factory=sqlite3.Connection):
+        self.main_path = main_path
+        self.shard_dir = shard_dir
+        self.factory = factory
+        self._paths = {}
+        self._known = set()
+        self._loaded = None
+        self._lock = threading.Lock()
+
+    def _main(self):
+        return get_pool(self.main_path, self.factory)
+
+    def _refresh(self):
+        pool = self._main()
+        conn = pool.acquire()
+        try:
+            paths = registered_shards(conn, self.main_path)
+            known = {r[0] for r in conn.execute('SELECT id FROM organizations')}
+        finally:
+            pool.release(conn)
+        with self._lock:
+            self._paths, self._known, self._loaded = paths, known, time.monotonic()
+
+    def path_for(self, organization_id):
+        """Database file of an organization (the main one when None or
+        not split off)."""
+        if organization_id is None:
+            return self.main_path
+        # An organization we have not heard of was probably just created
+        # by another process, with its shard
+        if (self._loaded is None or time.monotonic() - self._loaded > DIRECTORY_TTL
+                or organization_id not in self._known):
+            self._refresh()
+        return self._paths.get(organization_id, self.main_path)
+
+    def all_paths(self):
+        """The main database, then every shard."""
+        if self._loaded is None or time.monotonic() - self._loaded > DIRECTORY_TTL:
+            self._refresh()
+        return [self.main_path] + sorted(set(self._paths.values()))
+
+    def upload_root(self, upload_folder, path):
+        if path == self.main_path:
+            return upload_folder
+        return os.path.join(upload_folder, os.path.splitext(os.path.basename(path))[0])
+
+    def organization_for_email(self, email):
+        pool = self._main()
+        conn = pool.acquire()
+        try:
+            row = conn.execute('SELECT organization_id FROM user_directory WHERE email = ?', (email,)).fetchone()
+        finally:
+            pool.release(conn)
+        return row[0] if row else None
+
+    def claim_emails(self, organization_id, emails):
+        """Register emails to an organization; returns those already
+        registered to another one."""
+        pool = self._main()
+        conn = pool.acquire()
+        try:
+            conn.executemany('INSERT OR IGNORE INTO user_directory (email, organization_id) VALUES (?, ?)',
+                             [(email, organization_id) for email in emails])
+            conn.commit()
+            taken = set()
+            for email in emails:
+                row = conn.execute('SELECT organization_id FROM user_directory WHERE email = ?',
+                                   (email,)).fetchone()
+                if row[0] != organization_id:
+                    taken.add(email)
+        finally:
+            pool.release(conn)
+        return taken
+
+    def create_shard(self, organization_id):
+        """Give a new (empty) organization a database file of its own."""
+        path = create_shard_file(self.main_path, self.shard_dir, organization_id)
+        pool = self._main()
+        conn = pool.acquire()
+        try:
+            _register(conn, self.main_path, organization_id, path)
+            conn.commit()
+        finally:
+            pool.release(conn)
+        with self._lock:
+            self._paths = {**self._paths, organization_id: path}
+            self._known = self._known | {organization_id}
+        return path
+
+
+def _register(conn, main_path, organization_id, path, schema='main'):
+    conn.execute(f'INSERT INTO {schema}.shards (organization_id, path) VALUES (?, ?)',
+                 (organization_id, os.path.relpath(path, os.path.dirname(os.path.abspath(main_path)))))
+
+
+def _seed_sequences(conn, organization_id):
+    # AUTOINCREMENT never hands out ids below the sqlite_sequence entry
+    floor = organization_id << SHARD_ID_BITS
+    tables = [r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND sql LIKE '%AUTOINCREMENT%'")]
+    for table in tables:
+        row = conn.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (table,)).fetchone()
+        if row is None:
+            conn.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)', (table, floor))
+        elif row[0] < floor:
+            conn.execute('UPDATE sqlite_sequence SET seq = ? WHERE name = ?', (floor, table))
+
+
+def create_shard_file(main_path, shard_dir, organization_id):
+    """Create and migrate an organization's database file, with its
+    organization row and id range; not yet registered."""
+    os.makedirs(shard_dir, exist_ok=True)
+    path = os.path.join(os.path.abspath(shard_dir), shard_name(organization_id) + '.db')
+    if os.path.exists(path):
+        # Left over from a split or create that failed before registering
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    initialize_database(path)
+    conn = connect(path)
+    try:
+        conn.execute('ATTACH DATABASE ? AS src', (main_path,))
+        conn.execute('INSERT INTO organizations SELECT * FROM src.organizations WHERE id = ?', (organization_id,))
+        _seed_sequences(conn, organization_id)
+        conn.commit()
+    finally:
+        conn.close()
+    return path
+
+
+def get_directory():
+    return current_app.extensions.get('shards')
+
+
+def use_organization(organization_id):
+    """Point get_db() at an organization's database (no-op unless sharding)."""
+    directory = get_directory()
+    if directory is not None:
+        use_database(directory.path_for(organization_id))
+
+
+def requested_organization():
+    """The organization a request is about: for super admins the one in
+    ?organization_id (default: their own), whose database get_db() then
+    uses; for everyone else their own."""
+    organization_id = g.user.organization_id
+    if g.user.role == 'super_admin':
+        organization_id = request.args.get('organization_id', organization_id, type=int)
+        use_organization(organization_id)
+    return organization_id
+
+
+def use_main():
+    directory = get_directory()
+    if directory is not None:
+        use_database(directory.main_path)
+
+
+def use_organization_of(email):
+    """Point get_db() at the database holding the user with this email."""
+    directory = get_directory()
+    if directory is not None:
+        use_database(directory.path_for(directory.organization_for_email(email)))
+
+
+def claim_emails(organization_id, emails):
+    """Register new users' emails; returns those belonging to another
+    organization (never any unless sharding)."""
+    directory = get_directory()
+    if directory is None or not emails:
+        return set()
+    return directory.claim_emails(organization_id, list(emails))
+
+
+def create_shard(organization_id):
+    directory = get_directory()
+    if directory is not None:
+        directory.create_shard(organization_id)
+
+
+def upload_root():
+    """Where the current database's submission files are stored."""
+    folder = current_app.config['UPLOAD_FOLDER']
+    directory = get_directory()
+    return folder if directory is None else directory.upload_root(folder, database_path())
+
+
+def all_databases():
+    directory = get_directory()
+    return directory.all_paths() if directory is not None else [current_app.config['DATABASE']]
+
+
+def each_database(f):
+    """Call f(conn) on every database (just the one unless sharding), for
+    super admin views across organizations; returns the results."""
+    results = []
+    for path in all_databases():
+        pool = get_pool(path, current_app.config['DB_CONNECTION_FACTORY'])
+        conn = pool.acquire()
+        try:
+            results.append(f(conn))
+        finally:
+            pool.release(conn)
+    return results
+
+
+def init_shards(app):
+    app.config.setdefault('SHARDING', os.environ.get('SHARDING') == '1')
+    app.config.setdefault('SHARD_DIR', os.environ.get('SHARD_DIR')
+                          or os.path.join(os.path.dirname(app.config['DATABASE']), 'shards'))
+    if app.config['SHARDING']:
+        app.extensions['shards'] = ShardDirectory(app.config['DATABASE'], app.config['SHARD_DIR'],
+                                                  app.config['DB_CONNECTION_FACTORY'])
+
+
+# ---------------- Splitting ----------------
+
+# The organization's assignments: its teams', and those without a team
+# created by its users (the same rule as assignment_stats)
+_MOVED_ASSIGNMENTS = '''
+    INSERT INTO temp.moved_assignments
+    SELECT a.id FROM src.assignments a
+    LEFT JOIN src.teams t ON t.id = a.team_id
+    LEFT JOIN src.users u ON u.id = a.created_by_id
+    WHERE IFNULL(t.organization_id, u.organization_id) = :org
+'''
+_IN_MOVED = 'assignment_id IN (SELECT id FROM temp.moved_assignments)'
+
+# (table, rows of the organization), parents first
+SPLIT_TABLES = [
+    ('users', 'organization_id = :org'),
+    ('teams', 'organization_id = :org'),
+    ('team_members', 'team_id IN (SELECT id FROM src.teams WHERE organization_id = :org)'),
+    ('employees', 'organization_id = :org'),
+    ('assignments', 'id IN (SELECT id FROM temp.moved_assignments)'),
+    ('user_assignments', _IN_MOVED),
+    ('assignment_visibility', _IN_MOVED),
+    ('blobs', f'sha256 IN (SELECT sha256 FROM src.submissions WHERE {_IN_MOVED})'),
+    ('submissions', _IN_MOVED),
+    ('upload_sessions', _IN_MOVED),
+    ('assignment_notifications', _IN_MOVED),
+    ('assignment_events', _IN_MOVED),
+]
+
+
+def _columns(conn, table):
+    return ', '.join(r[1] for r in conn.execute(f'PRAGMA main.table_info({table})'))
+
+
+def split_organization(main_path, shard_dir, upload_folder, organization_id):
+    """Move an organization's rows and files from the main database into a
+    new shard; returns the shard's path."""
+    path = create_shard_file(main_path, shard_dir, organization_id)
+    conn = sqlite3.connect(path)
+    try:
+        # Rows are copied as they are; the copies' triggers rebuild the
+        # search index, blob refcounts and stats counters
+        conn.execute('PRAGMA foreign_keys = OFF')
+        conn.execute('ATTACH DATABASE ? AS src', (main_path,))
+        conn.execute('CREATE TEMP TABLE moved_assignments (id INTEGER PRIMARY KEY)')
+        conn.execute(_MOVED_ASSIGNMENTS, {'org': organization_id})
+        for table, where in SPLIT_TABLES:
+            columns = _columns(conn, table)
+            conn.execute(f'INSERT INTO main.{table} ({columns}) SELECT {columns} FROM src.{table} WHERE {where}',
+                         {'org': organization_id})
+            if table == 'blobs':
+                conn.execute('UPDATE main.blobs SET refcount = 0')
+        _seed_sequences(conn, organization_id)
+        conn.commit()
+
+        # Submission files: hard links where possible, so nothing is copied
+        shard_uploads = os.path.join(upload_folder, shard_name(organization_id))
+        for (sha256,) in conn.execute('SELECT sha256 FROM main.blobs').fetchall():
+            source = blobstore.blob_path(upload_folder, sha256)
+            target = blobstore.blob_path(shard_uploads, sha256)
+            if not os.path.exists(source):
+                continue
+            if os.path.exists(target):
+                os.remove(target)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            try:
+                os.link(source, target)
+            except OSError:
+                shutil.copy2(source, target)
+            conn.execute('UPDATE main.submissions SET file_path = ? WHERE sha256 = ?', (target, sha256))
+        conn.commit()
+
+        # Hand over: register the shard and drop the rows from the main
+        # database in one transaction, children first
+        conn.execute('''INSERT OR REPLACE INTO src.user_directory (email, organization_id)
+                        SELECT email, organization_id FROM main.users''')
+        _register(conn, main_path, organization_id, path, schema='src')
+        for table, where in reversed(SPLIT_TABLES):
+            if table != 'blobs':
+                conn.execute(f'DELETE FROM src.{table} WHERE {where}', {'org': organization_id})
+        conn.commit()
+    finally:
+        conn.close()
+
+    # The moved blobs are now unreferenced in the main database
+    conn = connect(main_path)
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        blobstore.collect_garbage(conn, upload_folder)
+    finally:
+        conn.close()
+    return path
+
+
+def main(argv=None):
+    from .assignment_routes import UPLOAD_FOLDER
+
+    parser = argparse.ArgumentParser(description='List organization shards or split organizations into shards.')
+    parser.add_argument('command', choices=['list', 'split'])
+    parser.add_argument('--db', default=DB_PATH, help='main database file (defaults to the app database)')
+    parser.add_argument('--dir', help='shard directory (defaults to shards/ next to the main database)')
+    parser.add_argument('--uploads', default=UPLOAD_FOLDER, help='upload folder (defaults to the app one)')
+    parser.add_argument('--org', type=int, action='append', help='organization to split (default: all)')
+    args = parser.parse_args(argv)
+    shard_dir = args.dir or os.path.join(os.path.dirname(args.db), 'shards')
+
+    initialize_database(args.db)
+    conn = connect(args.db)
+    try:
+        shards = registered_shards(conn, args.db)
+        organizations = conn.execute('SELECT id, name FROM organizations ORDER BY id').fetchall()
+    finally:
+        conn.close()
+
+    if args.command == 'list':
+        for org_id, name in organizations:
+            print(f'{org_id:<8} {name:<32} {shards.get(org_id, "(main database)")}')
+        return 0
+
+    wanted = set(args.org) if args.org else {org_id for org_id, _ in organizations}
+    for org_id, name in organizations:
+        if org_id not in wanted:
+            continue
+        if org_id in shards:
+            print(f'{name}: already in {shards[org_id]}')
+            continue
+        print(f'{name}: moved to {split_organization(args.db, shard_dir, args.uploads, org_id)}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
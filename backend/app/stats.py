@@ -0,0 +1,145 @@
+# backend/app/stats.py
+#
+# assignment_stats holds dashboard counters per (organization, team, due
+# date): how many assignments, how many recipients are expected to submit
+# (assignment_visibility rows of individual users, i.e. explicit
+# recipients and team members), how many of them have submitted, and how
+# many assignments are general. A general assignment is for every employee
+# of the organization, so its expected submissions are the organization's
+# employee count at the time the stats are read, and follow people joining
+# and leaving without touching the counters.
+# Assignments without a team count under team 0, undated ones under due
+# date ''. The organization is the team's, or else the creator's.
+#
+# Triggers on assignments, assignment_visibility and submissions (see
+# migrations 11 and 14) keep the counters current on every write path, so
+# the stats endpoints read a few rows per team instead of counting
+# assignments, recipients and submissions. Bucketing by due date is what
+# lets "overdue" and "due this week" be summed for any day.
+#
+# The table is derived data:
+#   python -m app.stats verify|rebuild
+# checks it against the source tables or rebuilds it from scratch.
+import argparse
+import sys
+from datetime import datetime, timedelta, timezone
+from .visibility import EVERYONE
+
+# Counters for every assignment, computed from the source tables
+_SOURCE_SQL = f'''
+    SELECT IFNULL(t.organization_id, IFNULL(u.organization_id, 0)) AS organization_id,
+           IFNULL(a.team_id, 0) AS team_id,
+           IFNULL(date(a.due_date), '') AS due_date,
+           COUNT(*) AS assignments,
+           SUM((SELECT COUNT(*) FROM assignment_visibility v
+                WHERE v.assignment_id = a.id AND v.user_id != {EVERYONE})) AS expected,
+           SUM((SELECT COUNT(DISTINCT s.employee_id) FROM submissions s
+                WHERE s.assignment_id = a.id)) AS received,
+           SUM((SELECT COUNT(*) FROM assignment_visibility v
+                WHERE v.assignment_id = a.id AND v.user_id = {EVERYONE})) AS general
+    FROM assignments a
+    LEFT JOIN teams t ON t.id = a.team_id
+    LEFT JOIN users u ON u.id = a.created_by_id
+    GROUP BY 1, 2, 3
+'''
+
+COUNTERS = ('total', 'overdue', 'due_this_week', 'expected', 'received')
+
+
+def _summary_sql(group_by, where, organizations):
+    # Due dates are compared as YYYY-MM-DD strings against today (UTC).
+    # `organizations` selects the users whose organizations are summed.
+    return f'''
+        WITH employees (organization_id, headcount) AS (
+            SELECT organization_id, COUNT(*) FROM users
+            WHERE {organizations} AND role = 'employee'
+            GROUP BY organization_id)
+        SELECT {group_by},
+               SUM(assignments),
+               IFNULL(SUM(CASE WHEN due_date != '' AND due_date < :today THEN assignments END), 0),
+               IFNULL(SUM(CASE WHEN due_date >= :today AND due_date < :week_end THEN assignments END), 0),
+               SUM(expected + general * IFNULL(e.headcount, 0)),
+               SUM(received)
+        FROM assignment_stats s
+        LEFT JOIN employees e USING (organization_id)
+        WHERE {where}
+        GROUP BY {group_by}
+        ORDER BY {group_by}
+    '''
+
+
+def _params(today=None, **params):
+    today = today or datetime.now(timezone.utc).date()
+    params.update(today=today.isoformat(), week_end=(today + timedelta(days=7)).isoformat())
+    return params
+
+
+def _counters(row):
+    return dict(zip(COUNTERS, row))
+
+
+def team_stats(c, organization_id, team_ids=None, today=None):
+    """Counters per team of an organization (team 0: assignments without a
+    team), optionally only for `team_ids`."""
+    organizations = where = 'organization_id = :org'
+    if team_ids is not None:
+        where += f" AND team_id IN ({', '.join(str(int(t)) for t in team_ids) or 'NULL'})"
+    c.execute(_summary_sql('team_id', where, organizations), _params(today, org=organization_id))
+    return {row[0]: _counters(row[1:]) for row in c.fetchall()}
+
+
+def organization_stats(c, organization_id=None, today=None):
+    """Counters per organization, or for just one."""
+    where = 'organization_id = :org' if organization_id is not None else '1'
+    c.execute(_summary_sql('organization_id', where, where), _params(today, org=organization_id))
+    return {row[0]: _counters(row[1:]) for row in c.fetchall()}
+
+
+def rebuild(conn, commit=True):
+    c = conn.cursor()
+    c.execute('DELETE FROM assignment_stats')
+    # Migrations before the `general` column rebuild through here too
+    columns = ', '.join(r[1] for r in c.execute('PRAGMA table_info(assignment_stats)').fetchall())
+    c.execute(f'INSERT INTO assignment_stats ({columns}) SELECT {columns} FROM ({_SOURCE_SQL})')
+    if commit:
+        conn.commit()
+    return c.rowcount
+
+
+def verify(conn):
+    """Return the number of counter rows that differ from the source tables
+    (rows that are all zero are ignored)."""
+    c = conn.cursor()
+    stored = '''SELECT organization_id, team_id, due_date, assignments, expected, received, general
+                FROM assignment_stats WHERE assignments != 0 OR expected != 0 OR received != 0 OR general != 0'''
+    c.execute(f'''
+        SELECT COUNT(*) FROM (
+            SELECT * FROM (SELECT * FROM ({stored}) EXCEPT SELECT * FROM ({_SOURCE_SQL}))
+            UNION ALL
+            SELECT * FROM (SELECT * FROM ({_SOURCE_SQL}) EXCEPT SELECT * FROM ({stored})))
+    ''')
+    return c.fetchone()[0]
+
+
+def main(argv=None):
+    from .db import connect
+
+    parser = argparse.ArgumentParser(description='Check or rebuild the assignment_stats counters.')
+    parser.add_argument('command', choices=['verify', 'rebuild'])
+    parser.add_argument('--db', help='database file (defaults to the app database)')
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db) if args.db else connect()
+    try:
+        if args.command == 'rebuild':
+            print(f'Rebuilt assignment_stats: {rebuild(conn)} rows')
+            return 0
+        differing = verify(conn)
+        print(f'assignment_stats: {differing} rows differ from the source tables')
+        return 1 if differing else 0
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,49 @@
+# backend/app/stats_routes.py
+from flask import request, jsonify, g
+from .auth import role_required
+from .db import get_db
+from . import shards, stats
+
+
+def _rows(key, names, counters):
+    return [{key: k, 'name': names.get(k), **v} for k, v in counters.items()]
+
+
+def init_stats_routes(app):
+
+    # Dashboard counts from the assignment_stats counters: per organization
+    # for super admins, the organization and each of its teams for org
+    # admins (team 0 is assignments without a team), managed teams for
+    # team managers.
+    @app.route('/api/stats', methods=['GET'])
+    @role_required(['super_admin', 'org_admin', 'team_manager'])
+    def get_stats():
+        c = get_db().cursor()
+        role = g.user.role
+        organization_id = g.user.organization_id
+        if role == 'super_admin':
+            organization_id = request.args.get('organization_id', type=int)
+            if organization_id is None:
+                c.execute('SELECT id, name FROM organizations')
+                names = dict(c.fetchall())
+                counters = {}
+                for per_database in shards.each_database(lambda conn: stats.organization_stats(conn.cursor())):
+                    counters.update(per_database)
+                return jsonify({'organizations': _rows('organization_id', names, counters)}), 200
+            shards.use_organization(organization_id)
+            c = get_db().cursor()
+
+        if role == 'team_manager':
+            c.execute('SELECT id, name FROM teams WHERE manager_id = ?', (g.user.id,))
+            names = dict(c.fetchall())
+            teams = stats.team_stats(c, organization_id, team_ids=names)
+            return jsonify({'teams': _rows('team_id', names, teams)}), 200
+
+        c.execute('SELECT id, name FROM teams WHERE organization_id = ?', (organization_id,))
+        names = dict(c.fetchall())
+        organization = stats.organization_stats(c, organization_id).get(organization_id)
+        return jsonify({
+            'organization': {'organization_id': organization_id,
+                             **(organization or dict.fromkeys(stats.COUNTERS, 0))},
+            'teams': _rows('team_id', names, stats.team_stats(c, organization_id)),
+        }), 200
@@ -0,0 +1,505 @@
+# backend/app/submission_routes.py
+#
+# Submission uploads are streamed straight from the request body to disk in
+# CHUNK_SIZE pieces and hashed on the way, so memory per upload is constant
+# whatever the file size. Two ways in:
+#
+#   POST /api/assignments/<id>/submissions   whole file as the raw body
+#   POST /api/assignments/<id>/uploads       start a resumable upload, then
+#   PUT  /api/uploads/<upload_id>            send ranges (Content-Range) and
+#   GET  /api/uploads/<upload_id>            ask where to resume from
+#
+# The submissions row is only written once the file is complete, fsynced
+# and adopted by the blob store (see blobstore.py), which keeps a single
+# copy per distinct content. A client re-submitting a file it already
+# submitted can skip the body entirely: send its SHA-256 in X-Content-SHA256
+# with an empty body (or as `sha256` when starting a resumable upload).
+#
+# A resumable upload takes one range at a time (a PUT that finds another
+# one writing gets 409) and expires after UPLOAD_SESSION_TTL without one;
+# the daily `expire_uploads` job then removes it with its partial file.
+#
+# Downloads go through send_file (sendfile via wsgi.file_wrapper where the
+# server supports it) with the content hash as a strong ETag, so
+# conditional and Range requests are answered without re-sending bytes:
+#
+#   GET /api/assignments/<id>/submissions       list submissions
+#   GET /api/submissions/<id>/file              download one file
+#   GET /api/assignments/<id>/submissions.zip   all files, zipped on the fly
+#
+# Employees get their own files; everyone else only those of assignments
+# they manage (visibility.manage_condition), the rest answer 404.
+import fcntl
+import hashlib
+import io
+import os
+import re
+import threading
+import uuid
+import zipfile
+from collections import OrderedDict
+from datetime import datetime, timezone
+from flask import request, jsonify, g, current_app, send_file, Response
+from .auth import load_principal, login_required, role_required
+from .db import get_db
+from . import blobstore, jobs, shards, visibility
+
+CHUNK_SIZE = 64 * 1024
+MAX_SUBMISSION_SIZE = 1024 ** 3
+
+UPLOAD_SESSION_TTL = 24 * 3600  # seconds a resumable upload may sit idle
+UPLOAD_HASHERS = 1024  # in-progress uploads whose hash state is kept
+
+_CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+# Running SHA-256 state of in-progress resumable uploads, keyed by upload
+# id, least recently used first. Lost on restart or eviction, in which case
+# the partial file is re-read once.
+_upload_hashers = OrderedDict()
+_upload_hashers_lock = threading.Lock()
+
+
+def _put_hasher(upload_id, offset, hasher):
+    with _upload_hashers_lock:
+        _upload_hashers[upload_id] = (offset, hasher)
+        _upload_hashers.move_to_end(upload_id)
+        while len(_upload_hashers) > UPLOAD_HASHERS:
+            _upload_hashers.popitem(last=False)
+
+
+def _pop_hasher(upload_id):
+    with _upload_hashers_lock:
+        return _upload_hashers.pop(upload_id, (None, None))
+
+
+def _upload_dir(*parts):
+    path = os.path.join(current_app.config['UPLOAD_FOLDER'], *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _copy_stream(stream, f, hasher, length):
+    """Copy up to `length` bytes from `stream` to `f`; returns bytes copied."""
+    copied = 0
+    while copied < length:
+        chunk = stream.read(min(CHUNK_SIZE, length - copied))
+        if not chunk:
+            break
+        f.write(chunk)
+        hasher.update(chunk)
+        copied += len(chunk)
+    return copied
+
+
+def _hash_file(path, length):
+    """SHA-256 state of the first `length` bytes of a file."""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            hasher.update(chunk)
+            remaining -= len(chunk)
+    return hasher
+
+
+def _submission_dict(row):
+    return {
+        'id': row[0],
+        'assignment_id': row[1],
+        'employee_id': row[2],
+        'filename': row[3],
+        'size': row[4],
+        'sha256': row[5],
+        'submitted_at': row[6],
+    }
+
+
+def _record_submission(c, assignment_id, employee_id, filename, file_path, size, sha256):
+    c.execute('''
+        INSERT INTO submissions (assignment_id, employee_id, file_path, filename, size, sha256)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (assignment_id, employee_id, file_path, filename, size, sha256))
+    submission_id = c.lastrowid
+    c.connection.commit()
+    c.execute('SELECT id, assignment_id, employee_id, filename, size, sha256, submitted_at FROM submissions WHERE id = ?',
+              (submission_id,))
+    return _submission_dict(c.fetchone())
+
+
+def _store_submission(c, assignment_id, employee_id, filename, tmp_path, size, sha256):
+    """Hand a complete, fsynced upload to the blob store and record it."""
+    path = blobstore.store(c, shards.upload_root(), tmp_path, sha256, size)
+    return _record_submission(c, assignment_id, employee_id, filename, path, size, sha256)
+
+
+def _submit_known_blob(c, assignment_id, employee_id, filename, sha256):
+    """Record a submission of content the employee already submitted
+    elsewhere; None otherwise. Knowing a hash is not proof of having the
+    file, so anyone else's content is never attached this way, and is
+    answered exactly like an unknown hash."""
+    upload_root = shards.upload_root()
+    # Take the write lock first so GC can't remove the blob under us
+    if not c.connection.in_transaction:
+        c.execute('BEGIN IMMEDIATE')
+    c.execute('''SELECT size FROM blobs WHERE sha256 = ? AND EXISTS (
+                     SELECT 1 FROM submissions WHERE sha256 = blobs.sha256 AND employee_id = ?)''',
+              (sha256, employee_id))
+    row = c.fetchone()
+    if not row or not os.path.exists(blobstore.blob_path(upload_root, sha256)):
+        c.connection.rollback()
+        return None
+    size = row[0]
+    return _record_submission(c, assignment_id, employee_id, filename,
+                              blobstore.blob_path(upload_root, sha256), size, sha256)
+
+
+class _ZipStream(io.RawIOBase):
+    """Write-only sink that hands whatever zipfile wrote so far to a
+    generator. It is not seekable, so zipfile writes data descriptors
+    instead of seeking back to patch local headers."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        return b''.join(chunks)
+
+
+def _stream_zip(entries):
+    """Yield a ZIP archive of (archive_name, path, mtime) entries piece by
+    piece; nothing but the current chunk is held in memory."""
+    sink = _ZipStream()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for name, path, mtime in entries:
+            if not os.path.exists(path):
+                continue
+            info = zipfile.ZipInfo(name, date_time=mtime.timetuple()[:6])
+            with open(path, 'rb') as src, archive.open(info, 'w', force_zip64=True) as dest:
+                for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                    dest.write(chunk)
+                    yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _parse_timestamp(value):
+    # SQLite CURRENT_TIMESTAMP is UTC, 'YYYY-MM-DD HH:MM:SS'
+    return datetime.strptime(value, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+
+
+def _ttl_modifier(ttl):
+    return f'-{int(ttl)} seconds'  # SQLite datetime modifier
+
+
+def expire_uploads(conn, ttl):
+    """Drop resumable uploads idle for more than `ttl` seconds with their
+    partial files, and partial files no session refers to any more (e.g.
+    of deleted assignments) once they are as old. Returns the number of
+    files removed."""
+    c = conn.cursor()
+    c.execute("DELETE FROM upload_sessions WHERE updated_at < datetime('now', ?) RETURNING id",
+              (_ttl_modifier(ttl),))
+    expired = {r[0] for r in c.fetchall()}
+    conn.commit()
+    partial_dir = _upload_dir('partial')
+    removed = 0
+    # With sharding the directory is shared: a file is only left alone while
+    # its session, in whichever database, is active
+    cutoff = datetime.now(timezone.utc).timestamp() - ttl
+    for entry in os.scandir(partial_dir):
+        if entry.name in expired or entry.stat().st_mtime < cutoff:
+            _pop_hasher(entry.name)
+            os.remove(entry.path)
+            removed += 1
+    return removed
+
+
+@jobs.daily('expire_uploads')
+def _daily_payload(app):
+    return {'ttl': app.config['UPLOAD_SESSION_TTL']}
+
+
+@jobs.handler('expire_uploads')
+def _expire_uploads(conn, payload):
+    return {'removed': expire_uploads(conn, payload['ttl'])}
+
+
+def init_submission_routes(app):
+    app.config.setdefault('MAX_SUBMISSION_SIZE', MAX_SUBMISSION_SIZE)
+    app.config.setdefault('UPLOAD_SESSION_TTL', UPLOAD_SESSION_TTL)
+
+    def _current_submitter(c, assignment_id):
+        """Returns (user_id, error_response) for the logged-in user."""
+        user = load_principal()
+        if user is None:
+            return None, (jsonify({'message': 'Unauthorized'}), 401)
+        c.execute('SELECT 1 FROM assignments WHERE id = ?', (assignment_id,))
+        if not c.fetchone():
+            return None, (jsonify({'message': 'Assignment not found'}), 404)
+        if user.role == 'employee' and not visibility.can_view(c, user.id, assignment_id):
+            return None, (jsonify({'message': 'Unauthorized: Cannot access this assignment'}), 403)
+        return user.id, None
+
+    def _check_size(size):
+        if size is None:
+            return jsonify({'message': 'Content-Length is required'}), 411
+        if size > app.config['MAX_SUBMISSION_SIZE']:
+            return jsonify({'message': 'File too large'}), 413
+        return None
+
+    # ---------------- SINGLE-REQUEST UPLOAD ----------------
+    @app.route('/api/assignments/<int:assignment_id>/submissions', methods=['POST'])
+    def upload_submission(assignment_id):
+        filename = request.headers.get('X-Filename') or request.args.get('filename')
+        if not filename:
+            return jsonify({'message': 'A filename is required (X-Filename header)'}), 400
+
+        conn = get_db()
+        c = conn.cursor()
+        user_id, error = _current_submitter(c, assignment_id)
+        if error:
+            return error
+        expected_sha256 = (request.headers.get('X-Content-SHA256') or '').lower() or None
+        if expected_sha256 and not request.content_length:
+            submission = _submit_known_blob(c, assignment_id, user_id, filename, expected_sha256)
+            if not submission:
+                return jsonify({'message': 'Unknown content hash, upload the file'}), 404
+            return jsonify({'message': 'Submission uploaded successfully!', 'submission': submission}), 201
+
+        error = _check_size(request.content_length)
+        if error:
+            return error
+
+        size = request.content_length
+        hasher = hashlib.sha256()
+        tmp_path = os.path.join(_upload_dir('tmp'), uuid.uuid4().hex)
+        try:
+            with open(tmp_path, 'wb') as f:
+                written = _copy_stream(request.stream, f, hasher, size)
+                f.flush()
+                os.fsync(f.fileno())
+            if written != size:
+                return jsonify({'message': 'Upload incomplete'}), 400
+            if expected_sha256 and expected_sha256 != hasher.hexdigest():
+                return jsonify({'message': 'Content does not match X-Content-SHA256'}), 400
+            submission = _store_submission(c, assignment_id, user_id, filename, tmp_path, size, hasher.hexdigest())
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        return jsonify({'message': 'Submission uploaded successfully!', 'submission': submission}), 201
+
+    # ---------------- RESUMABLE UPLOAD ----------------
+    @app.route('/api/assignments/<int:assignment_id>/uploads', methods=['POST'])
+    def start_upload(assignment_id):
+        data = request.get_json()
+        filename = data.get('filename')
+        size = data.get('size')
+        if not filename or not isinstance(size, int) or size <= 0:
+            return jsonify({'message': 'filename and a positive size are required'}), 400
+
+        conn = get_db()
+        c = conn.cursor()
+        user_id, error = _current_submitter(c, assignment_id)
+        if error:
+            return error
+        error = _check_size(size)
+        if error:
+            return error
+
+        if data.get('sha256'):
+            submission = _submit_known_blob(c, assignment_id, user_id, filename, data['sha256'].lower())
+            if submission:
+                return jsonify({'message': 'Submission uploaded successfully!', 'submission': submission}), 201
+
+        upload_id = uuid.uuid4().hex
+        open(os.path.join(_upload_dir('partial'), upload_id), 'wb').close()
+        c.execute('''INSERT INTO upload_sessions (id, assignment_id, employee_id, filename, size, updated_at)
+                     VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)''', (upload_id, assignment_id, user_id, filename, size))
+        conn.commit()
+        _put_hasher(upload_id, 0, hashlib.sha256())
+        return jsonify({'upload_id': upload_id, 'offset': 0, 'size': size}), 201
+
+    def _load_upload(c, upload_id):
+        # Sessions idle for longer than UPLOAD_SESSION_TTL are gone, even
+        # before expire_uploads() gets to them
+        user = load_principal()
+        c.execute('''SELECT assignment_id, employee_id, filename, size, received FROM upload_sessions
+                     WHERE id = ? AND updated_at >= datetime('now', ?)''',
+                  (upload_id, _ttl_modifier(app.config['UPLOAD_SESSION_TTL'])))
+        upload = c.fetchone()
+        if not upload or not user or upload[1] != user.id:
+            return None
+        return upload
+
+    @app.route('/api/uploads/<upload_id>', methods=['GET'])
+    def get_upload(upload_id):
+        c = get_db().cursor()
+        upload = _load_upload(c, upload_id)
+        if not upload:
+            return jsonify({'message': 'Upload not found'}), 404
+        return jsonify({'upload_id': upload_id, 'offset': upload[4], 'size': upload[3]}), 200
+
+    @app.route('/api/uploads/<upload_id>', methods=['PUT'])
+    def put_upload_range(upload_id):
+        conn = get_db()
+        c = conn.cursor()
+        upload = _load_upload(c, upload_id)
+        if not upload:
+            return jsonify({'message': 'Upload not found'}), 404
+        assignment_id, employee_id, filename, size, received = upload
+
+        match = _CONTENT_RANGE.match(request.headers.get('Content-Range', ''))
+        if not match:
+            return jsonify({'message': 'Content-Range: bytes start-end/total is required'}), 400
+        start, end, total = (int(g) for g in match.groups())
+        length = end - start + 1
+        if total != size or end >= size or length <= 0 or request.content_length != length:
+            return jsonify({'message': 'Content-Range does not match the upload'}), 416
+        if start != received:
+            return jsonify({'message': 'Upload must resume at the current offset', 'offset': received}), 409
+
+        partial_path = os.path.join(_upload_dir('partial'), upload_id)
+        try:
+            f = open(partial_path, 'r+b')
+        except FileNotFoundError:
+            # Completed or expired since we looked
+            return jsonify({'message': 'Upload not found'}), 404
+        with f:
+            # One range at a time per upload, across threads and processes;
+            # the lock goes with the file when the request ends
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return jsonify({'message': 'Another range of this upload is being written', 'offset': received}), 409
+            # The range that held the lock may have moved the offset on
+            upload = _load_upload(c, upload_id)
+            if not upload:
+                return jsonify({'message': 'Upload not found'}), 404
+            if upload[4] != start:
+                return jsonify({'message': 'Upload must resume at the current offset', 'offset': upload[4]}), 409
+            return _write_range(conn, upload_id, upload, f, partial_path, length)
+
+    def _write_range(conn, upload_id, upload, f, partial_path, length):
+        """Append the request body to the locked partial file `f`, then move
+        the session on or, with the last range, store the submission."""
+        assignment_id, employee_id, filename, size, received = upload
+        offset, hasher = _pop_hasher(upload_id)
+        if offset != received:
+            # Only the committed bytes: an interrupted range may have left more
+            hasher = _hash_file(partial_path, received)
+        # The state at `received`, put back unless the range is written
+        committed = hasher.copy()
+
+        written = 0
+        try:
+            # Drop anything past the committed offset (an earlier interrupted range)
+            f.truncate(received)
+            f.seek(received)
+            written = _copy_stream(request.stream, f, hasher, length)
+            f.flush()
+            os.fsync(f.fileno())
+            if written != length:
+                f.truncate(received)
+        finally:
+            if written != length:
+                _put_hasher(upload_id, received, committed)
+        if written != length:
+            return jsonify({'message': 'Range incomplete', 'offset': received}), 400
+
+        c = conn.cursor()
+        received += written
+        if received < size:
+            c.execute('UPDATE upload_sessions SET received = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+                      (received, upload_id))
+            conn.commit()
+            _put_hasher(upload_id, received, hasher)
+            return jsonify({'upload_id': upload_id, 'offset': received, 'size': size}), 200
+
+        c.execute('DELETE FROM upload_sessions WHERE id = ?', (upload_id,))
+        submission = _store_submission(c, assignment_id, employee_id, filename, partial_path, size, hasher.hexdigest())
+        return jsonify({'message': 'Submission uploaded successfully!', 'submission': submission}), 201
+
+    # ---------------- LIST SUBMISSIONS ----------------
+    @app.route('/api/assignments/<int:assignment_id>/submissions', methods=['GET'])
+    def list_submissions(assignment_id):
+        conn = get_db()
+        c = conn.cursor()
+        user_id, error = _current_submitter(c, assignment_id)
+        if error:
+            return error
+
+        # Employees only see their own submissions, managers and admins all
+        # of those of the assignments they manage
+        if g.user.role == 'employee':
+            c.execute('''SELECT id, assignment_id, employee_id, filename, size, sha256, submitted_at
+                         FROM submissions WHERE assignment_id = ? AND employee_id = ? ORDER BY id''',
+                      (assignment_id, user_id))
+        elif not visibility.can_manage(c, g.user, assignment_id):
+            return jsonify({'message': 'Assignment not found'}), 404
+        else:
+            c.execute('''SELECT id, assignment_id, employee_id, filename, size, sha256, submitted_at
+                         FROM submissions WHERE assignment_id = ? ORDER BY id''', (assignment_id,))
+        return jsonify({'submissions': [_submission_dict(r) for r in c.fetchall()]}), 200
+
+    # ---------------- DOWNLOAD ONE SUBMISSION ----------------
+    @app.route('/api/submissions/<int:submission_id>/file', methods=['GET'])
+    @login_required
+    def download_submission(submission_id):
+        conn = get_db()
+        c = conn.cursor()
+        c.execute('''SELECT assignment_id, employee_id, file_path, filename, sha256, submitted_at
+                     FROM submissions WHERE id = ?''', (submission_id,))
+        submission = c.fetchone()
+        # Someone else's file only for those who manage the assignment; to
+        # anyone else it doesn't exist
+        if not submission or (submission[1] != g.user.id and not visibility.can_manage(c, g.user, submission[0])):
+            return jsonify({'message': 'Submission not found'}), 404
+
+        file_path, filename, sha256, submitted_at = submission[2:]
+        if not os.path.exists(file_path):
+            return jsonify({'message': 'Submission file is missing'}), 410
+
+        # conditional=True answers If-None-Match / If-Modified-Since with 304
+        # and serves Range requests as 206 partial content.
+        return send_file(
+            file_path,
+            as_attachment=True,
+            download_name=filename or os.path.basename(file_path),
+            conditional=True,
+            etag=sha256 or True,
+            last_modified=_parse_timestamp(submitted_at),
+            max_age=0,
+        )
+
+    # ---------------- DOWNLOAD ALL AS ZIP ----------------
+    @app.route('/api/assignments/<int:assignment_id>/submissions.zip', methods=['GET'])
+    @role_required(['org_admin', 'team_manager'])
+    def download_submissions_zip(assignment_id):
+        c = get_db().cursor()
+        if not visibility.can_manage(c, g.user, assignment_id):
+            return jsonify({'message': 'Assignment not found'}), 404
+        c.execute('''SELECT id, employee_id, filename, file_path, submitted_at
+                     FROM submissions WHERE assignment_id = ? ORDER BY employee_id, id''', (assignment_id,))
+        # Only metadata is loaded up front; file contents are streamed
+        entries = [
+            (f'{employee_id}/{submission_id}_{os.path.basename(filename or file_path)}',
+             file_path, _parse_timestamp(submitted_at))
+            for submission_id, employee_id, filename, file_path, submitted_at in c.fetchall()
+        ]
+        return Response(
+            _stream_zip(entries),
+            mimetype='application/zip',
+            headers={'Content-Disposition': f'attachment; filename=assignment-{assignment_id}-submissions.zip'},
+        )
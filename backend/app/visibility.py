@@ -0,0 +1,172 @@
+# backend/app/visibility.py
+#
+# assignment_visibility holds one (user_id, assignment_id) row for every
+# employee who can see an assignment, either because they are a recipient
+# or because they belong to the assignment's team. General assignments are
+# stored once under EVERYONE, so "what can user X see" is always
+#   WHERE user_id IN (EVERYONE, X)
+#
+# The table is derived data: the write paths keep it up to date and
+#   python -m app.visibility verify|rebuild
+# checks it against the source tables or rebuilds it from scratch.
+import argparse
+import sys
+
+EVERYONE = 0
+
+# Every (user_id, assignment_id) pair implied by the source tables, for the
+# assignments matched by {where} on `a`.
+_SOURCE_SQL = '''
+    SELECT {everyone}, a.id FROM assignments a WHERE a.is_general = 1 AND {where}
+    UNION
+    SELECT ua.user_id, a.id FROM assignments a
+    JOIN user_assignments ua ON ua.assignment_id = a.id WHERE {where}
+    UNION
+    SELECT tm.user_id, a.id FROM assignments a
+    JOIN team_members tm ON tm.team_id = a.team_id WHERE {where}
+'''
+
+
+def _source_sql(where):
+    return _SOURCE_SQL.format(everyone=EVERYONE, where=where)
+
+
+def refresh_assignment(c, assignment_id):
+    """Recompute the visibility rows of one assignment after it was created
+    or its recipients/team changed."""
+    c.execute('DELETE FROM assignment_visibility WHERE assignment_id = ?', (assignment_id,))
+    c.execute('INSERT INTO assignment_visibility (user_id, assignment_id) ' + _source_sql('a.id = ?'),
+              (assignment_id,) * 3)
+
+
+def refresh_assignments(c, assignment_ids):
+    """Batched refresh_assignment for many assignments at once."""
+    c.executemany('DELETE FROM assignment_visibility WHERE assignment_id = ?',
+                  [(aid,) for aid in assignment_ids])
+    c.executemany('INSERT INTO assignment_visibility (user_id, assignment_id) ' + _source_sql('a.id = ?'),
+                  [(aid,) * 3 for aid in assignment_ids])
+
+
+def apply_recipient_changes(c, assignment_id, added, removed):
+    """Incremental update for recipients added to / removed from an
+    assignment whose team and is_general flag did not change."""
+    c.executemany('INSERT OR IGNORE INTO assignment_visibility (user_id, assignment_id) VALUES (?, ?)',
+                  [(user_id, assignment_id) for user_id in added])
+    # Removed recipients keep their row if they still see it through the team
+    c.executemany('''
+        DELETE FROM assignment_visibility
+        WHERE user_id = ? AND assignment_id = ? AND NOT EXISTS (
+            SELECT 1 FROM assignments a
+            JOIN team_members tm ON tm.team_id = a.team_id
+            WHERE a.id = assignment_visibility.assignment_id AND tm.user_id = assignment_visibility.user_id)
+    ''', [(user_id, assignment_id) for user_id in removed])
+
+
+def add_team_member(c, user_id, team_id):
+    c.execute('''
+        INSERT OR IGNORE INTO assignment_visibility (user_id, assignment_id)
+        SELECT ?, id FROM assignments WHERE team_id = ?
+    ''', (user_id, team_id))
+
+
+def add_team_members(c, memberships):
+    """add_team_member() for many (user_id, team_id) pairs."""
+    c.executemany('''
+        INSERT OR IGNORE INTO assignment_visibility (user_id, assignment_id)
+        SELECT ?, id FROM assignments WHERE team_id = ?
+    ''', list(memberships))
+
+
+def can_view(c, user_id, assignment_id):
+    c.execute('SELECT 1 FROM assignment_visibility WHERE user_id IN (?, ?) AND assignment_id = ? LIMIT 1',
+              (EVERYONE, user_id, assignment_id))
+    return c.fetchone() is not None
+
+
+def list_condition(role, user_id):
+    """SQL condition on assignments `a` (and its params) selecting what a
+    user may list: everything for org admins, general and managed-team
+    assignments for team managers, visibility rows for everyone else."""
+    if role == 'org_admin':
+        return '1', []
+    if role == 'team_manager':
+        return '(a.is_general = 1 OR a.team_id IN (SELECT id FROM teams WHERE manager_id = ?))', [user_id]
+    return 'a.id IN (SELECT assignment_id FROM assignment_visibility WHERE user_id IN (?, ?))', [EVERYONE, user_id]
+
+
+# The organization of an assignment `a`: its team's, or else its creator's
+ORGANIZATION_SQL = '''IFNULL((SELECT organization_id FROM teams WHERE id = a.team_id),
+                          (SELECT organization_id FROM users WHERE id = a.created_by_id))'''
+
+
+def manage_condition(role, user_id, organization_id):
+    """SQL condition on assignments `a` (and its params) selecting what a
+    user manages, i.e. may change, delete and read the submissions of: their
+    organization's assignments for org admins; for team managers, those of
+    the teams they manage and those they created without a team."""
+    if role == 'org_admin':
+        return f'{ORGANIZATION_SQL} = ?', [organization_id]
+    if role == 'team_manager':
+        return f'''({ORGANIZATION_SQL} = ? AND (a.team_id IN (SELECT id FROM teams WHERE manager_id = ?)
+                    OR (a.team_id IS NULL AND a.created_by_id = ?)))''', [organization_id, user_id, user_id]
+    return '0', []
+
+
+def can_manage(c, user, assignment_id):
+    """Whether `user` (a Principal) manages the assignment, see manage_condition()."""
+    condition, params = manage_condition(user.role, user.id, user.organization_id)
+    c.execute(f'SELECT 1 FROM assignments a WHERE a.id = ? AND {condition}', [assignment_id] + params)
+    return c.fetchone() is not None
+
+
+def rebuild(conn, commit=True):
+    c = conn.cursor()
+    c.execute('DELETE FROM assignment_visibility')
+    c.execute('INSERT INTO assignment_visibility (user_id, assignment_id) ' + _source_sql('1'))
+    if commit:
+        conn.commit()
+    return c.rowcount
+
+
+def verify(conn):
+    """Return (missing, extra) row counts between the table and its sources."""
+    c = conn.cursor()
+    c.execute(f'''
+        SELECT COUNT(*) FROM ({_source_sql('1')}
+            EXCEPT SELECT user_id, assignment_id FROM assignment_visibility)
+    ''')
+    missing = c.fetchone()[0]
+    c.execute(f'''
+        SELECT COUNT(*) FROM (SELECT user_id, assignment_id FROM assignment_visibility
+            EXCEPT SELECT * FROM ({_source_sql('1')}))
+    ''')
+    extra = c.fetchone()[0]
+    return missing, extra
+
+
+def main(argv=None):
+    from .db import connect
+    from .response_cache import bump_version
+
+    parser = argparse.ArgumentParser(description='Check or rebuild the assignment_visibility table.')
+    parser.add_argument('command', choices=['verify', 'rebuild'])
+    parser.add_argument('--db', help='database file (defaults to the app database)')
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db) if args.db else connect()
+    try:
+        if args.command == 'rebuild':
+            rows = rebuild(conn, commit=False)
+            bump_version(conn, 'assignments')  # cached assignment lists may have changed
+            conn.commit()
+            print(f'Rebuilt assignment_visibility: {rows} rows')
+            return 0
+        missing, extra = verify(conn)
+        print(f'assignment_visibility: {missing} missing, {extra} extra rows')
+        return 1 if missing or extra else 0
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
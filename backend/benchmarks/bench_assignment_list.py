@@ -0,0 +1,88 @@
+# backend/benchmarks/bench_assignment_list.py
+#
+# GET /api/assignments before and after removing the per-row employee_ids
+# lookup. "before" replays the old handler's queries (one SELECT for the
+# list plus one user_assignments SELECT per row) without the new indexes;
+# "after" goes through the real endpoint, following next_cursor until it
+# has every row the old handler returned. The response cache is emptied
+# before each "after" run, so both sides do the work.
+#
+#   python -m benchmarks.bench_assignment_list [n_assignments]
+import sqlite3
+import sys
+from app.assignment_routes import MAX_PAGE_SIZE
+from .common import QueryCounter, login, make_app, measure, seed, temp_db_path
+from .generate import admin_email
+
+NEW_INDEXES = ('idx_user_assignments_assignment', 'idx_team_members_team', 'idx_assignments_team')
+
+
+def legacy_list(conn, user_id, role):
+    c = conn.cursor()
+    c.execute('SELECT id, role FROM users WHERE id = ?', (user_id,))
+    if role == 'org_admin':
+        c.execute('SELECT * FROM assignments')
+    else:
+        c.execute('''
+            SELECT DISTINCT a.* FROM assignments a
+            LEFT JOIN user_assignments ua ON a.id = ua.assignment_id
+            LEFT JOIN team_members tm ON a.team_id = tm.team_id
+            WHERE a.is_general = 1 OR ua.user_id = ? OR tm.user_id = ?
+        ''', (user_id, user_id))
+    result = []
+    for a in c.fetchall():
+        c.execute('SELECT user_id FROM user_assignments WHERE assignment_id = ?', (a[0],))
+        result.append((a, [r[0] for r in c.fetchall()]))
+    return result
+
+
+def list_all(app, client):
+    """Every page of GET /api/assignments; returns (rows, pages)."""
+    app.extensions.pop('response_cache', None)
+    rows, pages, cursor = [], 0, None
+    while True:
+        res = client.get(f'/api/assignments?limit={MAX_PAGE_SIZE}' + (f'&cursor={cursor}' if cursor else ''))
+        body = res.get_json()
+        rows += body['assignments']
+        pages += 1
+        cursor = body['next_cursor']
+        if cursor is None:
+            return rows, pages
+
+
+def main(n_assignments=12000):
+    db_path = temp_db_path()
+    employee_ids = seed(db_path, n_assignments=n_assignments)
+    employee_email = 'employee0@bench.test'
+    cases = [('org_admin', 1, admin_email(1)), ('employee', employee_ids[0], employee_email)]
+    print(f'{n_assignments} assignments, db at {db_path}\n')
+
+    conn = sqlite3.connect(db_path)
+    index_sql = [conn.execute("SELECT sql FROM sqlite_master WHERE name = ?", (name,)).fetchone()[0]
+                 for name in NEW_INDEXES]
+    for name in NEW_INDEXES:
+        conn.execute(f'DROP INDEX {name}')
+    for role, user_id, _ in cases:
+        queries = []
+        conn.set_trace_callback(queries.append)
+        rows = legacy_list(conn, user_id, role)
+        conn.set_trace_callback(None)
+        stats = measure(lambda: legacy_list(conn, user_id, role), repeat=3)
+        print(f'before  {role:<10} rows={len(rows):<6} queries={len(queries):<6} {stats}')
+    for sql in index_sql:
+        conn.execute(sql)
+    conn.commit()
+    conn.close()
+
+    app = make_app(db_path)
+    for role, _, email in cases:
+        client = login(app, email)
+        counter = QueryCounter(db_path)
+        rows, pages = list_all(app, client)
+        queries = counter.count
+        stats = measure(lambda: list_all(app, client), repeat=3)
+        print(f'after   {role:<10} rows={len(rows):<6} queries={queries:<6} {stats}  ({pages} pages)')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,87 @@
+# backend/benchmarks/bench_bulk_create.py
+#
+# Creating assignments with 10k recipients: the old row-at-a-time loop
+# versus the batched insert path, and many single POSTs versus one bulk POST.
+#
+#   python -m benchmarks.bench_bulk_create [n_recipients]
+import shutil
+import sys
+import time
+from app import visibility
+from app.assignment_routes import _insert_assignments, _parse_assignment
+from app.db import connect
+from .common import login, make_app, seed, temp_db_path
+from .generate import admin_email
+
+
+def legacy_create(conn, user_id, employee_ids):
+    c = conn.cursor()
+    c.execute('INSERT INTO assignments (title, description, created_by_id, due_date, is_general, team_id) '
+              'VALUES (?, ?, ?, ?, ?, ?)',
+              ('Legacy', 'One execute per recipient', user_id, None, 0, None))
+    assignment_id = c.lastrowid
+    for emp_id in employee_ids:
+        c.execute('INSERT INTO user_assignments (user_id, assignment_id) VALUES (?, ?)', (emp_id, assignment_id))
+    visibility.refresh_assignment(c, assignment_id)
+    conn.commit()
+
+
+def batched_create(conn, user_id, employee_ids):
+    _insert_assignments(conn.cursor(), user_id, [_parse_assignment({'title': 'Batched', 'employee_ids': employee_ids})])
+    conn.commit()
+
+
+def timed(label, fn, rows):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<44} {elapsed * 1000:9.1f} ms  {rows / elapsed:12,.0f} rows/s')
+
+
+def fresh_copy(template):
+    """Each scenario gets its own copy of the seeded database, so later runs
+    don't pay for the rows earlier ones inserted."""
+    db_path = temp_db_path()
+    shutil.copyfile(template, db_path)
+    return db_path
+
+
+def main(n_recipients=10000):
+    template = temp_db_path()
+    employee_ids = seed(template, n_users=n_recipients, n_assignments=0)
+    print(f'{n_recipients} recipients\n')
+
+    for label, create in (('legacy loop, 1 assignment', legacy_create),
+                          ('batched insert, 1 assignment', batched_create)):
+        conn = connect(fresh_copy(template))
+        timed(label, lambda: create(conn, 1, employee_ids), n_recipients)
+        conn.close()
+
+    client = login(make_app(fresh_copy(template)), admin_email(1))
+
+    def single():
+        res = client.post('/api/assignments', json={'title': 'Single', 'employee_ids': employee_ids})
+        assert res.status_code == 201, res.get_data(as_text=True)
+    timed('POST /api/assignments, 1 assignment', single, n_recipients)
+
+    per_assignment = 100
+    batch = [{'title': f'Bulk {i}', 'employee_ids': employee_ids[i::per_assignment]}
+             for i in range(per_assignment)]
+    client = login(make_app(fresh_copy(template)), admin_email(1))
+
+    def one_by_one():
+        for item in batch:
+            res = client.post('/api/assignments', json=item)
+            assert res.status_code == 201, res.get_data(as_text=True)
+    timed(f'{per_assignment} x POST /api/assignments', one_by_one, n_recipients)
+
+    client = login(make_app(fresh_copy(template)), admin_email(1))
+
+    def bulk():
+        res = client.post('/api/assignments/bulk', json={'assignments': batch})
+        assert res.status_code == 201, res.get_data(as_text=True)
+    timed(f'POST /api/assignments/bulk, {per_assignment} assignments', bulk, n_recipients)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,115 @@
+# backend/benchmarks/bench_responses.py
+#
+# The response layer (app/responses.py) on a 10k-row assignment list:
+#   1. encoding the rows: Flask's stdlib provider vs orjson, as objects and
+#      as columnar rows;
+#   2. compressing the body: gzip and (if installed) brotli;
+#   3. end to end: paging through the list with GET /api/assignments in
+#      each format, with and without Accept-Encoding.
+#
+#   python -m benchmarks.bench_responses [n_assignments]
+import gzip
+import json
+import sqlite3
+import sys
+from flask.json.provider import DefaultJSONProvider
+from app import responses
+from app.assignment_routes import DEFAULT_LIST_FIELDS, DUE_KEY, LIST_FIELDS, MAX_PAGE_SIZE, _id_list
+from .common import login, make_app, measure, seed, temp_db_path
+from .generate import admin_email
+
+
+def list_rows(db_path):
+    conn = sqlite3.connect(db_path)
+    columns = ', '.join(LIST_FIELDS[f] for f in DEFAULT_LIST_FIELDS)
+    rows = conn.execute(f'SELECT {columns} FROM assignments a ORDER BY {DUE_KEY}, a.id').fetchall()
+    conn.close()
+    i = DEFAULT_LIST_FIELDS.index('employee_ids')
+    return [row[:i] + (_id_list(row[i]),) + row[i + 1:] for row in rows]
+
+
+def encode_cases(app, rows):
+    fields = DEFAULT_LIST_FIELDS
+    stdlib = DefaultJSONProvider(app)
+    fast = responses.JSONProvider(app)
+    compact = {'separators': (',', ':')}
+    return [
+        ('stdlib  objects', lambda: stdlib.dumps({'assignments': [dict(zip(fields, r)) for r in rows]}, **compact)),
+        ('stdlib  columnar', lambda: stdlib.dumps({'columns': fields, 'rows': rows}, **compact)),
+        ('orjson  objects', lambda: fast.dumps({'assignments': [dict(zip(fields, r)) for r in rows]})),
+        ('orjson  columnar', lambda: fast.dumps({'columns': fields, 'rows': rows})),
+    ]
+
+
+def _json(res):
+    body = res.data
+    if res.headers.get('Content-Encoding') == 'gzip':
+        body = gzip.decompress(body)
+    elif res.headers.get('Content-Encoding') == 'br':
+        body = responses.brotli.decompress(body)
+    return json.loads(body)
+
+
+def page_through(client, query, headers):
+    """Fetch every page; returns the bytes transferred."""
+    cursor, size = None, 0
+    while True:
+        res = client.get(f'/api/assignments?limit={MAX_PAGE_SIZE}{query}' + (f'&cursor={cursor}' if cursor else ''),
+                         headers=headers)
+        size += len(res.data)
+        cursor = _json(res)['next_cursor']
+        if cursor is None:
+            return size
+
+
+def main(n_assignments=10000):
+    db_path = temp_db_path()
+    seed(db_path, n_assignments=n_assignments)
+    app = make_app(db_path)
+    rows = list_rows(db_path)
+    print(f'{len(rows)} assignments, db at {db_path}, orjson {"on" if responses.orjson else "not installed"}, '
+          f'brotli {"on" if responses.brotli else "not installed"}\n')
+
+    bodies = {}
+    with app.app_context():
+        for name, encode in encode_cases(app, rows):
+            if name.startswith('orjson') and responses.orjson is None:
+                continue
+            bodies[name] = body = encode().encode()
+            print(f'encode    {name:<27} {len(body) / 1024:6.0f} KiB  {measure(encode)}')
+    print()
+
+    body = bodies.get('orjson  objects') or bodies['stdlib  objects']
+    for encoding in ('gzip', 'br'):
+        if encoding == 'br' and responses.brotli is None:
+            continue
+        compressed = responses.compress(body, encoding)
+        print(f'compress  {encoding:<27} {len(compressed) / 1024:6.0f} KiB  '
+              f'{measure(lambda: responses.compress(body, encoding))}')
+    print()
+
+    client = login(app, admin_email(1))
+
+    def run_pages(label, query, encoding):
+        headers = {'Accept-Encoding': encoding} if encoding else {}
+
+        def run():
+            # Fresh caches: every page built, encoded and compressed
+            app.extensions.pop('response_cache', None)
+            app.extensions['compressed_responses'] = responses.ResponseCache()
+            return page_through(client, query, headers)
+
+        size = run()
+        print(f'GET list  {label:<18} {encoding or "identity":<8} {size / 1024:6.0f} KiB  {measure(run, repeat=3)}')
+
+    for label, query in (('objects', ''), ('columnar', '&format=columnar')):
+        for encoding in (None, 'gzip', 'br'):
+            if encoding != 'br' or responses.brotli is not None:
+                run_pages(label, query, encoding)
+    # Flask's own provider, for comparison
+    app.json = DefaultJSONProvider(app)
+    run_pages('objects (stdlib)', '', None)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
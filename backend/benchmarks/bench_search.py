@@ -0,0 +1,51 @@
+# backend/benchmarks/bench_search.py
+#
+# Keyword search over assignments: a LIKE '%word%' scan of titles and
+# descriptions (what a server-side substring filter costs) versus the FTS5
+# index, for a common word, a rare one and a prefix. The last columns go
+# through GET /api/assignments/search as an admin and as an employee.
+#
+#   python -m benchmarks.bench_search [n_assignments]
+import sqlite3
+import sys
+from .common import login, make_app, measure, seed, temp_db_path
+from .generate import admin_email
+
+TERMS = ('training', '54321', 'onboard')
+
+
+def like_scan(conn, term):
+    pattern = f'%{term}%'
+    return conn.execute('''SELECT id FROM assignments WHERE title LIKE ? OR description LIKE ?
+                           ORDER BY IFNULL(due_date, '9999-12-31'), id''', (pattern, pattern)).fetchall()
+
+
+def fts_top(conn, term, limit=20):
+    return conn.execute('''SELECT rowid FROM assignments_fts WHERE assignments_fts MATCH ?
+                           ORDER BY bm25(assignments_fts, 10.0, 1.0) LIMIT ?''', (f'"{term}"*', limit)).fetchall()
+
+
+def main(n_assignments=100000):
+    db_path = temp_db_path()
+    seed(db_path, n_assignments=n_assignments)
+    print(f'{n_assignments} assignments, db at {db_path}\n')
+
+    conn = sqlite3.connect(db_path)
+    app = make_app(db_path)
+    admin = login(app, admin_email(1))
+    employee = login(app, 'employee0@bench.test')
+    print(f"{'term':<10} {'matches':>8} {'LIKE scan':>11} {'FTS top 20':>11} {'API admin':>10} {'API employee':>13}")
+    for term in TERMS:
+        matches = len(like_scan(conn, term))
+        like = measure(lambda: like_scan(conn, term))['median_ms']
+        fts = measure(lambda: fts_top(conn, term))['median_ms']
+        # A fresh query string each run keeps the response cache out of it
+        runs = iter(range(1000))
+        api_admin = measure(lambda: admin.get(f'/api/assignments/search?q={term}&r={next(runs)}'))['median_ms']
+        api_employee = measure(lambda: employee.get(f'/api/assignments/search?q={term}&r={next(runs)}'))['median_ms']
+        print(f'{term:<10} {matches:>8} {like:>9.2f}ms {fts:>9.2f}ms {api_admin:>8.2f}ms {api_employee:>11.2f}ms')
+    conn.close()
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
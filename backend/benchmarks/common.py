@@ -0,0 +1,77 @@
+# backend/benchmarks/common.py
+#
+# Shared helpers for the benchmark scripts. Run them from backend/, e.g.
+#   python -m benchmarks.bench_assignment_list
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from app.db import get_pool
+from app.init import create_app
+from .generate import PASSWORD, generate
+
+
+def temp_db_path():
+    return os.path.join(tempfile.mkdtemp(prefix='bench-'), 'database.db')
+
+
+def make_app(db_path):
+    return create_app({
+        'DATABASE': db_path,
+        'UPLOAD_FOLDER': os.path.join(os.path.dirname(db_path), 'uploads'),
+        # Seeded hashes use cost 4; keep login from upgrading them mid-run
+        'BCRYPT_ROUNDS': 4,
+    })
+
+
+def seed(db_path, n_users=2000, n_teams=50, n_assignments=12000, recipients=5, seed=42):
+    """Create a single-org database with generate() (admin1@bench.test, one
+    manager per team, `n_users` employees). Returns the employee ids."""
+    generate(db_path, 1, n_teams, n_users, n_assignments, recipients, seed)
+    conn = sqlite3.connect(db_path)
+    employee_ids = [r[0] for r in conn.execute("SELECT id FROM users WHERE role = 'employee' ORDER BY id")]
+    conn.close()
+    return employee_ids
+
+
+def login(app, email):
+    client = app.test_client()
+    res = client.post('/api/login', json={'email': email, 'password': PASSWORD})
+    assert res.status_code == 200, res.get_data(as_text=True)
+    return client
+
+
+class QueryCounter:
+    """Counts statements on the next pooled connection for `db_path`.
+
+    The pool is LIFO, so the connection traced here is the one the next
+    request will get back.
+    """
+
+    def __init__(self, db_path):
+        self.count = 0
+        pool = get_pool(db_path)
+        conn = pool.acquire()
+        conn.set_trace_callback(self._trace)
+        pool.release(conn)
+
+    def _trace(self, statement):
+        self.count += 1
+
+    def reset(self):
+        self.count = 0
+
+
+def measure(fn, repeat=5):
+    """Run `fn` `repeat` times and return latency stats in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        'min_ms': round(min(samples), 2),
+        'median_ms': round(statistics.median(samples), 2),
+        'max_ms': round(max(samples), 2),
+    }
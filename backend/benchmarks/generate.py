@@ -0,0 +1,186 @@
+# backend/benchmarks/generate.py
+#
+# Synthetic data for benchmarks and load tests: `orgs` organizations, each
+# with an admin, `teams` teams (one manager each), `employees` employees and
+# `assignments` assignments. Team sizes are skewed, some employees belong to
+# two teams, and assignments are a mix of general, team and hand-picked
+# recipient ones, created by the admin or the relevant team manager.
+#
+#   python -m benchmarks.generate [--db path] [--orgs 1] [--teams 50]
+#       [--employees 2000] [--assignments 12000] [--recipients 5] [--seed 42]
+#
+# Every user's password is PASSWORD (hashed once, at bcrypt cost 4). Users
+# are admin<org>@bench.test, manager<n>@bench.test and employee<n>@bench.test,
+# numbered across organizations.
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+import sys
+import time
+import bcrypt
+from app import visibility
+from app.db_setup import initialize_database
+
+PASSWORD = 'password123'
+BATCH_SIZE = 5000
+
+FIRST_NAMES = ['Alex', 'Sam', 'Maria', 'Wei', 'Fatima', 'John', 'Priya', 'Lucas', 'Aisha', 'Tom',
+               'Elena', 'Omar', 'Yuki', 'Nina', 'Carlos', 'Sara', 'Ivan', 'Leila', 'Ben', 'Mina']
+LAST_NAMES = ['Smith', 'Chen', 'Garcia', 'Khan', 'Müller', 'Rossi', 'Nguyen', 'Silva', 'Kim', 'Cohen',
+              'Novak', 'Haddad', 'Ito', 'Brown', 'Petrov', 'Ahmadi', 'Lopez', 'Dubois', 'Singh', 'Berg']
+DEPARTMENTS = ['Engineering', 'Sales', 'Marketing', 'Finance', 'Support', 'Operations', 'HR', 'Legal']
+POSITIONS = ['Associate', 'Analyst', 'Specialist', 'Engineer', 'Senior Engineer', 'Coordinator', 'Lead']
+TOPICS = ['Quarterly report', 'Security training', 'Code review', 'Customer follow-up', 'Budget draft',
+          'Onboarding checklist', 'Incident write-up', 'Roadmap feedback', 'Compliance form', 'Demo prep']
+
+DUE_BASE = datetime.date(2026, 1, 1)
+# Share of general, team and hand-picked recipient assignments
+KIND_WEIGHTS = (0.15, 0.45, 0.40)
+
+
+def admin_email(org_id):
+    return f'admin{org_id}@bench.test'
+
+
+def _batches(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert(c, sql, rows):
+    for batch in _batches(rows):
+        c.executemany(sql, batch)
+
+
+def generate(db_path, orgs=1, teams=50, employees=2000, assignments=12000, recipients=5, seed=42):
+    """Fill an empty database; returns the number of rows written per table."""
+    rng = random.Random(seed)
+    initialize_database(db_path)
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    c.execute('SELECT COUNT(*) FROM users')
+    if c.fetchone()[0]:
+        conn.close()
+        raise ValueError(f'{db_path} already has users; generate() expects an empty database')
+    hashed = bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt(4))
+    counts = dict.fromkeys(('organizations', 'users', 'teams', 'team_members', 'employees',
+                            'assignments', 'user_assignments'), 0)
+
+    user_id = team_id = assignment_id = 0
+    for org_id in range(1, orgs + 1):
+        c.execute('INSERT INTO organizations (id, name) VALUES (?, ?)', (org_id, f'Bench Org {org_id}'))
+
+        user_id += 1
+        admin_id = user_id
+        c.execute('INSERT INTO users (id, email, password, role, organization_id) VALUES (?, ?, ?, ?, ?)',
+                  (admin_id, admin_email(org_id), hashed, 'org_admin', org_id))
+
+        team_ids = list(range(team_id + 1, team_id + teams + 1))
+        manager_ids = list(range(user_id + 1, user_id + teams + 1))
+        employee_ids = list(range(user_id + teams + 1, user_id + teams + employees + 1))
+        # manager<n> / employee<n> are numbered from 0 across organizations
+        email = {u: f'manager{(org_id - 1) * teams + i}@bench.test' for i, u in enumerate(manager_ids)}
+        email.update((u, f'employee{(org_id - 1) * employees + i}@bench.test') for i, u in enumerate(employee_ids))
+        _insert(c, 'INSERT INTO users (id, email, password, role, organization_id) VALUES (?, ?, ?, ?, ?)',
+                ((u, email[u], hashed, 'team_manager', org_id) for u in manager_ids))
+        _insert(c, 'INSERT INTO users (id, email, password, role, organization_id) VALUES (?, ?, ?, ?, ?)',
+                ((u, email[u], hashed, 'employee', org_id) for u in employee_ids))
+        departments = {t: DEPARTMENTS[i % len(DEPARTMENTS)] for i, t in enumerate(team_ids)}
+        _insert(c, 'INSERT INTO teams (id, name, organization_id, manager_id) VALUES (?, ?, ?, ?)',
+                ((t, f'{departments[t]} {i + 1}', org_id, m) for i, (t, m) in enumerate(zip(team_ids, manager_ids))))
+
+        # A few large teams and a long tail of small ones; one in five
+        # employees also belongs to a second team.
+        weights = [1 / (rank + 1) ** 0.7 for rank in range(len(team_ids))]
+        home = dict(zip(employee_ids, rng.choices(team_ids, weights, k=len(employee_ids))))
+        members = {t: [] for t in team_ids}
+        membership = []
+        for u, t in home.items():
+            teams_of_user = {t}
+            if len(team_ids) > 1 and rng.random() < 0.2:
+                teams_of_user.add(rng.choice(team_ids))
+            for member_of in teams_of_user:
+                members[member_of].append(u)
+                membership.append((u, member_of))
+        _insert(c, 'INSERT INTO team_members (user_id, team_id) VALUES (?, ?)', membership)
+
+        _insert(c, '''INSERT INTO employees (first_name, last_name, email, position, department, phone, user_id,
+                                             organization_id)
+                      VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                ((rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), email[u],
+                  rng.choice(POSITIONS), departments[home[u]], f'+1-555-{u % 10000:04d}', u, org_id)
+                 for u in employee_ids))
+
+        manager_of = dict(zip(team_ids, manager_ids))
+        assignment_ids = range(assignment_id + 1, assignment_id + assignments + 1)
+        for batch in _batches(assignment_ids):
+            rows, recipient_rows = [], []
+            for a in batch:
+                kind = rng.choices(('general', 'team', 'recipients'), KIND_WEIGHTS)[0]
+                team = rng.choices(team_ids, weights)[0] if team_ids else None
+                due = None if rng.random() < 0.1 else (DUE_BASE + datetime.timedelta(days=rng.randint(-90, 270))).isoformat()
+                title = f'{rng.choice(TOPICS)} #{a}'
+                if kind == 'general' or team is None:
+                    rows.append((a, title, f'{title} for everyone', due, 1, None, admin_id))
+                elif kind == 'team':
+                    rows.append((a, title, f'{title} for team {team}', due, 0, team, manager_of[team]))
+                else:
+                    pool = members[team] if len(members[team]) >= recipients else employee_ids
+                    picked = rng.sample(pool, min(len(pool), rng.randint(1, 2 * recipients)))
+                    rows.append((a, title, f'{title} for {len(picked)} people', due, 0, None, manager_of[team]))
+                    recipient_rows.extend((u, a) for u in picked)
+            c.executemany('''INSERT INTO assignments (id, title, description, due_date, is_general, team_id, created_by_id)
+                             VALUES (?, ?, ?, ?, ?, ?, ?)''', rows)
+            c.executemany('INSERT INTO user_assignments (user_id, assignment_id) VALUES (?, ?)', recipient_rows)
+            counts['user_assignments'] += len(recipient_rows)
+        conn.commit()
+
+        counts['organizations'] += 1
+        counts['users'] += 1 + teams + employees
+        counts['teams'] += teams
+        counts['team_members'] += len(membership)
+        counts['employees'] += employees
+        counts['assignments'] += assignments
+        user_id += teams + employees
+        team_id += teams
+        assignment_id += assignments
+
+    counts['assignment_visibility'] = visibility.rebuild(conn)
+    conn.close()
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a synthetic database for benchmarks.')
+    parser.add_argument('--db', help='database file to create (defaults to a temp file)')
+    parser.add_argument('--orgs', type=int, default=1)
+    parser.add_argument('--teams', type=int, default=50, help='teams per organization')
+    parser.add_argument('--employees', type=int, default=2000, help='employees per organization')
+    parser.add_argument('--assignments', type=int, default=12000, help='assignments per organization')
+    parser.add_argument('--recipients', type=int, default=5, help='average recipients of a hand-picked assignment')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    if args.db is None:
+        from .common import temp_db_path
+        args.db = temp_db_path()
+    if os.path.exists(args.db):
+        parser.error(f'{args.db} already exists')
+    start = time.perf_counter()
+    counts = generate(args.db, args.orgs, args.teams, args.employees, args.assignments, args.recipients, args.seed)
+    print(f'Generated {args.db} in {time.perf_counter() - start:.1f}s')
+    for table, rows in counts.items():
+        print(f'  {table:<22} {rows:>10,}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,323 @@
+# backend/benchmarks/loadtest.py
+#
+# Drives the API with concurrent virtual users and reports per-endpoint
+# latency percentiles, throughput and SQL statements per request.
+#
+#   python -m benchmarks.loadtest [--db path] [--url http://localhost:8000]
+#       [--users 20] [--concurrency 8] [--duration 10] [--out results.json]
+#       [--compare baseline.json]
+#
+# Without --db a database is generated first (see generate.py). Without
+# --url requests go through the Flask test client in this process, which
+# also counts the statements each request runs; with --url they go to a
+# running server on the same --db (query counts then come from its
+# Server-Timing header, i.e. only with QUERY_METRICS=1, and the server's
+# login throttle may limit how many users can log in from one address).
+#
+# Every virtual user logs in once, then repeats until the time is up: list
+# the first page of assignments, follow next_cursor once, open one of the
+# listed assignments and, for managers, create an assignment and PATCH it.
+# `--concurrency` threads take turns running the users one round at a time.
+import argparse
+import collections
+import http.cookiejar
+import json
+import math
+import os
+import platform
+import random
+import re
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from flask import g
+from app.db import get_db
+from .common import make_app
+from .generate import PASSWORD, generate
+
+PAGE_SIZE = 50
+QUERY_HEADER = 'X-Bench-Queries'
+# Statement count in the server's Server-Timing header (app/query_metrics.py)
+SERVER_TIMING_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+class _AppClient:
+    """In-process client; each virtual user gets its own address so the
+    login throttle treats them as separate clients."""
+
+    def __init__(self, app, n):
+        self._client = app.test_client()
+        self._environ = {'REMOTE_ADDR': f'10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}'}
+
+    def request(self, method, path, body=None):
+        res = self._client.open(path, method=method, json=body, environ_base=self._environ)
+        queries = res.headers.get(QUERY_HEADER)
+        return res.status_code, res.get_json(silent=True), int(queries) if queries else None
+
+
+class _HttpClient:
+    def __init__(self, base_url):
+        self._base_url = base_url.rstrip('/')
+        self._opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        req = urllib.request.Request(self._base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'})
+        try:
+            with self._opener.open(req, timeout=30) as res:
+                status, headers, payload = res.status, res.headers, res.read()
+        except urllib.error.HTTPError as e:
+            status, headers, payload = e.code, e.headers, e.read()
+        timing = SERVER_TIMING_QUERIES.search(headers.get('Server-Timing') or '')
+        queries = int(timing.group(1)) if timing else None
+        try:
+            return status, json.loads(payload), queries
+        except ValueError:
+            return status, None, queries
+
+
+def _count_queries(app):
+    """Report the statements each request runs in a response header."""
+
+    @app.before_request
+    def _trace_queries():
+        counter = g.bench_queries = [0]
+
+        def trace(_):
+            counter[0] += 1
+        get_db().set_trace_callback(trace)
+
+    @app.after_request
+    def _report_queries(response):
+        if 'bench_queries' in g:
+            response.headers[QUERY_HEADER] = str(g.bench_queries[0])
+        return response
+
+    @app.teardown_request
+    def _untrace_queries(exc):
+        if 'db' in g:
+            g.db.set_trace_callback(None)
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, elapsed_ms, status, queries):
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append((elapsed_ms, status, queries))
+
+
+class VirtualUser:
+    def __init__(self, client, user, recorder, rng):
+        self.client = client
+        self.email, self.role, self.team_ids = user
+        self.recorder = recorder
+        self.rng = rng
+        self.logged_in = False
+
+    def _timed(self, endpoint, method, path, body=None):
+        start = time.perf_counter()
+        status, payload, queries = self.client.request(method, path, body)
+        self.recorder.record(endpoint, (time.perf_counter() - start) * 1000, status, queries)
+        return status, payload
+
+    def step(self):
+        """Log in first, then run one round of the flow per call. Returns
+        False once the user has given up (login refused other than 429)."""
+        if not self.logged_in:
+            status, _ = self._timed('POST /api/login', 'POST', '/api/login',
+                                    {'email': self.email, 'password': PASSWORD})
+            self.logged_in = status == 200
+            return status in (200, 429)
+
+        status, page = self._timed('GET /api/assignments', 'GET', f'/api/assignments?limit={PAGE_SIZE}')
+        listed = page['assignments'] if status == 200 else []
+        if status == 200 and page['next_cursor']:
+            self._timed('GET /api/assignments?cursor', 'GET',
+                        f"/api/assignments?limit={PAGE_SIZE}&cursor={page['next_cursor']}")
+        if listed:
+            assignment_id = self.rng.choice(listed)['id']
+            self._timed('GET /api/assignments/<id>', 'GET', f'/api/assignments/{assignment_id}')
+        if self.role != 'employee':
+            status, created = self._timed('POST /api/assignments', 'POST', '/api/assignments', {
+                'title': f'Load test {self.rng.randrange(10 ** 9)}',
+                'description': 'Created by benchmarks.loadtest',
+                'team_id': self.rng.choice(self.team_ids) if self.team_ids else None,
+            })
+            if status == 202:
+                self._timed('PATCH /api/assignments/<id>', 'PATCH',
+                            f"/api/assignments/{created['assignment_id']}", {'title': 'Load test (edited)'})
+        return True
+
+
+def percentile(sorted_samples, p):
+    """Nearest-rank percentile of an already sorted list."""
+    return sorted_samples[max(0, math.ceil(p / 100 * len(sorted_samples)) - 1)]
+
+
+def summarize(recorder, elapsed):
+    endpoints = {}
+    for endpoint, samples in sorted(recorder.samples.items()):
+        latencies = sorted(s[0] for s in samples)
+        queries = [s[2] for s in samples if s[2] is not None]
+        endpoints[endpoint] = {
+            'requests': len(samples),
+            'errors': sum(1 for s in samples if s[1] >= 400),
+            'throughput_rps': round(len(samples) / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'max_ms': round(latencies[-1], 2),
+            'queries_mean': round(sum(queries) / len(queries), 1) if queries else None,
+            'queries_max': max(queries) if queries else None,
+        }
+    total = sum(e['requests'] for e in endpoints.values())
+    return {'requests': total, 'throughput_rps': round(total / elapsed, 1), 'endpoints': endpoints}
+
+
+def _pick_users(db_path, n, rng):
+    """About one manager for every four employees, plus the first org admin."""
+    conn = sqlite3.connect(db_path)
+    try:
+        c = conn.cursor()
+        c.execute("SELECT email FROM users WHERE role = 'org_admin' ORDER BY id LIMIT 1")
+        admins = [(r[0], 'org_admin', []) for r in c.fetchall()]
+        c.execute('''SELECT u.email, GROUP_CONCAT(t.id) FROM users u JOIN teams t ON t.manager_id = u.id
+                     WHERE u.role = 'team_manager' GROUP BY u.id''')
+        managers = [(r[0], 'team_manager', [int(t) for t in r[1].split(',')]) for r in c.fetchall()]
+        c.execute("SELECT email FROM users WHERE role = 'employee'")
+        employees = [(r[0], 'employee', []) for r in c.fetchall()]
+    finally:
+        conn.close()
+    n_managers = min(len(managers), max(0, n // 5 - len(admins)))
+    users = admins[:n] + rng.sample(managers, n_managers)
+    return users + rng.sample(employees, min(len(employees), n - len(users)))
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(db_path, url=None, users=20, concurrency=8, duration=10, seed=42):
+    rng = random.Random(seed)
+    picked = _pick_users(db_path, users, rng)
+    if url:
+        clients = [_HttpClient(url) for _ in picked]
+    else:
+        app = make_app(db_path)
+        _count_queries(app)
+        clients = [_AppClient(app, n) for n in range(len(picked))]
+
+    recorder = Recorder()
+    idle = collections.deque(VirtualUser(client, user, recorder, random.Random(rng.random()))
+                             for client, user in zip(clients, picked))
+    idle_lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    # `concurrency` threads take turns running one step of an idle user
+    def worker():
+        while time.monotonic() < deadline:
+            with idle_lock:
+                if not idle:
+                    return
+                user = idle.popleft()
+            if user.step():
+                with idle_lock:
+                    idle.append(user)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(min(concurrency, len(idle)))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'git_revision': _git_revision(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'target': url or 'in-process',
+            'users': len(picked),
+            'concurrency': concurrency,
+            'duration_s': round(elapsed, 2),
+        },
+        **summarize(recorder, elapsed),
+    }
+
+
+def print_report(results):
+    meta = results['meta']
+    print(f"{meta['target']}: {meta['users']} users, concurrency {meta['concurrency']}, {meta['duration_s']}s, "
+          f"{results['requests']} requests, {results['throughput_rps']} req/s\n")
+    print(f"{'endpoint':<32} {'reqs':>6} {'err':>4} {'rps':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'queries':>8}")
+    for endpoint, s in results['endpoints'].items():
+        queries = '-' if s['queries_mean'] is None else s['queries_mean']
+        print(f"{endpoint:<32} {s['requests']:>6} {s['errors']:>4} {s['throughput_rps']:>7} "
+              f"{s['p50_ms']:>8} {s['p95_ms']:>8} {s['p99_ms']:>8} {queries:>8}")
+
+
+def compare(baseline, results, threshold):
+    """Print p95 changes against a saved run; returns the regressed endpoints."""
+    regressions = []
+    print(f"\n{'endpoint':<32} {'p95 before':>11} {'p95 now':>9} {'ratio':>7}")
+    for endpoint, s in results['endpoints'].items():
+        before = baseline['endpoints'].get(endpoint)
+        if not before:
+            continue
+        ratio = s['p95_ms'] / before['p95_ms'] if before['p95_ms'] else float('inf')
+        flag = '  REGRESSION' if ratio > threshold else ''
+        if flag:
+            regressions.append(endpoint)
+        print(f"{endpoint:<32} {before['p95_ms']:>11} {s['p95_ms']:>9} {ratio:>7.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load-test the API and report per-endpoint latency.')
+    parser.add_argument('--db', help='database to test against (defaults to a freshly generated one)')
+    parser.add_argument('--url', help='base URL of a running server (defaults to the in-process test client)')
+    parser.add_argument('--users', type=int, default=20, help='virtual users')
+    parser.add_argument('--concurrency', type=int, default=8, help='threads running virtual users')
+    parser.add_argument('--duration', type=float, default=10, help='seconds to run')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', help='write the results as JSON to this file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='p95 ratio above which --compare reports a regression (exit status 1)')
+    args = parser.parse_args(argv)
+
+    if args.db is None:
+        from .common import temp_db_path
+        args.db = temp_db_path()
+        generate(args.db, seed=args.seed)
+
+    results = run(args.db, args.url, args.users, args.concurrency, args.duration, args.seed)
+    print_report(results)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'\nResults written to {args.out}')
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(baseline, results, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
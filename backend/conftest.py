@@ -0,0 +1,143 @@
+# backend/conftest.py
+#
+# Fixtures for the tests in tests/. Every test gets apps on fresh databases
+# in its own temporary directory, seeded through the API:
+#
+#   organization 1 (Acme): admin@acme.test (org_admin),
+#       manager@acme.test (team_manager of team 1, "Red"),
+#       e1@acme.test (employee, member of Red), e2@acme.test (employee)
+#   organization 2 (Other): admin@other.test (org_admin),
+#       e3@other.test (employee)
+#
+# Apps run without job worker threads; run_jobs() works through the queue
+# inline. With make_app(sharding=True) each organization gets a database
+# file of its own.
+#
+#   python -m pytest      (from backend/ or the repository root)
+import sqlite3
+import bcrypt
+import pytest
+from app.db import get_db, use_database
+from app.db_setup import initialize_database
+from app.init import create_app
+from app import jobs, shards
+
+PASSWORD = 'secret-pw'
+
+ORGANIZATIONS = {
+    'Acme': [('admin@acme.test', 'org_admin'), ('manager@acme.test', 'team_manager'),
+             ('e1@acme.test', 'employee'), ('e2@acme.test', 'employee')],
+    'Other': [('admin@other.test', 'org_admin'), ('e3@other.test', 'employee')],
+}
+
+
+class TestApp:
+    """A seeded app with helpers to log in and to reach its databases."""
+
+    __test__ = False
+
+    def __init__(self, app, users=None, team_id=None):
+        self.app = app
+        self.users = dict(users or {})
+        self.team_id = team_id
+
+    def reopen(self, **config):
+        """Another app on the same database and uploads, e.g. with
+        sharding switched on."""
+        app = create_app({**self.app.config, **config})
+        return TestApp(app, self.users, self.team_id)
+
+    def client(self, email=None):
+        """A test client, logged in as `email` if given."""
+        client = self.app.test_client()
+        if email is not None:
+            res = client.post('/api/login', json={'email': email, 'password': PASSWORD})
+            assert res.status_code == 200, res.get_json()
+        return client
+
+    def database(self, organization_id=None):
+        """Path of an organization's database (the main one for None)."""
+        with self.app.app_context():
+            directory = shards.get_directory()
+            return directory.path_for(organization_id) if directory else self.app.config['DATABASE']
+
+    def execute(self, sql, params=(), organization_id=None):
+        """Run one statement on an organization's database and commit;
+        returns the rows."""
+        conn = sqlite3.connect(self.database(organization_id))
+        conn.execute('PRAGMA foreign_keys = ON')
+        try:
+            rows = conn.execute(sql, params).fetchall()
+            conn.commit()
+        finally:
+            conn.close()
+        return rows
+
+    def create_user(self, email, role, organization_id=None):
+        """Add a user directly (e.g. a super admin, which signup can't make)."""
+        hashed = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(4)).decode()
+        self.execute('INSERT INTO users (email, password, role, organization_id) VALUES (?, ?, ?, ?)',
+                     (email, hashed, role, organization_id), organization_id)
+        self.users[email] = self.execute('SELECT id FROM users WHERE email = ?', (email,), organization_id)[0][0]
+        return self.users[email]
+
+    def run_jobs(self):
+        """Run queued jobs in every database until none is due; returns the
+        statuses they ended in."""
+        statuses = []
+        with self.app.app_context():
+            for path in shards.all_databases():
+                use_database(path)
+                conn = get_db()
+                while True:
+                    job = jobs.claim(conn)
+                    if job is None:
+                        break
+                    statuses.append(jobs.run(conn, job))
+        return statuses
+
+    def seed(self):
+        client = self.client()
+        for org_id, (name, members) in enumerate(ORGANIZATIONS.items(), 1):
+            assert client.post('/api/organizations', json={'name': name}).get_json()['organization_id'] == org_id
+            for email, role in members:
+                res = client.post('/api/signup', json={'email': email, 'password': PASSWORD, 'organization_id': org_id})
+                assert res.status_code == 201, res.get_json()
+                self.execute('UPDATE users SET role = ? WHERE email = ?', (role, email), org_id)
+                self.users[email] = self.execute('SELECT id FROM users WHERE email = ?', (email,), org_id)[0][0]
+
+        admin = self.client('admin@acme.test')
+        team_id = admin.post('/api/teams', json={'name': 'Red', 'organization_id': 1}).get_json()['team_id']
+        self.execute('UPDATE teams SET manager_id = ? WHERE id = ?', (self.users['manager@acme.test'], team_id), 1)
+        assert admin.post(f'/api/teams/{team_id}/members', json={'user_id': self.users['e1@acme.test']}).status_code == 201
+        self.team_id = team_id
+        return self
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    count = 0
+
+    def make(sharding=False, **config):
+        nonlocal count
+        count += 1
+        root = tmp_path / f'app{count}'
+        root.mkdir()
+        db_path = str(root / 'database.db')
+        initialize_database(db_path)
+        app = create_app({
+            'TESTING': True,
+            'DATABASE': db_path,
+            'UPLOAD_FOLDER': str(root / 'uploads'),
+            'BCRYPT_ROUNDS': 4,
+            'JOB_WORKERS': 0,
+            'SHARDING': sharding,
+            **config,
+        })
+        return TestApp(app).seed()
+    return make
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
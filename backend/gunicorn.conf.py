@@ -0,0 +1,32 @@
+# gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Runs several worker processes so the API uses every core instead of one
+# debug-mode process. Each worker is threaded (gthread), since handlers
+# mostly wait on SQLite and file I/O. Settings can be overridden through
+# the environment.
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+# Each open /api/assignments/events stream occupies a thread for up to
+# CHANGEFEED_STREAM_SECONDS; size this for the expected number of
+# dashboards per worker.
+threads = int(os.environ.get('WORKER_THREADS', 16))
+# Each worker process also runs JOB_WORKERS (default 2) background job
+# threads, started on its first request; see app/jobs.py.
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then to cap slow memory growth
+max_requests = 10000
+max_requests_jitter = 1000
+accesslog = '-'
+
+
+def on_starting(server):
+    # Runs once in the master process, before any worker is forked: a
+    # version check, plus any pending migrations.
+    from app.db_setup import initialize_database
+    initialize_database()
@@ -1,9 +1,22 @@
 import sqlite3
+from app.auth import touch_principal_epoch
+from app.db_setup import DB_PATH, registered_shards
 
-conn = sqlite3.connect('database.db')
+EMAIL = 'alihabibi2299@gmail.com'
+
+conn = sqlite3.connect(DB_PATH)
+# With sharding on, the user may live in their organization's database
+row = conn.execute('SELECT organization_id FROM user_directory WHERE email = ?', (EMAIL,)).fetchone()
+db_path = registered_shards(conn).get(row[0], DB_PATH) if row else DB_PATH
+conn.close()
+
+conn = sqlite3.connect(db_path)
 c = conn.cursor()
-c.execute("UPDATE users SET is_admin = 1 WHERE email = ?", ('alihabibi2299@gmail.com',))
+c.execute("UPDATE users SET role = 'org_admin' WHERE email = ?", (EMAIL,))
 conn.commit()
 conn.close()
 
+# Running servers cache users' roles; make them reload it
+touch_principal_epoch(DB_PATH)
+
 print("Admin account updated!")
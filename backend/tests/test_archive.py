@@ -0,0 +1,43 @@
+import sqlite3
+from app import archive
+from app.db import connect
+
+
+def test_writes_during_a_batch_are_not_lost(app, tmp_path, monkeypatch):
+    admin = app.client('admin@acme.test')
+    e2 = app.users['e2@acme.test']
+    res = admin.post('/api/assignments', json={'title': 'Old', 'employee_ids': [e2]})
+    assignment_id = res.get_json()['assignment_id']
+    app.run_jobs()
+    app.execute("UPDATE assignments SET created_at = datetime('now', '-40 days')")
+
+    # Someone submits while the batch is being archived
+    keep_files = archive._keep_files
+    late_writes = []
+
+    def submit_meanwhile(c, assignment_ids, upload_root):
+        writer = sqlite3.connect(app.database(), timeout=0.1)
+        try:
+            writer.execute('''INSERT INTO submissions (assignment_id, employee_id, file_path, filename)
+                              VALUES (?, ?, 'late.txt', 'late.txt')''', (assignment_id, e2))
+            writer.commit()
+            late_writes.append(assignment_id)
+        except sqlite3.OperationalError:  # database is locked
+            pass
+        finally:
+            writer.close()
+        keep_files(c, assignment_ids, upload_root)
+
+    monkeypatch.setattr(archive, '_keep_files', submit_meanwhile)
+    conn = connect(app.database())
+    archive_conn = archive.open_archive(str(tmp_path / 'archive.db'))
+    try:
+        assert archive.archive_batch(conn, archive_conn, 30, app.app.config['UPLOAD_FOLDER']) == 1
+        document = archive.load(archive_conn, assignment_id)
+    finally:
+        conn.close()
+        archive_conn.close()
+
+    assert document['employee_ids'] == [e2]
+    assert len(document['submissions']) == len(late_writes) == 0
+    assert app.execute('SELECT COUNT(*) FROM assignments') == [(0,)]
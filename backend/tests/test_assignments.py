@@ -0,0 +1,111 @@
+import os
+import sqlite3
+from app import blobstore, stats
+
+
+def create(client, **assignment):
+    res = client.post('/api/assignments', json={'title': 'Task', **assignment})
+    assert res.status_code == 202, res.get_json()
+    return res.get_json()['assignment_id']
+
+
+def bulk_delete(client, ids):
+    return client.delete('/api/assignments/bulk', json={'ids': ids})
+
+
+def remaining(app, ids, organization_id=None):
+    marks = ','.join('?' * len(ids))
+    return sorted(r[0] for r in app.execute(f'SELECT id FROM assignments WHERE id IN ({marks})', ids, organization_id))
+
+
+def test_bulk_delete_only_what_the_user_manages(app):
+    admin, manager = app.client('admin@acme.test'), app.client('manager@acme.test')
+    team = create(admin, team_id=app.team_id)
+    general = create(admin)
+    own = create(manager, employee_ids=[app.users['e2@acme.test']])
+    other = create(app.client('admin@other.test'))
+    ids = [team, general, own, other, other + 1000]
+
+    # Not the manager's: the admin's teamless assignment, the other organization's
+    res = bulk_delete(manager, ids)
+    assert res.status_code == 200
+    assert res.get_json()['deleted_ids'] == [team, own]
+    assert res.get_json()['skipped_ids'] == [general, other, other + 1000]
+
+    res = bulk_delete(app.client('admin@other.test'), [general])
+    assert res.get_json()['deleted_ids'] == [] and res.get_json()['skipped_ids'] == [general]
+    assert bulk_delete(app.client('e1@acme.test'), [general]).status_code == 403
+    assert remaining(app, ids) == [general, other]
+
+    assert bulk_delete(admin, ids).get_json()['deleted_ids'] == [general]
+    assert remaining(app, ids) == [other]
+
+
+def test_single_delete_checks_ownership(app):
+    admin = app.client('admin@acme.test')
+    general = create(admin)
+    assert app.client('admin@other.test').delete(f'/api/assignments/{general}').status_code == 403
+    assert app.client('manager@acme.test').delete(f'/api/assignments/{general}').status_code == 403
+    assert admin.delete(f'/api/assignments/{general + 1000}').status_code == 404
+    assert admin.delete(f'/api/assignments/{general}').status_code == 200
+    assert remaining(app, [general]) == []
+
+
+def test_delete_cascades_and_collects_files(app):
+    admin = app.client('admin@acme.test')
+    e1, e2 = app.users['e1@acme.test'], app.users['e2@acme.test']
+    assignment_id = create(admin, team_id=app.team_id, employee_ids=[e2])
+    kept_id = create(admin, employee_ids=[e2])
+    app.run_jobs()  # notification emails
+    employee = app.client('e2@acme.test')
+    for aid, data in ((assignment_id, b'only here'), (assignment_id, b'shared'), (kept_id, b'shared')):
+        res = employee.post(f'/api/assignments/{aid}/submissions', data=data, headers={'X-Filename': 'work.txt'})
+        assert res.status_code == 201, res.get_json()
+    upload_root = app.app.config['UPLOAD_FOLDER']
+    files = {sha: blobstore.blob_path(upload_root, sha) for sha, in app.execute('SELECT sha256 FROM blobs')}
+    assert len(files) == 2
+
+    res = bulk_delete(admin, [assignment_id])
+    assert res.get_json()['deleted_ids'] == [assignment_id]
+    for table in ('user_assignments', 'assignment_visibility', 'submissions', 'assignment_notifications'):
+        rows = app.execute(f'SELECT COUNT(*) FROM {table} WHERE assignment_id = ?', (assignment_id,))
+        assert rows == [(0,)], table
+    assert sorted(r[0] for r in app.execute('SELECT user_id FROM assignment_visibility WHERE assignment_id = ?',
+                                            (kept_id,))) == [e2]
+    assert e1 not in [r[0] for r in app.execute('SELECT user_id FROM assignment_visibility')]
+
+    # The file only the deleted assignment used is gone; the shared one stays
+    assert app.execute('SELECT refcount FROM blobs') == [(1,)]
+    kept = app.execute('SELECT sha256 FROM blobs')[0][0]
+    assert {sha: os.path.exists(path) for sha, path in files.items()} == {sha: sha == kept for sha in files}
+
+    conn = sqlite3.connect(app.database())
+    try:
+        assert stats.verify(conn) == 0
+    finally:
+        conn.close()
+
+
+def test_update_checks_ownership_and_target_team(app):
+    admin, manager = app.client('admin@acme.test'), app.client('manager@acme.test')
+    team = create(admin, team_id=app.team_id)
+    general = create(admin)
+    blue = admin.post('/api/teams', json={'name': 'Blue', 'organization_id': 1}).get_json()['team_id']
+    other_team = app.client('admin@other.test').post('/api/teams', json={'name': 'Green', 'organization_id': 2})
+    other_team = other_team.get_json()['team_id']
+
+    # The manager may rename their team's assignment, not retarget it to
+    # another team nor touch the admin's teamless one
+    assert manager.patch(f'/api/assignments/{team}', json={'title': 'Renamed'}).status_code == 200
+    assert manager.patch(f'/api/assignments/{team}', json={'team_id': blue}).status_code == 403
+    assert manager.put(f'/api/assignments/{team}', json={'title': 'Moved', 'team_id': blue}).status_code == 403
+    assert manager.patch(f'/api/assignments/{general}', json={'title': 'Mine'}).status_code == 403
+    assert app.execute('SELECT id, title, team_id FROM assignments ORDER BY id') == [
+        (team, 'Renamed', app.team_id), (general, 'Task', None)]
+
+    # Admins only within their organization
+    assert admin.patch(f'/api/assignments/{team}', json={'team_id': other_team}).status_code == 403
+    assert app.client('admin@other.test').patch(f'/api/assignments/{general}', json={'title': 'Ours'}).status_code \
+        == 403
+    assert admin.patch(f'/api/assignments/{team}', json={'team_id': blue}).status_code == 200
+    assert admin.patch(f'/api/assignments/{general + 1000}', json={'title': 'Gone'}).status_code == 404
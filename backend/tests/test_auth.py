@@ -0,0 +1,42 @@
+import time
+import bcrypt
+from conftest import PASSWORD
+from app.auth import touch_principal_epoch
+
+
+def test_role_change_reaches_cached_principal(app):
+    employee = app.client('e2@acme.test')
+    assert employee.get('/api/stats').status_code == 403
+
+    app.execute("UPDATE users SET role = 'org_admin' WHERE email = 'e2@acme.test'", organization_id=1)
+    # Cached until the epoch moves
+    assert employee.get('/api/stats').status_code == 403
+    touch_principal_epoch(app.app.config['DATABASE'])
+    assert employee.get('/api/stats').status_code == 200
+
+
+def test_deleted_user_is_logged_out(app):
+    employee = app.client('e2@acme.test')
+    assert employee.get('/api/user').get_json()['email'] == 'e2@acme.test'
+    app.execute("DELETE FROM users WHERE email = 'e2@acme.test'", organization_id=1)
+    touch_principal_epoch(app.app.config['DATABASE'])
+    assert employee.get('/api/user').get_json()['email'] is None
+
+
+def test_slow_hashing_answers_busy(make_app, monkeypatch):
+    app = make_app(PASSWORD_HASH_TIMEOUT=0.05)
+    checkpw, hashpw = bcrypt.checkpw, bcrypt.hashpw
+
+    def slow(fn):
+        def wrapper(*args):
+            time.sleep(0.3)
+            return fn(*args)
+        return wrapper
+
+    monkeypatch.setattr(bcrypt, 'checkpw', slow(checkpw))
+    monkeypatch.setattr(bcrypt, 'hashpw', slow(hashpw))
+    client = app.client()
+    res = client.post('/api/login', json={'email': 'e2@acme.test', 'password': PASSWORD})
+    assert res.status_code == 429 and res.headers['Retry-After']
+    res = client.post('/api/signup', json={'email': 'new@acme.test', 'password': PASSWORD, 'organization_id': 1})
+    assert res.status_code == 429 and res.headers['Retry-After']
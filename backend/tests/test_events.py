@@ -0,0 +1,29 @@
+import json
+
+
+def deleted_ids(app, email):
+    res = app.client(email).get('/api/assignments/events?since=0')
+    ids = set()
+    for event in res.get_data(as_text=True).split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in event.splitlines() if ': ' in line)
+        if lines.get('event') == 'deleted':
+            ids.add(json.loads(lines['data'])['id'])
+    return ids
+
+
+def test_deletions_go_to_those_who_could_list_them(make_app):
+    app = make_app(CHANGEFEED_STREAM_SECONDS=0)
+    admin = app.client('admin@acme.test')
+    team = admin.post('/api/assignments', json={'title': 'Team', 'team_id': app.team_id}).get_json()['assignment_id']
+    own = admin.post('/api/assignments', json={'title': 'Own', 'employee_ids': [app.users['e2@acme.test']]})
+    own = own.get_json()['assignment_id']
+    general = admin.post('/api/assignments', json={'title': 'General'}).get_json()['assignment_id']
+    app.run_jobs()
+    assert admin.delete('/api/assignments/bulk', json={'ids': [team, own, general]}).status_code == 200
+
+    assert deleted_ids(app, 'admin@acme.test') == {team, own, general}
+    assert deleted_ids(app, 'manager@acme.test') == {team, general}
+    assert deleted_ids(app, 'e1@acme.test') == {team, general}
+    assert deleted_ids(app, 'e2@acme.test') == {own, general}
+    assert deleted_ids(app, 'admin@other.test') == set()
+    assert deleted_ids(app, 'e3@other.test') == set()
@@ -0,0 +1,110 @@
+import pytest
+from app import notifications
+
+
+class RecordingMailer:
+    def __init__(self, on_send=None):
+        self.sent = []
+        self.subjects = []
+        self.on_send = on_send
+
+    def send_many(self, messages):
+        if self.on_send:
+            self.on_send(self)
+        self.sent += [m['To'] for m in messages]
+        self.subjects += [m['Subject'] for m in messages]
+
+
+@pytest.fixture
+def mailer(app):
+    mailer = RecordingMailer()
+    app.app.extensions['mailer'] = mailer
+    return mailer
+
+
+def job_of(app, client, job_id):
+    return client.get(f'/api/jobs/{job_id}').get_json()
+
+
+def test_fan_out_emails_recipients_once(app, mailer):
+    admin = app.client('admin@acme.test')
+    res = admin.post('/api/assignments', json={'title': 'Team task', 'team_id': app.team_id})
+    assert res.status_code == 202
+    assert res.headers['Location'] == f"/api/jobs/{res.get_json()['job_id']}"
+    # Team members see it once the job has run
+    assert app.client('e1@acme.test').get('/api/assignments').get_json()['assignments'] == []
+    assert app.run_jobs() == ['done']
+    assert [a['title'] for a in app.client('e1@acme.test').get('/api/assignments').get_json()['assignments']] \
+        == ['Team task']
+    assert mailer.sent == ['e1@acme.test']
+    assert job_of(app, admin, res.get_json()['job_id'])['result'] == {'assignments': 1, 'emails_sent': 1}
+
+
+def test_idempotency_key_returns_the_first_job(app, mailer):
+    admin = app.client('admin@acme.test')
+    headers = {'Idempotency-Key': 'abc'}
+    first = admin.post('/api/assignments', json={'title': 'Once'}, headers=headers).get_json()
+    again = admin.post('/api/assignments', json={'title': 'Once'}, headers=headers).get_json()
+    assert (again['assignment_id'], again['job_id']) == (first['assignment_id'], first['job_id'])
+    assert app.execute('SELECT COUNT(*) FROM assignments') == [(1,)]
+
+
+def test_failed_batch_is_retried_alone(app, mailer, monkeypatch):
+    monkeypatch.setattr(notifications, 'MAIL_BATCH', 1)
+    admin = app.client('admin@acme.test')
+    recipients = [app.users['e1@acme.test'], app.users['e2@acme.test']]
+    job_id = admin.post('/api/assignments', json={'title': 'Flaky', 'employee_ids': recipients}).get_json()['job_id']
+
+    def fail_second_batch(m):
+        if m.sent:
+            raise OSError('SMTP down')
+    mailer.on_send = fail_second_batch
+    # Queued again with a backoff, so not picked up a second time here
+    assert app.run_jobs() == ['queued']
+    job = job_of(app, admin, job_id)
+    assert job['status'] == 'queued' and job['attempts'] == 1 and 'SMTP down' in job['last_error']
+
+    mailer.on_send = None
+    app.execute("UPDATE jobs SET run_at = datetime('now')")
+    assert app.run_jobs() == ['done']
+    assert mailer.sent == ['e1@acme.test', 'e2@acme.test']
+
+
+def test_assignment_deleted_before_fan_out(app, mailer):
+    admin = app.client('admin@acme.test')
+    res = admin.post('/api/assignments', json={'title': 'Gone', 'employee_ids': [app.users['e1@acme.test']]})
+    assert admin.delete(f"/api/assignments/{res.get_json()['assignment_id']}").status_code == 200
+    assert app.run_jobs() == ['done']
+    assert mailer.sent == []
+
+
+def test_assignment_deleted_during_fan_out(app, mailer, monkeypatch):
+    monkeypatch.setattr(notifications, 'MAIL_BATCH', 1)
+    admin = app.client('admin@acme.test')
+    recipients = [app.users['e1@acme.test'], app.users['e2@acme.test']]
+    res = admin.post('/api/assignments', json={'title': 'Racing', 'employee_ids': recipients}).get_json()
+
+    def delete_assignment(m):
+        app.execute('DELETE FROM assignments WHERE id = ?', (res['assignment_id'],))
+    mailer.on_send = delete_assignment
+    assert app.run_jobs() == ['done']
+    # The batch in flight went out, the rest did not
+    assert mailer.sent == ['e1@acme.test']
+    assert job_of(app, admin, res['job_id'])['result']['emails_sent'] == 1
+    assert app.execute('SELECT COUNT(*) FROM assignment_notifications') == [(0,)]
+
+
+def test_multiline_title_is_emailed_on_one_line(app, mailer):
+    admin = app.client('admin@acme.test')
+    admin.post('/api/assignments', json={'title': 'Quarterly\r\nreport\tdraft', 'employee_ids': [app.users['e1@acme.test']]})
+    assert app.run_jobs() == ['done']
+    assert mailer.subjects == ['New assignment: Quarterly report draft']
+
+
+def test_jobs_are_visible_within_the_organization(app, mailer):
+    manager = app.client('manager@acme.test')
+    job_id = manager.post('/api/assignments', json={'title': 'Task', 'team_id': app.team_id}).get_json()['job_id']
+    assert job_of(app, manager, job_id)['status'] == 'queued'
+    assert job_of(app, app.client('admin@acme.test'), job_id)['status'] == 'queued'
+    assert app.client('admin@other.test').get(f'/api/jobs/{job_id}').status_code == 404
+    assert app.client('e1@acme.test').get(f'/api/jobs/{job_id}').status_code == 404
@@ -0,0 +1,44 @@
+def create_assignment(client, **fields):
+    res = client.post('/api/assignments', json={'title': 'Task', **fields})
+    assert res.status_code == 202, res.get_json()
+    return res.get_json()['assignment_id']
+
+
+def test_unchanged_list_is_not_modified(app):
+    admin = app.client('admin@acme.test')
+    create_assignment(admin)
+    res = admin.get('/api/assignments')
+    etag = res.headers['ETag']
+    assert res.headers['Cache-Control'] == 'private, no-cache'
+
+    res = admin.get('/api/assignments', headers={'If-None-Match': etag})
+    assert res.status_code == 304 and res.data == b''
+    # Compressed responses carry the ETag weak; it still matches
+    assert admin.get('/api/assignments', headers={'If-None-Match': f'W/{etag}'}).status_code == 304
+
+
+def test_writes_change_the_etag(app):
+    admin = app.client('admin@acme.test')
+    first = create_assignment(admin)
+    res = admin.get('/api/assignments')
+    etag = res.headers['ETag']
+
+    second = create_assignment(admin)
+    res = admin.get('/api/assignments', headers={'If-None-Match': etag})
+    assert res.status_code == 200 and res.headers['ETag'] != etag
+    assert [a['id'] for a in res.get_json()['assignments']] == [first, second]
+
+    etag = res.headers['ETag']
+    admin.patch(f'/api/assignments/{first}', json={'title': 'Renamed'})
+    res = admin.get(f'/api/assignments/{first}', headers={'If-None-Match': etag})
+    assert res.status_code == 200 and res.get_json()['assignment']['title'] == 'Renamed'
+
+
+def test_responses_are_per_user(app):
+    admin = app.client('admin@acme.test')
+    create_assignment(admin, employee_ids=[app.users['e1@acme.test']])
+    e1, e2 = app.client('e1@acme.test'), app.client('e2@acme.test')
+    res1, res2 = e1.get('/api/assignments'), e2.get('/api/assignments')
+    assert len(res1.get_json()['assignments']) == 1 and res2.get_json()['assignments'] == []
+    assert res1.headers['ETag'] != res2.headers['ETag']
+    assert e2.get('/api/assignments', headers={'If-None-Match': res1.headers['ETag']}).status_code == 200
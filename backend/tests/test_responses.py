@@ -0,0 +1,50 @@
+import gzip
+import importlib
+import json
+import sys
+import pytest
+from app import responses
+
+
+@pytest.fixture
+def without_optional(monkeypatch):
+    """app.responses as imported without orjson and brotli installed."""
+    monkeypatch.setitem(sys.modules, 'orjson', None)
+    monkeypatch.setitem(sys.modules, 'brotli', None)
+    importlib.reload(responses)
+    yield
+    monkeypatch.undo()
+    importlib.reload(responses)
+
+
+def create_assignments(client, n):
+    for i in range(n):
+        res = client.post('/api/assignments', json={'title': f'Task {i}', 'description': 'Details ' * 20})
+        assert res.status_code == 202, res.get_json()
+
+
+def test_fallback_without_orjson_and_brotli(without_optional, make_app):
+    assert responses.orjson is None and responses.brotli is None
+    app = make_app()
+    admin = app.client('admin@acme.test')
+    create_assignments(admin, 5)
+
+    plain = admin.get('/api/assignments', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in plain.headers
+    body = plain.get_json()
+    assert len(body['assignments']) == 5
+    # Flask's own compact encoding
+    assert plain.data == (json.dumps(body, separators=(',', ':'), sort_keys=True) + '\n').encode()
+
+    # brotli is preferred but not available: gzip, with a weak ETag
+    res = admin.get('/api/assignments', headers={'Accept-Encoding': 'br, gzip;q=0.5'})
+    assert res.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(res.data) == plain.data
+    assert res.headers['ETag'].startswith('W/')
+    res = admin.get('/api/assignments', headers={'Accept-Encoding': 'br', 'If-None-Match': res.headers['ETag']})
+    assert res.status_code == 304
+    assert 'Content-Encoding' not in admin.get('/api/assignments', headers={'Accept-Encoding': 'br'}).headers
+
+    res = admin.get('/api/assignments?format=columnar', headers={'Accept-Encoding': 'identity'})
+    columnar = res.get_json()
+    assert [dict(zip(columnar['columns'], row)) for row in columnar['rows']] == body['assignments']
@@ -0,0 +1,73 @@
+import os
+import sqlite3
+from app import shards, stats
+from app.shards import SHARD_ID_BITS
+
+
+def test_super_admin_reads_the_organizations_database(make_app):
+    app = make_app(sharding=True)
+    app.create_user('root@example.test', 'super_admin')
+    root = app.client('root@example.test')
+
+    res = root.get('/api/employees?organization_id=1')
+    assert res.status_code == 200 and res.get_json()['employees'] == []
+    etag = res.headers['ETag']
+
+    # Written to Acme's database only
+    admin = app.client('admin@acme.test')
+    assert admin.post('/api/employees', json={'email': 'new@acme.test', 'first_name': 'New'}).status_code == 201
+    res = root.get('/api/employees?organization_id=1', headers={'If-None-Match': etag})
+    assert res.status_code == 200 and res.headers['ETag'] != etag
+    assert [e['email'] for e in res.get_json()['employees']] == ['new@acme.test']
+
+    other = root.get('/api/employees?organization_id=2')
+    assert other.get_json()['employees'] == [] and other.headers['ETag'] != res.headers['ETag']
+    assert admin.get('/api/employees').get_json()['employees'] == res.get_json()['employees']
+
+
+def test_organizations_are_isolated(make_app):
+    app = make_app(sharding=True)
+    paths = {app.database(1), app.database(2), app.database()}
+    assert len(paths) == 3
+
+    acme = app.client('admin@acme.test').post('/api/assignments', json={'title': 'Acme only'}).get_json()
+    other = app.client('admin@other.test').post('/api/assignments', json={'title': 'Other only'}).get_json()
+    app.run_jobs()
+    # Ids come from each organization's own range
+    assert acme['assignment_id'] >> SHARD_ID_BITS == 1 and other['assignment_id'] >> SHARD_ID_BITS == 2
+    assert [a['title'] for a in app.client('e3@other.test').get('/api/assignments').get_json()['assignments']] \
+        == ['Other only']
+    assert app.execute('SELECT COUNT(*) FROM assignments') == [(0,)]
+
+
+def test_split_moves_rows_and_files(app):
+    admin = app.client('admin@acme.test')
+    assignment_id = admin.post('/api/assignments', json={'title': 'Before split',
+                                                         'team_id': app.team_id}).get_json()['assignment_id']
+    app.run_jobs()
+    e1 = app.client('e1@acme.test')
+    data = os.urandom(3000)
+    submission = e1.post(f'/api/assignments/{assignment_id}/submissions', data=data,
+                         headers={'X-Filename': 'work.bin'}).get_json()['submission']
+
+    config = app.app.config
+    assert shards.main(['split', '--db', config['DATABASE'], '--uploads', config['UPLOAD_FOLDER']]) == 0
+
+    sharded = app.reopen(SHARDING=True)
+    shard_path = sharded.database(1)
+    assert shard_path != config['DATABASE']
+    for path in (config['DATABASE'], shard_path):
+        conn = sqlite3.connect(path)
+        try:
+            assert stats.verify(conn) == 0
+        finally:
+            conn.close()
+    assert sharded.execute('SELECT COUNT(*) FROM assignments') == [(0,)]
+    assert sharded.execute('SELECT title FROM assignments', organization_id=1) == [('Before split',)]
+
+    e1 = sharded.client('e1@acme.test')
+    assert [a['id'] for a in e1.get('/api/assignments').get_json()['assignments']] == [assignment_id]
+    assert e1.get(f"/api/submissions/{submission['id']}/file").data == data
+    # New rows land in the shard, in its id range
+    res = sharded.client('admin@acme.test').post('/api/assignments', json={'title': 'After split'})
+    assert res.get_json()['assignment_id'] >> SHARD_ID_BITS == 1
@@ -0,0 +1,93 @@
+import sqlite3
+from datetime import date, timedelta
+from app import stats
+
+# What the dashboard counts, straight from the source tables: a general
+# assignment is expected from every employee of its organization
+REFERENCE_SQL = '''
+    SELECT IFNULL(t.organization_id, u.organization_id) AS organization_id,
+           COUNT(*),
+           SUM(CASE WHEN a.is_general = 1
+                    THEN (SELECT COUNT(*) FROM users e WHERE e.role = 'employee'
+                          AND e.organization_id = IFNULL(t.organization_id, u.organization_id))
+                    ELSE (SELECT COUNT(*) FROM assignment_visibility v WHERE v.assignment_id = a.id) END),
+           SUM((SELECT COUNT(DISTINCT s.employee_id) FROM submissions s WHERE s.assignment_id = a.id))
+    FROM assignments a
+    LEFT JOIN teams t ON t.id = a.team_id
+    LEFT JOIN users u ON u.id = a.created_by_id
+    GROUP BY 1
+'''
+
+
+def assert_counters_match(app):
+    conn = sqlite3.connect(app.database())
+    try:
+        assert stats.verify(conn) == 0
+        counted = {org: (c['total'], c['expected'], c['received'])
+                   for org, c in stats.organization_stats(conn.cursor()).items()}
+        assert counted == {org: tuple(rest) for org, *rest in conn.execute(REFERENCE_SQL)}
+    finally:
+        conn.close()
+    return counted
+
+
+def submit(app, email, assignment_id):
+    res = app.client(email).post(f'/api/assignments/{assignment_id}/submissions', data=email.encode(),
+                                 headers={'X-Filename': 'work.txt'})
+    assert res.status_code == 201, res.get_json()
+
+
+def test_counters_match_the_source_tables(app):
+    admin = app.client('admin@acme.test')
+    yesterday, tomorrow = date.today() - timedelta(days=1), date.today() + timedelta(days=1)
+    team = admin.post('/api/assignments', json={'title': 'Team', 'team_id': app.team_id,
+                                                'due_date': yesterday.isoformat()}).get_json()['assignment_id']
+    direct = admin.post('/api/assignments', json={'title': 'Direct', 'employee_ids': [app.users['e2@acme.test']],
+                                                  'due_date': tomorrow.isoformat()}).get_json()['assignment_id']
+    general = admin.post('/api/assignments', json={'title': 'General'}).get_json()['assignment_id']
+    app.client('admin@other.test').post('/api/assignments', json={'title': 'Elsewhere'})
+    app.run_jobs()
+    for email, assignment_id in (('e1@acme.test', team), ('e2@acme.test', direct),
+                                 ('e1@acme.test', general), ('e2@acme.test', general)):
+        submit(app, email, assignment_id)
+
+    # Acme: 1 team member + 1 recipient + 2 employees for the general one,
+    # all of whom submitted
+    assert assert_counters_match(app) == {1: (3, 4, 4), 2: (1, 1, 0)}
+    res = admin.get('/api/stats').get_json()
+    assert res['organization'] == {'organization_id': 1, 'total': 3, 'overdue': 1, 'due_this_week': 1,
+                                   'expected': 4, 'received': 4}
+
+    # Employees joining and leaving change what general assignments expect
+    client = app.client()
+    for email in ('e4@acme.test', 'e5@acme.test'):
+        assert client.post('/api/signup', json={'email': email, 'password': 'pw', 'organization_id': 1}).status_code == 201
+    assert assert_counters_match(app)[1] == (3, 6, 4)
+    app.execute("DELETE FROM users WHERE email = 'e5@acme.test'")
+    app.execute("UPDATE users SET role = 'team_manager' WHERE email = 'e4@acme.test'")
+    assert assert_counters_match(app)[1] == (3, 4, 4)
+
+    # Moving in and out of general, and deleting (e2's submission still
+    # counts once the assignment is only for the team)
+    admin.patch(f'/api/assignments/{general}', json={'team_id': app.team_id})
+    app.run_jobs()
+    assert assert_counters_match(app)[1] == (3, 3, 4)
+    admin.patch(f'/api/assignments/{general}', json={'team_id': None})
+    assert assert_counters_match(app)[1] == (3, 4, 4)
+    admin.delete(f'/api/assignments/{general}')
+    assert assert_counters_match(app)[1] == (2, 2, 2)
+
+
+def test_rebuild_restores_counters(app):
+    admin = app.client('admin@acme.test')
+    admin.post('/api/assignments', json={'title': 'General'})
+    admin.post('/api/assignments', json={'title': 'Team', 'team_id': app.team_id})
+    app.run_jobs()
+    app.execute('UPDATE assignment_stats SET expected = expected + 5, general = 0')
+    conn = sqlite3.connect(app.database())
+    try:
+        assert stats.verify(conn) > 0
+        stats.rebuild(conn)
+    finally:
+        conn.close()
+    assert assert_counters_match(app) == {1: (2, 3, 0)}
@@ -0,0 +1,48 @@
+import io
+import zipfile
+
+
+def setup_submission(app):
+    """An Acme team assignment with e1's submission; returns their ids."""
+    admin = app.client('admin@acme.test')
+    res = admin.post('/api/assignments', json={'title': 'Report', 'team_id': app.team_id})
+    assignment_id = res.get_json()['assignment_id']
+    app.run_jobs()  # team visibility
+    res = app.client('e1@acme.test').post(f'/api/assignments/{assignment_id}/submissions', data=b'confidential',
+                                          headers={'X-Filename': 'report.txt'})
+    assert res.status_code == 201, res.get_json()
+    return assignment_id, res.get_json()['submission']['id']
+
+
+def test_managers_read_their_assignments_submissions(app):
+    assignment_id, submission_id = setup_submission(app)
+    for email in ('admin@acme.test', 'manager@acme.test'):
+        client = app.client(email)
+        res = client.get(f'/api/assignments/{assignment_id}/submissions')
+        assert [s['id'] for s in res.get_json()['submissions']] == [submission_id]
+        assert client.get(f'/api/submissions/{submission_id}/file').data == b'confidential'
+        res = client.get(f'/api/assignments/{assignment_id}/submissions.zip')
+        assert zipfile.ZipFile(io.BytesIO(res.data)).read(f"{app.users['e1@acme.test']}/{submission_id}_report.txt") \
+            == b'confidential'
+
+
+def test_submissions_of_other_organizations_are_not_found(app):
+    assignment_id, submission_id = setup_submission(app)
+    other_admin = app.client('admin@other.test')
+    assert other_admin.get(f'/api/assignments/{assignment_id}/submissions').status_code == 404
+    assert other_admin.get(f'/api/submissions/{submission_id}/file').status_code == 404
+    assert other_admin.get(f'/api/assignments/{assignment_id}/submissions.zip').status_code == 404
+
+
+def test_submissions_of_other_teams_are_not_found(app):
+    assignment_id, submission_id = setup_submission(app)
+    # A manager of another Acme team
+    app.create_user('manager2@acme.test', 'team_manager', 1)
+    app.client('admin@acme.test').post('/api/teams', json={'name': 'Blue', 'organization_id': 1})
+    app.execute("UPDATE teams SET manager_id = ? WHERE name = 'Blue'", (app.users['manager2@acme.test'],))
+    manager = app.client('manager2@acme.test')
+    assert manager.get(f'/api/assignments/{assignment_id}/submissions').status_code == 404
+    assert manager.get(f'/api/submissions/{submission_id}/file').status_code == 404
+    assert manager.get(f'/api/assignments/{assignment_id}/submissions.zip').status_code == 404
+    # Nor to other employees
+    assert app.client('e2@acme.test').get(f'/api/submissions/{submission_id}/file').status_code == 404
@@ -0,0 +1,33 @@
+def test_add_team_member_reports_missing_rows(app):
+    admin = app.client('admin@acme.test')
+    e2 = app.users['e2@acme.test']
+    assert admin.post('/api/teams/999/members', json={'user_id': e2}).status_code == 404
+    res = admin.post(f'/api/teams/{app.team_id}/members', json={'user_id': 999})
+    assert res.status_code == 400 and res.get_json()['message'] == 'User not found'
+
+    assert admin.post(f'/api/teams/{app.team_id}/members', json={'user_id': e2}).status_code == 201
+    res = admin.post(f'/api/teams/{app.team_id}/members', json={'user_id': e2})
+    assert res.status_code == 400 and res.get_json()['message'] == 'User is already in this team'
+
+
+def test_create_team_in_missing_organization(app):
+    res = app.client('admin@acme.test').post('/api/teams', json={'name': 'Blue', 'organization_id': 999})
+    assert res.status_code == 404
+
+
+def test_signup_reports_missing_organization(app):
+    client = app.client()
+    res = client.post('/api/signup', json={'email': 'new@acme.test', 'password': 'pw', 'organization_id': 999})
+    assert res.status_code == 400 and res.get_json()['message'] == 'Organization not found'
+    res = client.post('/api/signup', json={'email': 'e1@acme.test', 'password': 'pw', 'organization_id': 1})
+    assert res.status_code == 400 and res.get_json()['message'] == 'Email already exists'
+
+
+def test_signup_with_sharding_does_not_claim_email_for_missing_organization(make_app):
+    app = make_app(sharding=True)
+    client = app.client()
+    assert client.post('/api/signup', json={'email': 'new@x.test', 'password': 'pw',
+                                            'organization_id': 999}).status_code == 400
+    assert app.execute("SELECT * FROM user_directory WHERE email = 'new@x.test'") == []
+    assert client.post('/api/signup', json={'email': 'new@x.test', 'password': 'pw',
+                                            'organization_id': 2}).status_code == 201
@@ -0,0 +1,149 @@
+import fcntl
+import hashlib
+import os
+import time
+import pytest
+from app import jobs, submission_routes
+from app.db import get_db
+
+DATA = os.urandom(10000)
+
+
+@pytest.fixture
+def upload(app):
+    """A resumable upload of DATA by e1, with the first 4000 bytes sent."""
+    admin = app.client('admin@acme.test')
+    res = admin.post('/api/assignments', json={'title': 'Report', 'employee_ids': [app.users['e1@acme.test']]})
+    assignment_id = res.get_json()['assignment_id']
+    employee = app.client('e1@acme.test')
+    res = employee.post(f'/api/assignments/{assignment_id}/uploads', json={'filename': 'report.bin', 'size': len(DATA)})
+    upload_id = res.get_json()['upload_id']
+    assert put_range(employee, upload_id, 0, 4000).get_json()['offset'] == 4000
+    return employee, assignment_id, upload_id
+
+
+def put_range(client, upload_id, start, end):
+    return client.put(f'/api/uploads/{upload_id}', data=DATA[start:end],
+                      headers={'Content-Range': f'bytes {start}-{end - 1}/{len(DATA)}'})
+
+
+def assert_stored(client, submission):
+    assert submission['sha256'] == hashlib.sha256(DATA).hexdigest()
+    res = client.get(f"/api/submissions/{submission['id']}/file")
+    assert res.data == DATA
+
+
+def test_resume_after_interrupted_range_and_restart(app, upload):
+    employee, _, upload_id = upload
+    # A range that died half-way left bytes past the committed offset, and
+    # the process restarted, losing the running hash
+    partial_path = os.path.join(app.app.config['UPLOAD_FOLDER'], 'partial', upload_id)
+    with open(partial_path, 'ab') as f:
+        f.write(b'interrupted' * 100)
+    submission_routes._upload_hashers.pop(upload_id)
+
+    res = put_range(employee, upload_id, 4000, len(DATA))
+    assert res.status_code == 201
+    assert_stored(employee, res.get_json()['submission'])
+
+
+def test_failed_write_keeps_hash_state(app, upload, monkeypatch):
+    employee, _, upload_id = upload
+    copy_stream = submission_routes._copy_stream
+
+    def failing_copy(stream, f, hasher, length):
+        copy_stream(stream, f, hasher, length // 2)
+        raise OSError('disk full')
+
+    monkeypatch.setattr(submission_routes, '_copy_stream', failing_copy)
+    app.app.config['PROPAGATE_EXCEPTIONS'] = False
+    assert put_range(employee, upload_id, 4000, len(DATA)).status_code == 500
+    assert submission_routes._upload_hashers[upload_id][0] == 4000
+    assert employee.get(f'/api/uploads/{upload_id}').get_json()['offset'] == 4000
+
+    # The resumed range continues from the kept state, without re-reading
+    monkeypatch.setattr(submission_routes, '_copy_stream', copy_stream)
+    monkeypatch.setattr(submission_routes, '_hash_file', None)
+    res = put_range(employee, upload_id, 4000, len(DATA))
+    assert res.status_code == 201
+    assert_stored(employee, res.get_json()['submission'])
+
+
+def test_single_request_upload_dedupes_by_hash(app, upload):
+    employee, assignment_id, _ = upload
+    res = employee.post(f'/api/assignments/{assignment_id}/submissions', data=DATA, headers={'X-Filename': 'a.bin'})
+    assert res.status_code == 201
+    assert_stored(employee, res.get_json()['submission'])
+    # Known content: no body needed
+    res = employee.post(f'/api/assignments/{assignment_id}/submissions', data=b'',
+                        headers={'X-Filename': 'b.bin', 'X-Content-SHA256': hashlib.sha256(DATA).hexdigest()})
+    assert res.status_code == 201
+    assert app.execute('SELECT refcount FROM blobs') == [(2,)]
+
+
+def test_concurrent_range_is_rejected(app, upload):
+    employee, _, upload_id = upload
+    partial_path = os.path.join(app.app.config['UPLOAD_FOLDER'], 'partial', upload_id)
+    # Another request is writing a range of this upload
+    with open(partial_path, 'r+b') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        res = put_range(employee, upload_id, 4000, 8000)
+        assert res.status_code == 409 and res.get_json()['offset'] == 4000
+    assert put_range(employee, upload_id, 4000, 8000).get_json()['offset'] == 8000
+    # The same range again is stale now
+    assert put_range(employee, upload_id, 4000, 8000).status_code == 409
+    res = put_range(employee, upload_id, 8000, len(DATA))
+    assert res.status_code == 201
+    assert_stored(employee, res.get_json()['submission'])
+
+
+def test_idle_uploads_expire(app, upload):
+    employee, assignment_id, upload_id = upload
+    partial_dir = os.path.join(app.app.config['UPLOAD_FOLDER'], 'partial')
+    res = employee.post(f'/api/assignments/{assignment_id}/uploads', json={'filename': 'new.bin', 'size': 10})
+    active_id = res.get_json()['upload_id']
+    # A partial file whose session went with its assignment
+    orphan = os.path.join(partial_dir, 'orphan')
+    open(orphan, 'wb').close()
+    day_ago = time.time() - 25 * 3600
+    os.utime(orphan, (day_ago, day_ago))
+    os.utime(os.path.join(partial_dir, upload_id), (day_ago, day_ago))
+    app.execute("UPDATE upload_sessions SET updated_at = datetime('now', '-25 hours') WHERE id = ?", (upload_id,))
+
+    assert employee.get(f'/api/uploads/{upload_id}').status_code == 404
+    assert put_range(employee, upload_id, 4000, len(DATA)).status_code == 404
+
+    app.run_jobs()
+    with app.app.app_context():
+        jobs.schedule_daily(get_db(), app.app)
+    assert app.run_jobs() == ['done']
+    assert [r[0] for r in app.execute('SELECT id FROM upload_sessions')] == [active_id]
+    assert os.listdir(partial_dir) == [active_id]
+    assert upload_id not in submission_routes._upload_hashers
+    assert employee.get(f'/api/uploads/{active_id}').status_code == 200
+
+
+def test_hash_only_submission_needs_own_copy(app, upload):
+    employee, assignment_id, _ = upload
+    res = employee.post(f'/api/assignments/{assignment_id}/submissions', data=DATA, headers={'X-Filename': 'a.bin'})
+    sha256 = res.get_json()['submission']['sha256']
+
+    # A coworker who learnt the hash gets the same answer as for an unknown one
+    other = app.client('e2@acme.test')
+    res = app.client('admin@acme.test').post('/api/assignments', json={'title': 'Open'})
+    general_id = res.get_json()['assignment_id']
+    for sha in (sha256, hashlib.sha256(b'unknown').hexdigest()):
+        res = other.post(f'/api/assignments/{general_id}/submissions', data=b'',
+                         headers={'X-Filename': 'x.bin', 'X-Content-SHA256': sha})
+        assert res.status_code == 404
+        # ... and a resumable upload has to send the bytes
+        res = other.post(f'/api/assignments/{general_id}/uploads',
+                         json={'filename': 'x.bin', 'size': len(DATA), 'sha256': sha})
+        assert res.status_code == 201 and res.get_json()['offset'] == 0
+    assert app.execute('SELECT COUNT(*) FROM submissions WHERE employee_id = ?', (app.users['e2@acme.test'],)) \
+        == [(0,)]
+
+    # Uploading the bytes is fine, and shares the stored copy
+    res = other.post(f'/api/assignments/{general_id}/submissions', data=DATA, headers={'X-Filename': 'x.bin'})
+    assert res.status_code == 201 and res.get_json()['submission']['sha256'] == sha256
+    assert app.execute('SELECT refcount FROM blobs') == [(2,)]
@@ -24,25 +24,37 @@ type FormShape = {
 
 // DEFAULT TO LOCAL BACKEND IF ENV NOT SET
 const API_BASE = process.env.NEXT_PUBLIC_API_BASE || "http://localhost:8000";
+const PAGE_SIZE = 50;
 
 export default function ManageAssignmentsPage() {
   const { user } = useAuth();
   const [assignments, setAssignments] = useState<Assignment[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState("");
   const [form, setForm] = useState<FormShape>({});
   const [editingId, setEditingId] = useState<number | null>(null);
 
-  // Load assignments
+  // Fetch one page of assignments; the backend pages by due date
+  const fetchPage = async (cursor: string | null) => {
+    const params = new URLSearchParams({ limit: String(PAGE_SIZE) });
+    if (cursor) params.set("cursor", cursor);
+    const res = await fetch(`${API_BASE}/api/assignments?${params}`, { credentials: "include" });
+    if (!res.ok) throw new Error(`Failed to load assignments: ${res.status}`);
+    const data = await res.json();
+    const page: Assignment[] = data.assignments ?? [];
+    setAssignments((prev) => (cursor ? [...prev, ...page] : page));
+    setNextCursor(data.next_cursor ?? null);
+  };
+
+  // Load assignments (first page)
   const loadAssignments = async () => {
     if (!user) return;
     setLoading(true);
     setError("");
     try {
-      const res = await fetch(`${API_BASE}/api/assignments`, { credentials: "include" });
-      if (!res.ok) throw new Error(`Failed to load assignments: ${res.status}`);
-      const data = await res.json();
-      setAssignments(data.assignments ?? []);
+      await fetchPage(null);
     } catch (err: any) {
       setError(err.message || "Error fetching assignments");
     } finally {
@@ -50,6 +62,18 @@ export default function ManageAssignmentsPage() {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      await fetchPage(nextCursor);
+    } catch (err: any) {
+      setError(err.message || "Error fetching assignments");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     loadAssignments();
   }, [user]);
@@ -218,6 +242,16 @@ export default function ManageAssignmentsPage() {
           ))}
         </ul>
       )}
+
+      {nextCursor && (
+        <button
+          className="mt-4 bg-gray-200 px-4 py-2 rounded"
+          onClick={loadMore}
+          disabled={loadingMore}
+        >
+          {loadingMore ? "Loading…" : "Load more"}
+        </button>
+      )}
     </main>
   );
 }
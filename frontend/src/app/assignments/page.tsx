@@ -14,40 +14,67 @@ type Assignment = {
   employee_ids?: number[];
 };
 
+const PAGE_SIZE = 50;
+
+// Same order as the backend: by due date (undated last), then id
+function byDueDate(a: Assignment, b: Assignment) {
+  const da = a.due_date ?? "9999-12-31";
+  const db = b.due_date ?? "9999-12-31";
+  return da < db ? -1 : da > db ? 1 : a.id - b.id;
+}
+
 export default function AssignmentsPage() {
   const { user } = useAuth(); // user can be null
   const [assignments, setAssignments] = useState<Assignment[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState("");
 
-  // runtime guard + narrowed currentUser
+  // Fetch one page of assignments; the backend pages by due date
+  async function fetchPage(cursor: string | null) {
+    const params = new URLSearchParams({
+      limit: String(PAGE_SIZE),
+      fields: "id,title,description,due_date,is_general,employee_ids",
+    });
+    if (cursor) params.set("cursor", cursor);
+
+    const res = await fetch(`http://localhost:8000/api/assignments?${params}`, {
+      credentials: "include",
+    });
+    if (!res.ok) throw new Error("Failed to load assignments");
+
+    const data = await res.json();
+    const page: Assignment[] = data.assignments ?? [];
+
+    // Optional frontend filtering for employee-specific logic
+    let filtered: Assignment[] = page;
+    if (user && user.role === "employee") {
+      const currentUser = user;
+      filtered = page.filter(
+        (a) =>
+          a.is_general ||
+          (a.employee_ids?.includes(currentUser.id) ?? false)
+      );
+    }
+
+    // A live event may already have added some of this page
+    setAssignments((prev) => {
+      if (!cursor) return filtered;
+      const seen = new Set(prev.map((a) => a.id));
+      return [...prev, ...filtered.filter((a) => !seen.has(a.id))];
+    });
+    setNextCursor(data.next_cursor ?? null);
+  }
+
+  // runtime guard
   useEffect(() => {
     if (!user) return; // stop if user is not logged in
 
-    const currentUser = user; // TS now knows this is not null
-
     async function loadAssignments() {
       setLoading(true);
       try {
-        const res = await fetch("http://localhost:8000/api/assignments", {
-          credentials: "include",
-        });
-        if (!res.ok) throw new Error("Failed to load assignments");
-
-        const data = await res.json();
-        const allAssignments: Assignment[] = data.assignments ?? [];
-
-        // Optional frontend filtering for employee-specific logic
-        let filtered: Assignment[] = allAssignments;
-        if (currentUser.role === "employee") {
-          filtered = allAssignments.filter(
-            (a) =>
-              a.is_general ||
-              (a.employee_ids?.includes(currentUser.id) ?? false)
-          );
-        }
-
-        setAssignments(filtered);
+        await fetchPage(null);
       } catch (err: any) {
         setError(err.message || "Error fetching assignments");
       } finally {
@@ -58,6 +85,45 @@ export default function AssignmentsPage() {
     loadAssignments();
   }, [user]);
 
+  // Live updates: apply assignment events instead of re-fetching the list
+  useEffect(() => {
+    if (!user) return;
+
+    const source = new EventSource("http://localhost:8000/api/assignments/events", {
+      withCredentials: true,
+    });
+    const upsert = (e: MessageEvent) => {
+      const changed: Assignment = JSON.parse(e.data);
+      setAssignments((prev) =>
+        [...prev.filter((a) => a.id !== changed.id), changed].sort(byDueDate)
+      );
+    };
+    source.addEventListener("created", upsert);
+    source.addEventListener("updated", upsert);
+    source.addEventListener("deleted", (e) => {
+      const { id } = JSON.parse((e as MessageEvent).data);
+      setAssignments((prev) => prev.filter((a) => a.id !== id));
+    });
+    // The server no longer has every event we missed: start over
+    source.addEventListener("reset", () => {
+      fetchPage(null).catch(() => {});
+    });
+
+    return () => source.close();
+  }, [user]);
+
+  async function loadMore() {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      await fetchPage(nextCursor);
+    } catch (err: any) {
+      setError(err.message || "Error fetching assignments");
+    } finally {
+      setLoadingMore(false);
+    }
+  }
+
   // Render guards
   if (!user) return <p className="p-6">Please log in to see assignments.</p>;
   if (loading) return <p className="p-6">Loading…</p>;
@@ -97,6 +163,16 @@ export default function AssignmentsPage() {
           ))}
         </ul>
       )}
+
+      {nextCursor && (
+        <button
+          className="mt-4 bg-gray-200 px-4 py-2 rounded"
+          onClick={loadMore}
+          disabled={loadingMore}
+        >
+          {loadingMore ? "Loading…" : "Load more"}
+        </button>
+      )}
     </main>
   );
 }
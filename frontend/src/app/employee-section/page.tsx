@@ -3,22 +3,48 @@
 import { useEffect, useState } from 'react';
 import { useRouter } from 'next/navigation';
 
+type Employee = {
+  id: number;
+  first_name: string;
+  last_name?: string | null;
+  position?: string | null;
+  department?: string | null;
+};
+
+const PAGE_SIZE = 100;
+
 export default function EmployeeSection() {
-  const [employees, setEmployees] = useState([]);
+  const [employees, setEmployees] = useState<Employee[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [query, setQuery] = useState('');
   const [error, setError] = useState('');
   const router = useRouter();
 
-  useEffect(() => {
-    fetch('http://localhost:8000/api/employees', {
+  // One page of the directory, sorted by name; `q` matches name prefixes
+  async function fetchPage(cursor: string | null) {
+    const params = new URLSearchParams({
+      limit: String(PAGE_SIZE),
+      fields: 'id,first_name,last_name,position,department',
+    });
+    if (query.trim()) params.set('q', query.trim());
+    if (cursor) params.set('cursor', cursor);
+
+    const res = await fetch(`http://localhost:8000/api/employees?${params}`, {
       credentials: 'include', // send cookies for session
-    })
-      .then(res => {
-        if (!res.ok) throw new Error('Failed to fetch employees');
-        return res.json();
-      })
-      .then(data => setEmployees(data))
-      .catch(err => setError(err.message));
-  }, []);
+    });
+    if (!res.ok) throw new Error('Failed to fetch employees');
+    const data = await res.json();
+    setEmployees((prev) => (cursor ? [...prev, ...data.employees] : data.employees));
+    setNextCursor(data.next_cursor ?? null);
+  }
+
+  useEffect(() => {
+    // Wait for the user to stop typing before searching
+    const timer = setTimeout(() => {
+      fetchPage(null).catch((err) => setError(err.message));
+    }, 250);
+    return () => clearTimeout(timer);
+  }, [query]);
 
   const handleLogout = async () => {
     try {
@@ -46,13 +72,30 @@ export default function EmployeeSection() {
         </button>
       </header>
 
+      <input
+        type="search"
+        placeholder="Search by name"
+        value={query}
+        onChange={(e) => setQuery(e.target.value)}
+        className="border p-2 rounded mb-4 w-full"
+      />
+
       <ul>
         {employees.map((emp) => (
-          <li key={emp[0]}>
-            {emp[1]} {emp[2]} — {emp[4]} ({emp[5]})
+          <li key={emp.id}>
+            {emp.first_name} {emp.last_name} — {emp.position} ({emp.department})
           </li>
         ))}
       </ul>
+
+      {nextCursor && (
+        <button
+          className="mt-4 bg-gray-200 px-4 py-2 rounded"
+          onClick={() => fetchPage(nextCursor).catch((err) => setError(err.message))}
+        >
+          Load more
+        </button>
+      )}
     </div>
   );
 }
@@ -1,4 +1,10 @@
+import StatsTable from '../../../components/StatsTable';
+
 export default function ManagerDashboard() {
-    return <h1>Team Manager Dashboard</h1>;
+    return (
+      <div>
+        <h1>Team Manager Dashboard</h1>
+        <StatsTable />
+      </div>
+    );
   }
-  
\ No newline at end of file
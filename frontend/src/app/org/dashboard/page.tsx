@@ -1,4 +1,10 @@
+import StatsTable from '../../../components/StatsTable';
+
 export default function OrgDashboard() {
-    return <h1>Organization Admin Dashboard wow</h1>;
+    return (
+      <div>
+        <h1>Organization Admin Dashboard wow</h1>
+        <StatsTable />
+      </div>
+    );
   }
-  
\ No newline at end of file
@@ -1,3 +1,10 @@
+import StatsTable from '../../../components/StatsTable';
+
 export default function SuperDashboard() {
-  return <h1>Super Admin Dashboard</h1>;
+  return (
+    <div>
+      <h1>Super Admin Dashboard</h1>
+      <StatsTable />
+    </div>
+  );
 }
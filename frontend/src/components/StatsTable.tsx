@@ -0,0 +1,71 @@
+'use client';
+
+import { useEffect, useState } from 'react';
+
+type Counters = {
+  total: number;
+  overdue: number;
+  due_this_week: number;
+  expected: number;
+  received: number;
+};
+
+type Row = Counters & { name?: string | null; team_id?: number; organization_id?: number };
+
+type Stats = {
+  organization?: Row;
+  organizations?: Row[];
+  teams?: Row[];
+};
+
+// Summary counts from GET /api/stats; what comes back depends on the role
+export default function StatsTable() {
+  const [stats, setStats] = useState<Stats | null>(null);
+  const [error, setError] = useState('');
+
+  useEffect(() => {
+    fetch('http://localhost:8000/api/stats', { credentials: 'include' })
+      .then((res) => {
+        if (!res.ok) throw new Error('Failed to load statistics');
+        return res.json();
+      })
+      .then(setStats)
+      .catch((err) => setError(err.message));
+  }, []);
+
+  if (error) return <p className="text-red-500">{error}</p>;
+  if (!stats) return <p>Loading…</p>;
+
+  const rows: [string, Row][] = [
+    ...(stats.organization ? [['Whole organization', stats.organization] as [string, Row]] : []),
+    ...(stats.organizations ?? []).map((o) => [o.name ?? `Organization ${o.organization_id}`, o] as [string, Row]),
+    ...(stats.teams ?? []).map((t) => [t.team_id ? t.name ?? `Team ${t.team_id}` : 'No team', t] as [string, Row]),
+  ];
+
+  return (
+    <table className="mt-4 border-collapse">
+      <thead>
+        <tr>
+          <th className="text-left pr-6"></th>
+          <th className="pr-6">Assignments</th>
+          <th className="pr-6">Overdue</th>
+          <th className="pr-6">Due this week</th>
+          <th className="pr-6">Submissions</th>
+        </tr>
+      </thead>
+      <tbody>
+        {rows.map(([label, r]) => (
+          <tr key={label}>
+            <td className="pr-6">{label}</td>
+            <td className="pr-6 text-center">{r.total}</td>
+            <td className="pr-6 text-center">{r.overdue}</td>
+            <td className="pr-6 text-center">{r.due_this_week}</td>
+            <td className="pr-6 text-center">
+              {r.received} / {r.expected}
+            </td>
+          </tr>
+        ))}
+      </tbody>
+    </table>
+  );
+}